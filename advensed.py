@@ -1,25 +1,27 @@
-import os
-import yfinance as yf
-import csv
 import json
-
-def fetch_stock_data(stock_code):
-    try:
-        stock = yf.Ticker(f"{stock_code}.AX")  # Append ".AX" for ASX listings
-        data = stock.history(period="max")  # Fetch all available historical data
-        return data
-    except Exception as e:
-        print(f"Error fetching data for {stock_code}: {e}")
-        return None
+from datetime import date, timedelta
+import archive
+import fetch
+
+def fetch_stock_data(stock_codes, start=None):
+    """
+    Fetches full OHLCV history for several tickers (from `start`, or all available history).
+    """
+    if start:
+        end = (date.today() + timedelta(days=1)).strftime('%Y-%m-%d')
+        result = fetch.fetch_all(stock_codes, start=start, end=end)
+    else:
+        result = fetch.fetch_all(stock_codes, period="max")  # Fetch all available historical data
+    for stock_code, error in sorted(result.errors.items()):
+        if error != fetch.no_data:
+            print(f"Error fetching data for {stock_code}: {error}")
+    return result.data
 
 def save_stock_data(stock_code, data):
     if data is not None:
-        filename = f"stock_data/{stock_code}.csv"
-
-        # Write data to CSV file
-        data.to_csv(filename)
-
-        print(f"Saved data for {stock_code} to {filename}")
+        # Append to the year partitions instead of rewriting the whole history
+        added = archive.append(stock_code, data)
+        print(f"Saved {added} new rows for {stock_code} to {archive.archive_dir}/{stock_code}/")
 
 def update_stock_data_from_portfolio(portfolio_file):
     try:
@@ -28,9 +30,17 @@ def update_stock_data_from_portfolio(portfolio_file):
     except (FileNotFoundError, json.JSONDecodeError) as e:
         raise FileNotFoundError(f"Portfolio file '{portfolio_file}' could not be loaded: {e}")
 
+    # Group tickers by the first date they are missing, so each group is one batched fetch
+    starts = {}
     for stock_code in portfolio:
-        stock_data = fetch_stock_data(stock_code)
-        if stock_data is not None:
+        last = archive.last_date(stock_code)
+        start = None if last is None else (date.fromisoformat(last) + timedelta(days=1)).strftime('%Y-%m-%d')
+        if start is not None and start > date.today().strftime('%Y-%m-%d'):
+            continue  # Already up to date
+        starts.setdefault(start, []).append(stock_code)
+
+    for start, stock_codes in starts.items():
+        for stock_code, stock_data in fetch_stock_data(stock_codes, start).items():
             save_stock_data(stock_code, stock_data)
 
 def main():
@@ -0,0 +1,324 @@
+import os
+import json
+import argparse
+from collections import deque
+from datetime import datetime
+import down
+import metrics
+import symbols
+import watchlist
+
+# Default rules (modify as needed)
+drop_threshold = 5.0  # Percent fall from the previous close that alerts on a liked stock
+low_window = 20  # Trading days in the low a holding is checked against
+
+# Inputs and outputs
+data_dir = down.data_dir
+portfolio_file = "portfolio.json"
+alert_log = "alerts.log"
+state_file = "alert_state.json"
+
+# Trading days an alert is remembered for, so reruns do not repeat it
+dedupe_days = 5
+
+
+class DropRule:
+    """
+    Alerts when the price is more than `threshold` percent below the previous close.
+
+    Args:
+        flag (str): Watchlist flag a ticker needs for the rule to apply.
+        threshold (float): Percentage fall that triggers the alert.
+    """
+
+    def __init__(self, flag="liked", threshold=drop_threshold):
+        self.flag = flag
+        self.threshold = threshold
+        self.name = f"{flag}_drop_{threshold:g}pct"
+        self.lookback = 1
+
+    def evaluate(self, history, state):
+        if not history.closes:
+            return None
+        previous = history.closes[-1]
+        change = down.calculate_percentage_decrease(previous, history.price) if previous else 0.0
+        if change > self.threshold:
+            return f"fell {change:.2f}% from {previous:g} to {history.price:g}"
+        return None
+
+
+class LowRule:
+    """
+    Alerts when the price crosses below the lowest close of the previous `window` days.
+
+    Only the crossing alerts: a ticker that stays below its low does not alert
+    again until it has recovered above it and crossed once more.
+    """
+
+    def __init__(self, flag="has_it", window=low_window):
+        self.flag = flag
+        self.window = window
+        self.name = f"{flag}_{window}_day_low"
+        self.lookback = window
+
+    def evaluate(self, history, state):
+        if len(history.closes) < self.window:
+            return None
+        low = min(list(history.closes)[-self.window:])
+        below = history.price < low
+        crossed = below and not state.get("below", False)
+        state["below"] = below
+        if crossed:
+            return f"crossed below its {self.window}-day low of {low:g} at {history.price:g}"
+        return None
+
+
+def default_rules():
+    return [DropRule("liked", drop_threshold), LowRule("has_it", low_window)]
+
+
+class TickerHistory:
+    """
+    Closes of the completed days before `day`, plus the latest price on `day`.
+
+    Args:
+        closes (iterable): Earlier daily closes, oldest first.
+        maxlen (int): Closes kept (the longest rule look-back).
+    """
+
+    def __init__(self, closes=(), maxlen=low_window):
+        self.closes = deque(closes, maxlen)
+        self.day = None
+        self.price = None
+
+    def update(self, day, price):
+        """
+        Applies a price for `day`; returns False for updates older than the current day.
+        """
+        if self.day is not None:
+            if day < self.day:
+                return False
+            if day > self.day:
+                self.closes.append(self.price)  # The previous day is now complete
+        self.day, self.price = day, price
+        return True
+
+
+class AlertEngine:
+    """
+    Evaluates alert rules per price update, touching only the updated ticker.
+
+    Each ticker is subscribed to the rules whose flag it has, so an update for
+    an unflagged ticker costs one dict lookup. A ticker's history is seeded from
+    the tail of its data file the first time it is updated.
+
+    Args:
+        flags (dict): Stock code -> set of flag names ('liked', 'has_it').
+        rules (list): Rule objects (default: default_rules()).
+        data_dir (str): Where to seed histories from.
+    """
+
+    def __init__(self, flags=None, rules=None, data_dir=data_dir):
+        self.rules = default_rules() if rules is None else list(rules)
+        self.data_dir = data_dir
+        self.lookback = max((rule.lookback for rule in self.rules), default=1)
+        self.subscribers = {}  # Code -> rules that apply to it
+        self.histories = {}
+        self.rule_state = {}  # (rule name, code) -> dict kept between evaluations
+        self.fired = set()  # (day, rule name, code) already alerted
+        self.dirty = False  # Rule state or alerts changed since the last save_state
+        self.evaluations = 0
+        for code, code_flags in (flags or {}).items():
+            self.set_flags(code, code_flags)
+
+    def set_flags(self, code, flags):
+        rules = [rule for rule in self.rules if rule.flag in flags]
+        if rules:
+            self.subscribers[code] = rules
+        else:
+            self.subscribers.pop(code, None)
+
+    def _seed(self, code, day):
+        path = os.path.join(self.data_dir, code, "stock_data.csv")
+        closes = []
+        if os.path.isfile(path):
+            # One extra row, since the file may already hold `day` itself
+            entries = down.read_recent_entries(path, self.lookback + 1)
+            closes = [price for entry_day, price in entries if entry_day.isoformat() < day]
+        history = TickerHistory(closes, self.lookback)
+        self.histories[code] = history
+        return history
+
+    def update(self, code, day, price):
+        """
+        Applies one price update and returns the new (not yet seen) alerts it causes.
+
+        Args:
+            code (str): Stock code.
+            day (str): Trading day, 'YYYY-MM-DD'.
+            price (float): Latest price on that day.
+
+        Returns:
+            list: {"date", "code", "rule", "message"} dicts.
+        """
+        rules = self.subscribers.get(code)
+        if not rules:
+            return []
+        history = self.histories.get(code) or self._seed(code, day)
+        if not history.update(day, price):
+            return []
+        alerts = []
+        for rule in rules:
+            self.evaluations += 1
+            state = self.rule_state.setdefault((rule.name, code), {})
+            before = dict(state)
+            message = rule.evaluate(history, state)
+            if state != before:
+                self.dirty = True
+            if message is None:
+                continue
+            key = (day, rule.name, code)
+            if key in self.fired:
+                continue
+            self.fired.add(key)
+            self.dirty = True
+            alerts.append({"date": day, "code": code, "rule": rule.name, "message": message})
+        return alerts
+
+    def process(self, new_prices):
+        """
+        Applies a batch of updates in date order.
+
+        Args:
+            new_prices (dict): Date 'YYYY-MM-DD' -> {code: price}, as returned by ingest.ingest.
+
+        Returns:
+            list: New alerts.
+        """
+        alerts = []
+        for day in sorted(new_prices):
+            for code, price in new_prices[day].items():
+                alerts.extend(self.update(code, day, price))
+        metrics.count("alert_updates", sum(len(prices) for prices in new_prices.values()))
+        metrics.count("alerts_fired", len(alerts))
+        return alerts
+
+    def save_state(self, path=state_file):
+        """
+        Keeps rule state and recent alert keys so the next run neither repeats nor misses crossings.
+        """
+        recent_days = sorted({day for day, _, _ in self.fired})[-dedupe_days:]
+        state = {
+            "rule_state": [[name, code, value] for (name, code), value in sorted(self.rule_state.items()) if value],
+            "fired": sorted(list(key) for key in self.fired if key[0] in recent_days),
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+        self.dirty = False
+
+    def load_state(self, path=state_file):
+        if not os.path.exists(path):
+            return
+        with open(path, 'r') as f:
+            state = json.load(f)
+        self.rule_state = {(name, code): value for name, code, value in state.get("rule_state", [])}
+        self.fired = {tuple(key) for key in state.get("fired", [])}
+
+
+def load_flags(db_path=watchlist.db_file, portfolio_path=portfolio_file):
+    """
+    Returns {code: set of flags} for every liked or held stock.
+
+    Stocks in portfolio.json count as held even if like.py never marked them.
+    """
+    flags = {}
+    conn = watchlist.connect(db_path)
+    try:
+        for flag in watchlist.flag_names:
+            for code in watchlist.query(conn, **{flag: 1}):
+                flags.setdefault(code, set()).add(flag)
+    finally:
+        conn.close()
+    if os.path.exists(portfolio_path):
+        with open(portfolio_path, 'r') as f:
+            for code in json.load(f):
+                flags.setdefault(code, set()).add("has_it")
+    return flags
+
+
+def load_engine(state_path=state_file, **kwargs):
+    engine = AlertEngine(load_flags(), **kwargs)
+    engine.load_state(state_path)
+    return engine
+
+
+def write_alerts(alerts, path=alert_log):
+    """
+    Appends alerts to the log, one line each, and prints them.
+    """
+    if not alerts:
+        return
+    registry = symbols.load()
+    stamp = datetime.now().isoformat(timespec='seconds')
+    with open(path, 'a') as f:
+        for alert in alerts:
+            line = f"{stamp} {alert['date']} {alert['code']} ({registry.name(alert['code'])}) {alert['rule']}: {alert['message']}"
+            f.write(line + "\n")
+            print(line)
+
+
+def process_updates(new_prices, engine=None, log_path=alert_log, state_path=state_file):
+    """
+    Runs newly ingested prices through the alert rules, logs new alerts and saves the state.
+    """
+    engine = engine or load_engine(state_path)
+    alerts = engine.process(new_prices)
+    write_alerts(alerts, log_path)
+    engine.save_state(state_path)
+    return alerts
+
+
+def intraday_callback(engine, log_path=alert_log, state_path=state_file):
+    """
+    Returns an intraday.IntradayMonitor on_update hook that feeds each new tick to the engine.
+
+    The state is saved whenever it changed, not only when an alert fires, so a
+    recovery (e.g. a holding climbing back above its low) is not lost on restart.
+    """
+    def on_update(monitor, updated):
+        day = datetime.now().date().isoformat()
+        alerts = engine.process({day: {code: monitor.buffers[code].last() for code in updated}})
+        write_alerts(alerts, log_path)
+        if engine.dirty:
+            engine.save_state(state_path)
+    return on_update
+
+
+def latest_prices(codes, days=1, directory=data_dir):
+    """
+    The last `days` rows of each code's data file as {date: {code: price}}.
+    """
+    new_prices = {}
+    for code in codes:
+        path = os.path.join(directory, code, "stock_data.csv")
+        if os.path.isfile(path):
+            for day, price in down.read_recent_entries(path, days):
+                new_prices.setdefault(day.isoformat(), {})[code] = price
+    return new_prices
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the liked and held stocks against the alert rules.")
+    parser.add_argument("--days", type=int, default=1, help="replay this many recent days from the data files")
+    parser.add_argument("--log", default=alert_log)
+    args = parser.parse_args(argv)
+
+    engine = load_engine()
+    alerts = process_updates(latest_prices(engine.subscribers, args.days), engine, args.log)
+    print(f"{len(alerts)} new alerts for {len(engine.subscribers)} watched tickers "
+          f"({engine.evaluations} rule evaluations); log: {args.log}")
+
+if __name__ == "__main__":
+    main()
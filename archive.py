@@ -0,0 +1,172 @@
+import os
+import numpy as np
+
+# Root of the long-history archive: archive/<CODE>/<YEAR>.npz (modify as needed)
+archive_dir = "archive"
+
+# Columns kept from the fetched OHLCV frames, in storage order
+ohlcv_columns = ["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"]
+
+
+def _to_days(index):
+    """
+    Converts a DatetimeIndex (tz-aware or not) to int64 day numbers.
+    """
+    values = np.asarray([str(d)[:10] for d in index], dtype='datetime64[D]')
+    return values.astype(np.int64)
+
+
+def _year_of(days):
+    return days.astype('datetime64[D]').astype('datetime64[Y]').astype(int) + 1970
+
+
+def _partition_path(code, year, root=archive_dir):
+    return os.path.join(root, code, f"{year}.npz")
+
+
+def partitions(code, root=archive_dir):
+    """
+    Returns the sorted years stored for a ticker.
+    """
+    folder = os.path.join(root, code)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(int(name[:-4]) for name in os.listdir(folder) if name.endswith(".npz") and name[:-4].isdigit())
+
+
+def _load_partition(path, columns=None):
+    """
+    Loads the date column plus only the requested columns of one partition.
+
+    npz members are decompressed individually on access, so unrequested columns
+    are never read.
+    """
+    with np.load(path) as npz:
+        names = [c for c in (npz.files if columns is None else columns) if c in npz.files and c != "date"]
+        return npz["date"], {name: npz[name] for name in names}
+
+
+def _write_partition(path, days, columns):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, date=days, **columns)
+    os.replace(tmp_path, path)
+
+
+def last_date(code, root=archive_dir):
+    """
+    Returns the newest stored date for a ticker as 'YYYY-MM-DD', or None.
+    """
+    years = partitions(code, root)
+    if not years:
+        return None
+    days, _ = _load_partition(_partition_path(code, years[-1], root), columns=[])
+    return str(days.max().astype('datetime64[D]')) if len(days) else None
+
+
+def append(code, frame, root=archive_dir):
+    """
+    Merges new OHLCV rows into a ticker's partitions.
+
+    Only the years the new rows fall in are rewritten; rows for dates already
+    stored are replaced by the new values.
+
+    Args:
+        code (str): Stock code.
+        frame (pd.DataFrame): Date-indexed OHLCV data (as returned by yfinance).
+        root (str): Archive directory.
+
+    Returns:
+        int: Number of new rows stored.
+    """
+    if frame is None or len(frame) == 0:
+        return 0
+    days = _to_days(frame.index)
+    new = {c: frame[c].to_numpy(dtype=float) for c in ohlcv_columns if c in frame.columns}
+    years = _year_of(days)
+
+    added = 0
+    for year in np.unique(years):
+        mask = years == year
+        path = _partition_path(code, int(year), root)
+        year_days, year_columns = days[mask], {c: v[mask] for c, v in new.items()}
+
+        if os.path.exists(path):
+            old_days, old_columns = _load_partition(path)
+            keep = ~np.isin(old_days, year_days)
+            added += int(len(year_days) - (~keep).sum())
+            names = sorted(set(old_columns) | set(year_columns), key=lambda c: ohlcv_columns.index(c) if c in ohlcv_columns else len(ohlcv_columns))
+            merged = {}
+            for name in names:
+                old = old_columns.get(name, np.full(len(old_days), np.nan))[keep]
+                fresh = year_columns.get(name, np.full(len(year_days), np.nan))
+                merged[name] = np.concatenate([old, fresh])
+            year_days = np.concatenate([old_days[keep], year_days])
+            year_columns = merged
+        else:
+            added += len(year_days)
+
+        order = np.argsort(year_days, kind='stable')
+        _write_partition(path, year_days[order], {c: v[order] for c, v in year_columns.items()})
+    return added
+
+
+def read(code, start=None, end=None, columns=None, root=archive_dir):
+    """
+    Reads a date range and column subset for one ticker.
+
+    Partitions outside the year range are skipped without being opened, and
+    only the requested columns are decompressed.
+
+    Args:
+        code (str): Stock code.
+        start (str): First date 'YYYY-MM-DD' (inclusive), or None for all history.
+        end (str): Last date 'YYYY-MM-DD' (inclusive), or None.
+        columns (list): Columns to load, e.g. ['Close']; None loads all.
+        root (str): Archive directory.
+
+    Returns:
+        tuple: (dates as datetime64[D] array, {column: array}).
+    """
+    start_day = np.datetime64(start, 'D').astype(np.int64) if start else None
+    end_day = np.datetime64(end, 'D').astype(np.int64) if end else None
+    first_year = int(start[:4]) if start else None
+    last_year = int(end[:4]) if end else None
+
+    chunks_days, chunks = [], {}
+    for year in partitions(code, root):
+        if (first_year is not None and year < first_year) or (last_year is not None and year > last_year):
+            continue
+        days, cols = _load_partition(_partition_path(code, year, root), columns)
+        mask = np.ones(len(days), dtype=bool)
+        if start_day is not None:
+            mask &= days >= start_day
+        if end_day is not None:
+            mask &= days <= end_day
+        chunks_days.append(days[mask])
+        for name, values in cols.items():
+            chunks.setdefault(name, []).append(values[mask])
+
+    days = np.concatenate(chunks_days) if chunks_days else np.empty(0, dtype=np.int64)
+    return days.astype('datetime64[D]'), {name: np.concatenate(parts) for name, parts in chunks.items()}
+
+
+def read_frame(code, start=None, end=None, columns=None, root=archive_dir):
+    """
+    Same as read(), returned as a DataFrame with a 'Date' column.
+    """
+    import pandas as pd
+    dates, cols = read(code, start, end, columns, root)
+    frame = pd.DataFrame(cols, index=range(len(dates)))
+    frame.insert(0, 'Date', pd.to_datetime(dates))
+    return frame
+
+
+def codes(root=archive_dir):
+    """
+    Returns the tickers present in the archive.
+    """
+    if not os.path.isdir(root):
+        return []
+    return sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
@@ -0,0 +1,190 @@
+# asxbot: one command-line entry point for the ASX game bot scripts.
+#
+# Heavy dependencies (pandas, numpy, matplotlib, tkinter, yfinance) are imported
+# inside the subcommands that need them, so quick commands such as `status`,
+# `holdings` and `last` only pay for the standard library.
+#
+#   python asxbot.py status | holdings | last CBA ANZ
+#   python asxbot.py get | down | model | port | graph | like
+#   python asxbot.py run [--force] [stage ...]
+#   python asxbot.py imports [module ...]
+#   python asxbot.py --profile --metrics metrics.jsonl model
+import os
+import sys
+import json
+import argparse
+
+data_dir = "data"
+portfolio_file = "portfolio.json"
+
+# Modules profiled by `asxbot imports` when none are named
+default_import_targets = ["get", "down", "model", "port", "graph", "like"]
+
+
+def last_price(code):
+    """
+    Returns (date, price) of the newest row for a ticker, reading only the file tail.
+    """
+    import down  # Standard library only
+    entries = down.read_recent_entries(os.path.join(data_dir, code, "stock_data.csv"), 1)
+    return entries[-1] if entries else (None, None)
+
+
+def cmd_status(args):
+    import ingest
+    tickers = [d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d))]
+    manifest = ingest.load_manifest()
+    last_dates = [entry["last"] for entry in manifest.values() if entry.get("last")]
+    current = sum(1 for date in last_dates if date >= str(ingest.last_closed_trading_day()))
+
+    print(f"Tickers: {len(tickers)}")
+    print(f"Last trading day: {ingest.last_closed_trading_day()}")
+    if last_dates:
+        print(f"Newest stored date: {max(last_dates)}")
+        print(f"Up to date: {current} of {len(manifest)} tracked tickers")
+    else:
+        print("No ingestion manifest yet (run `asxbot get`).")
+    print(f"Price panel: {'present' if os.path.exists(os.path.join('panel', 'meta.json')) else 'not migrated'}")
+    return 0
+
+
+def cmd_holdings(args):
+    with open(args.portfolio, 'r') as f:
+        portfolio = json.load(f)
+
+    total = 0.0
+    print(f"{'Code':<8}{'Qty':>8}{'Last':>12}{'Value':>14}  Date")
+    for code, quantity in sorted(portfolio.items()):
+        date, price = last_price(code) if os.path.isdir(os.path.join(data_dir, code)) else (None, None)
+        if price is None:
+            print(f"{code:<8}{quantity:>8}{'n/a':>12}{'n/a':>14}")
+            continue
+        value = price * quantity
+        total += value
+        print(f"{code:<8}{quantity:>8}{price:>12.3f}{value:>14.2f}  {date}")
+    print(f"{'Total':<28}{total:>14.2f}")
+    return 0
+
+
+def cmd_last(args):
+    status = 0
+    for code in args.codes:
+        code = code.upper()
+        try:
+            date, price = last_price(code)
+        except FileNotFoundError:
+            date, price = None, None
+        if price is None:
+            print(f"{code}: no data")
+            status = 1
+        else:
+            print(f"{code}: {price:.3f} ({date})")
+    return status
+
+
+def cmd_script(args):
+    """
+    Runs one of the existing scripts' main() in-process.
+    """
+    import importlib
+    module = importlib.import_module(args.command)
+    result = module.main()
+    return result if isinstance(result, int) else 0
+
+
+def cmd_run(args):
+    import main as daily
+    argv = (["--force"] if args.force else []) + args.stages
+    if args.profile:
+        argv.append("--profile")
+    if args.metrics:
+        argv += ["--metrics", args.metrics]
+    return daily.main(argv)
+
+
+def cmd_imports(args):
+    """
+    Prints each module's import time and its slowest direct imports, via python -X importtime.
+    """
+    import subprocess
+    for target in args.modules or default_import_targets:
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"],
+                                capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        if result.returncode != 0:
+            print(f"\n{target}: import failed\n{result.stderr.strip().splitlines()[-1] if result.stderr.strip() else ''}")
+            continue
+
+        # Rows come children-first; keep the direct imports listed just before the target itself
+        children, total_us = [], 0
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            name = name[1:].rstrip()
+            depth = (len(name) - len(name.lstrip())) // 2
+            if depth == 0:
+                if name == target:
+                    total_us = int(cumulative_us)
+                    break
+                children = []
+            elif depth == 1:
+                children.append((int(cumulative_us), int(self_us), name.strip()))
+
+        print(f"\n{target}: {total_us / 1000:.1f} ms")
+        for cumulative_us, self_us, name in sorted(children, reverse=True)[:args.top]:
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="asxbot", description="ASX game bot command line.")
+    parser.add_argument("--profile", action="store_true", help="save a cProfile of the command under profiles/")
+    parser.add_argument("--metrics", metavar="FILE", help="append timings and counters to a JSON lines file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("status", help="data freshness summary").set_defaults(func=cmd_status)
+
+    holdings = sub.add_parser("holdings", help="portfolio holdings with last prices")
+    holdings.add_argument("--portfolio", default=portfolio_file)
+    holdings.set_defaults(func=cmd_holdings)
+
+    last = sub.add_parser("last", help="last stored price for one or more tickers")
+    last.add_argument("codes", nargs="+")
+    last.set_defaults(func=cmd_last)
+
+    for name, help_text in [("get", "fetch new prices"), ("down", "scan for declines"),
+                            ("model", "screening, statistics and risk"), ("port", "portfolio valuation"),
+                            ("graph", "chart viewer"), ("like", "watchlist editor")]:
+        sub.add_parser(name, help=help_text).set_defaults(func=cmd_script)
+
+    run = sub.add_parser("run", help="daily pipeline (get, down, model)")
+    run.add_argument("--force", action="store_true")
+    run.add_argument("stages", nargs="*")
+    run.set_defaults(func=cmd_run)
+
+    imports = sub.add_parser("imports", help="import-time breakdown per module")
+    imports.add_argument("modules", nargs="*")
+    imports.add_argument("--top", type=int, default=8)
+    imports.set_defaults(func=cmd_imports)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "run" or not (args.profile or args.metrics):
+        return args.func(args)  # `run` records its own stages
+
+    import metrics  # Standard library only
+    if args.profile:
+        metrics.enable_profiling()
+    try:
+        with metrics.stage(args.command):
+            return args.func(args)
+    finally:
+        if args.metrics:
+            metrics.registry.write(args.metrics, run="asxbot " + args.command)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
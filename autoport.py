@@ -1,71 +1,197 @@
 import asyncio
+import argparse
+import json
 import os
+import re
 from pyppeteer import launch
 from dotenv import load_dotenv
 
-async def login_with_pyppeteer():
-    # Load environment variables
-    load_dotenv()
+# Game site (pass --url, e.g. to point at a local fixture server)
+base_url = "https://game.asx.com.au"
+login_path = "/game/student/school/2024-1/login"
 
-    # Get username and password from .env file
-    username = os.getenv("LOGID")
-    password = os.getenv("PASSWORD")
+# Saved cookies and the portfolio page URL, so repeat runs can skip the login
+session_file = "session.json"
 
-    if not username or not password:
-        print("Username or password not found in .env file.")
-        return
+# Where the scraped holdings are written (same format as the hand-edited file)
+portfolio_output = "myport.json"
 
-    # Launch browser
-    browser = await launch(headless=False)  # Change to headless=True for headless mode
-    page = await browser.newPage()
+# Page selectors
+login_id_selector = "#studentLoginForm\\:loginId"
+password_selector = "#studentLoginForm\\:password"
+login_button_selector = "#studentLoginForm\\:j_idt369"
+portfolio_link_selector = "#j_idt400\\:j_idt432\\:j_idt440"
+more_table_selector = "#more-table"
+holdings_table_selector = "#table-view"
+holdings_row_selector = "#table-view > tbody > tr"
 
-    try:
-        # Navigate to the login page
-        await page.goto("https://game.asx.com.au/game/student/school/2024-1/login", {"waitUntil": "networkidle0"})
+# Holdings table columns
+code_column = 0
+quantity_column = 1
 
-        # Type username with a delay
-        await page.type("#studentLoginForm\:loginId", username, {'delay': 100})  # Adjust the delay value as needed
+# Requests that are never needed to read the holdings table
+blocked_resource_types = {"image", "font", "media"}
+blocked_url_pattern = re.compile(r"google-analytics|googletagmanager|doubleclick|facebook|hotjar|newrelic|nr-data")
 
-        # Type password with a delay
-        await page.type("#studentLoginForm\:password", password, {'delay': 100})  # Adjust the delay value as needed
 
-        # Click on the login button
-        await page.click("#studentLoginForm\:j_idt369")
+async def intercept(request):
+    if request.resourceType in blocked_resource_types or blocked_url_pattern.search(request.url):
+        await request.abort()
+    else:
+        await request.continue_()
 
-        # Wait for navigation to complete
-        await page.waitForNavigation({"waitUntil": "networkidle0"})
 
-        # Wait until no network traffic and the page is loaded
-        await page.waitForSelector("#j_idt400\:j_idt432\:j_idt440")
-        await page.click("#j_idt400\:j_idt432\:j_idt440")
-        await page.waitForNavigation({"waitUntil": "networkidle0"})
+def load_session(path=session_file):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_session(session, path=session_file):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(session, f)
+    os.replace(tmp_path, path)
+
+
+def parse_holdings(rows):
+    """
+    Turns the table rows (lists of cell texts) into a {code: quantity} portfolio.
+    """
+    portfolio = {}
+    for cells in rows:
+        if len(cells) <= max(code_column, quantity_column):
+            continue
+        code = cells[code_column].strip().split()[0] if cells[code_column].strip() else ""
+        quantity = re.sub(r"[^\d]", "", cells[quantity_column])
+        if code and quantity:
+            portfolio[code.upper()] = int(quantity)
+    return portfolio
+
+
+async def read_holdings(page):
+    """
+    Extracts every holdings row in a single evaluate call.
+    """
+    rows = await page.evaluate('''
+        (selector) => Array.from(document.querySelectorAll(selector)).map(
+            row => Array.from(row.children).map(cell => cell.innerText)
+        )
+    ''', holdings_row_selector)
+    return parse_holdings(rows)
+
+
+async def login(page, username, password, url=base_url):
+    await page.goto(url + login_path, {"waitUntil": "domcontentloaded"})
+    await page.waitForSelector(login_id_selector)
+    # Fill the fields directly; a per-key delay only slows the run down
+    await page.type(login_id_selector, username)
+    await page.type(password_selector, password)
+    await asyncio.gather(
+        page.waitForNavigation({"waitUntil": "domcontentloaded"}),
+        page.click(login_button_selector),
+    )
+
+
+async def open_portfolio(page):
+    """
+    Navigates from the landing page to the full holdings table.
+    """
+    await page.waitForSelector(portfolio_link_selector)
+    await asyncio.gather(
+        page.waitForNavigation({"waitUntil": "domcontentloaded"}),
+        page.click(portfolio_link_selector),
+    )
+    await page.waitForSelector(more_table_selector)
+    await asyncio.gather(
+        page.waitForNavigation({"waitUntil": "domcontentloaded"}),
+        page.click(more_table_selector),
+    )
+    # Wait for the table itself, not its rows: an empty portfolio has none
+    await page.waitForSelector(holdings_table_selector)
+
+
+async def sync_portfolio(headless=True, output=portfolio_output, reuse_session=True,
+                         url=base_url, session_path=session_file, no_sandbox=False):
+    """
+    Scrapes the current holdings and writes them to `output`.
+
+    With a saved session the browser goes straight to the holdings page; the
+    login form is only used when the session is missing or has expired.
+
+    Args:
+        headless (bool): Run Chromium without a window.
+        output (str): Where the holdings are written.
+        reuse_session (bool): Try the saved cookies before logging in.
+        url (str): Game site root (a local fixture server in tests).
+        session_path (str): Saved session file.
+        no_sandbox (bool): Disable the Chromium sandbox; only for containers
+            running as root, where it cannot start otherwise.
+
+    Returns:
+        dict: {code: quantity}, or None if credentials are missing.
+    """
+    # Load environment variables
+    load_dotenv()
 
-        # Click on #more-table
-        await page.waitForSelector("#more-table")
-        await page.click("#more-table")
-        await page.waitForNavigation({"waitUntil": "networkidle0"})
+    # Get username and password from .env file
+    username = os.getenv("LOGID")
+    password = os.getenv("PASSWORD")
 
-        # Extract code and holding amount
-        code = await page.evaluate('''
-            () => {
-                const codeElement = document.querySelector("#portfolioForm\\:j_idt403\\:0\\:j_idt405\\:j_idt407");
-                return codeElement ? codeElement.innerText : null;
-            }
-        ''')
+    session = load_session(session_path) if reuse_session else {}
+    if not session and (not username or not password):
+        print("Username or password not found in .env file.")
+        return None
 
-        holding_amount = await page.evaluate('''
-            () => {
-                const amountElement = document.querySelector("#table-view > tbody > tr");
-                return amountElement ? amountElement.children[1].innerText : null;
-            }
-        ''')
+    browser = await launch(headless=headless, args=["--no-sandbox"] if no_sandbox else [])
+    page = await browser.newPage()
+    await page.setRequestInterception(True)
+    page.on('request', lambda request: asyncio.ensure_future(intercept(request)))
 
-        print("Code:", code)
-        print("Holding Amount:", holding_amount)
+    try:
+        portfolio = None
+        if session.get("cookies") and session.get("portfolio_url"):
+            await page.setCookie(*session["cookies"])
+            await page.goto(session["portfolio_url"], {"waitUntil": "domcontentloaded"})
+            if await page.querySelector(holdings_table_selector) is not None:
+                portfolio = await read_holdings(page)
+
+        if portfolio is None:
+            if not username or not password:
+                print("Saved session has expired and no credentials are available.")
+                return None
+            await login(page, username, password, url)
+            await open_portfolio(page)
+            portfolio = await read_holdings(page)
+            save_session({"cookies": await page.cookies(), "portfolio_url": page.url}, session_path)
+
+        with open(output, 'w') as f:
+            json.dump(portfolio, f, indent=4)
+        if portfolio:
+            print(f"Saved {len(portfolio)} holdings to {output}")
+        else:
+            print(f"No holdings in the game portfolio; wrote an empty {output}")
+        return portfolio
 
     finally:
         # Close the browser
         await browser.close()
 
-# Run the async function
-asyncio.get_event_loop().run_until_complete(login_with_pyppeteer())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync holdings from the ASX game into myport.json.")
+    parser.add_argument("--show", action="store_true", help="show the browser window")
+    parser.add_argument("--fresh", action="store_true", help="ignore the saved session and log in again")
+    parser.add_argument("--output", default=portfolio_output)
+    parser.add_argument("--url", default=base_url, help="game site root")
+    parser.add_argument("--no-sandbox", action="store_true",
+                        help="disable the Chromium sandbox (needed when running as root in a container)")
+    args = parser.parse_args(argv)
+    asyncio.get_event_loop().run_until_complete(
+        sync_portfolio(headless=not args.show, output=args.output, reuse_session=not args.fresh,
+                       url=args.url, no_sandbox=args.no_sandbox))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+import os
+import json
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import indicators
+
+# ASX game brokerage: a flat fee up to the threshold, then a percentage (modify as needed)
+brokerage_flat = 15.0
+brokerage_threshold = 15000.0
+brokerage_rate = 0.001
+
+# Starting cash in the ASX game
+starting_cash = 50000.0
+
+trading_days_per_year = 252
+
+# Sweep results (best first)
+results_file = "backtest_results.txt"
+
+# Parameter combinations handed to a worker at a time
+sweep_chunk_size = 16
+
+# Seed for the ticker order used to break ties under max_positions (modify as needed)
+tiebreak_seed = 0
+
+
+def brokerage(trade_values):
+    """
+    ASX game brokerage for each trade value (zero where nothing is traded).
+    """
+    trade_values = np.abs(trade_values)
+    fee = np.where(trade_values <= brokerage_threshold, brokerage_flat, trade_values * brokerage_rate)
+    return np.where(trade_values > 0, fee, 0.0)
+
+
+# Signals take a (dates, tickers) price matrix and return a boolean "want to hold"
+# matrix of the same shape, using only data up to and including each row.
+
+def signal_screen(prices, window=60, mean_above=50.0, std_below=10.0):
+    """
+    The shouldbuy.txt rule (mean price above / price std below a threshold),
+    evaluated over a trailing window instead of the whole history.
+    """
+    return (indicators.sma(prices, window) > mean_above) & (indicators.rolling_std(prices, window) < std_below)
+
+
+def signal_decline(prices, window=1, threshold=5.0):
+    """
+    The output.txt rule: buy tickers that fell by more than `threshold` percent
+    over the last `window` trading days.
+    """
+    past = prices.copy()
+    past[window:] = prices[:-window]
+    past[:window] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        decline = (past - prices) / past * 100
+    return decline > threshold
+
+
+def signal_rsi(prices, window=14, below=30.0):
+    """
+    Oversold tickers (RSI below a threshold).
+    """
+    return indicators.rsi(prices, window) < below
+
+
+def signal_momentum(prices, window=20, above=0.0):
+    """
+    Tickers whose return over the window is above `above` percent.
+    """
+    past = prices.copy()
+    past[window:] = prices[:-window]
+    past[:window] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (prices / past - 1) * 100 > above
+
+
+# Rule name -> signal function. Register user-defined rules here.
+signal_functions = {
+    "screen": signal_screen,
+    "decline": signal_decline,
+    "rsi": signal_rsi,
+    "momentum": signal_momentum,
+}
+
+# Default sweep grids (modify as needed)
+default_grids = {
+    "screen": {"window": [20, 60, 120, 250], "mean_above": [1, 5, 20, 50], "std_below": [0.5, 1, 5, 10], "hold": [1, 5, 20], "max_positions": [5, 20]},
+    "decline": {"window": [1, 5, 20], "threshold": [2, 5, 10, 20, 30], "hold": [1, 5, 20], "max_positions": [5, 20]},
+    "rsi": {"window": [7, 14, 28], "below": [20, 30, 40], "hold": [1, 5, 20], "max_positions": [5, 20]},
+    "momentum": {"window": [5, 20, 60, 120], "above": [0, 5, 10, 20], "hold": [1, 5, 20], "max_positions": [5, 20]},
+}
+
+
+def daily_returns(prices):
+    """
+    Close-to-close returns, measured from each ticker's previous traded price.
+    Days without a price return 0.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = prices / indicators.previous_valid(prices) - 1
+    return np.where(np.isfinite(returns), returns, 0.0)
+
+
+def positions(signal, prices, hold=1, max_positions=None, seed=tiebreak_seed):
+    """
+    Turns a signal matrix into equal target weights.
+
+    A signal on day t is traded at that day's close, so it earns day t+1's
+    return. `hold` keeps a position for that many days after the last signal.
+
+    When more tickers signal than max_positions allows, the ones kept are
+    picked by a random ticker order drawn once from `seed`. Signals are
+    yes/no, so there is no strength to rank by. A fixed order avoids favouring
+    early symbols alphabetically, and it does not churn positions from day to day.
+
+    Returns:
+        np.ndarray: (dates, tickers) weights, each row summing to 1 or 0.
+    """
+    held = signal & ~np.isnan(prices)  # Tickers without a price today cannot be bought
+    if hold > 1:
+        held = indicators.rolling_sum(held.astype(float), hold) > 0
+        # The first hold - 1 rows have no full window yet
+        held[:hold - 1] = np.cumsum(signal[:hold - 1] & ~np.isnan(prices[:hold - 1]), axis=0) > 0
+    if max_positions is not None:
+        order = np.random.default_rng(seed).permutation(held.shape[1])
+        keep = np.empty_like(held)
+        keep[:, order] = np.cumsum(held[:, order], axis=1) <= max_positions
+        held &= keep
+    counts = held.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = np.where(counts > 0, held / counts, 0.0)
+    # Shift by one day: today's decision earns tomorrow's return
+    shifted = np.zeros_like(weights)
+    shifted[1:] = weights[:-1]
+    return shifted
+
+
+def simulate(weights, returns, cash=starting_cash):
+    """
+    Runs weights through returns with brokerage charged on every weight change.
+
+    Weight drift between changes is not traded, so only signal changes pay
+    brokerage. The loop is over days only; each step is a vector operation
+    across all tickers.
+
+    Returns:
+        tuple: (equity curve, brokerage paid per day, turnover per day).
+    """
+    gross = (weights * returns).sum(axis=1)
+    changes = np.abs(np.diff(weights, axis=0, prepend=np.zeros((1, weights.shape[1]))))
+    turnover = changes.sum(axis=1)
+    traded = np.flatnonzero(turnover > 0)
+
+    equity = np.empty(len(gross))
+    costs = np.zeros(len(gross))
+    value = cash
+    next_trade = 0
+    for t in range(len(gross)):
+        if next_trade < len(traded) and traded[next_trade] == t:
+            costs[t] = brokerage(changes[t] * value).sum()
+            next_trade += 1
+        value = max(value * (1 + gross[t]) - costs[t], 0.0)
+        equity[t] = value
+    return equity, costs, turnover
+
+
+def summarize(equity, costs, turnover, cash=starting_cash):
+    """
+    CAGR, Sharpe ratio, max drawdown and turnover for an equity curve.
+    """
+    days = len(equity)
+    if days == 0:
+        return {"cagr": 0.0, "sharpe": 0.0, "max_drawdown": 0.0, "turnover": 0.0, "brokerage": 0.0, "final_value": cash}
+    curve = np.concatenate([[cash], equity])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = curve[1:] / curve[:-1] - 1
+    returns = np.where(np.isfinite(returns), returns, 0.0)
+    years = days / trading_days_per_year
+    std = returns.std()
+    peaks = np.maximum.accumulate(curve)
+    return {
+        "cagr": float((curve[-1] / cash) ** (1 / years) - 1) if curve[-1] > 0 else -1.0,
+        "sharpe": float(returns.mean() / std * np.sqrt(trading_days_per_year)) if std > 0 else 0.0,
+        "max_drawdown": float(np.max(1 - curve / peaks)),
+        "turnover": float(turnover.sum() / years),  # Annualised, 1.0 = the whole book once a year
+        "brokerage": float(costs.sum()),
+        "final_value": float(curve[-1]),
+    }
+
+
+def backtest(prices, rule, params=None, hold=1, max_positions=None, cash=starting_cash, returns=None,
+             seed=tiebreak_seed):
+    """
+    Backtests one rule with one parameter set.
+
+    Args:
+        prices (np.ndarray): (dates, tickers) prices, NaN where a ticker has no row.
+        rule (str | callable): A name in signal_functions, or a signal function.
+        params (dict): Keyword arguments for the signal function.
+        hold (int): Days a position is kept after the last signal.
+        max_positions (int): Cap on simultaneous positions (None for no cap).
+        cash (float): Starting cash.
+        returns (np.ndarray): Precomputed daily_returns(prices), to avoid recomputing it.
+        seed (int): Tie-break order for max_positions (see positions).
+
+    Returns:
+        dict: Summary metrics (see summarize).
+    """
+    signal_function = signal_functions[rule] if isinstance(rule, str) else rule
+    with np.errstate(invalid='ignore'):
+        signal = signal_function(prices, **(params or {}))
+    weights = positions(signal, prices, hold, max_positions, seed)
+    if returns is None:
+        returns = daily_returns(prices)
+    return summarize(*simulate(weights, returns, cash), cash=cash)
+
+
+def parameter_grid(grid):
+    """
+    Expands {"param": [values]} into a list of parameter dicts.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def _init_worker(shm_name, shape):
+    """
+    Attaches a sweep worker to the shared price matrix (once per process, not per task).
+    """
+    global _shm, _prices, _returns
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _prices = np.ndarray(shape, dtype=np.float64, buffer=_shm.buf)
+    _returns = daily_returns(_prices)
+
+
+def _run_chunk(tasks):
+    results = []
+    for rule, params, cash in tasks:
+        params = dict(params)
+        hold = params.pop("hold", 1)
+        max_positions = params.pop("max_positions", None)
+        results.append(backtest(_prices, rule, params, hold, max_positions, cash, returns=_returns))
+    return results
+
+
+def sweep(prices, rule, grid, cash=starting_cash, workers=None):
+    """
+    Backtests every parameter combination in a grid on a process pool.
+
+    The price matrix is placed in shared memory once; workers receive only
+    parameter dicts. "hold" and "max_positions" in the grid are position
+    settings, all other keys are passed to the signal function.
+
+    Args:
+        prices (np.ndarray): (dates, tickers) prices.
+        rule (str): A name in signal_functions (must be importable by the workers).
+        grid (dict): {"param": [values]}.
+        cash (float): Starting cash.
+        workers (int): Pool size (defaults to the core count).
+
+    Returns:
+        list: (params, metrics) pairs in grid order.
+    """
+    combos = parameter_grid(grid)
+    tasks = [(rule, combo, cash) for combo in combos]
+    chunks = [tasks[i:i + sweep_chunk_size] for i in range(0, len(tasks), sweep_chunk_size)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks) or 1))
+
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, prices.nbytes))
+    try:
+        shared = np.ndarray(prices.shape, dtype=np.float64, buffer=shm.buf)
+        shared[...] = prices
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(shm.name, prices.shape)) as pool:
+            # map() yields chunks in submission order, so results line up with combos
+            metrics = [m for chunk_result in pool.map(_run_chunk, chunks) for m in chunk_result]
+        del shared
+    finally:
+        shm.close()
+        shm.unlink()
+    return list(zip(combos, metrics))
+
+
+def load_prices(data_dir="data"):
+    """
+    Loads the universe price matrix (from the panel if migrated, otherwise the CSVs).
+    """
+    import panel
+    import screen
+    price_panel = panel.open_current(data_dir)
+    if price_panel is not None:
+        universe = screen.Universe.from_panel(price_panel)
+    else:
+        import model
+        universe = screen.Universe.from_stock_data(model.load_data(data_dir))
+    return universe.symbols, universe.dates, np.asarray(universe.prices, dtype=np.float64)
+
+
+def write_results(rule, results, path=results_file, sort_by="sharpe"):
+    """
+    Writes sweep results best-first, one line per parameter set.
+    """
+    ranked = sorted(results, key=lambda item: item[1][sort_by], reverse=True)
+    with open(path, 'w') as f:
+        for params, m in ranked:
+            f.write(f"{rule} {json.dumps(params)}: CAGR {m['cagr'] * 100:.2f}%, Sharpe {m['sharpe']:.2f}, "
+                    f"Max Drawdown {m['max_drawdown'] * 100:.2f}%, Turnover {m['turnover']:.2f}, "
+                    f"Brokerage ${m['brokerage']:.2f}, Final Value ${m['final_value']:.2f}\n")
+    return ranked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the buy/decline rules over the stored price history.")
+    parser.add_argument("rule", nargs="?", default="decline", choices=sorted(signal_functions))
+    parser.add_argument("--params", type=json.loads, default=None, help='signal parameters as JSON, e.g. \'{"threshold": 10}\'')
+    parser.add_argument("--hold", type=int, default=1)
+    parser.add_argument("--sweep", action="store_true", help="sweep the default parameter grid for the rule")
+    parser.add_argument("--grid", type=json.loads, default=None, help="custom sweep grid as JSON")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cash", type=float, default=starting_cash)
+    args = parser.parse_args(argv)
+
+    symbols, dates, prices = load_prices()
+    if args.sweep or args.grid:
+        results = sweep(prices, args.rule, args.grid or default_grids[args.rule], args.cash, args.workers)
+        ranked = write_results(args.rule, results)
+        print(f"Backtested {len(results)} parameter sets over {len(symbols)} tickers; results in {results_file}")
+        best_params, best = ranked[0]
+        print(f"Best: {json.dumps(best_params)} Sharpe {best['sharpe']:.2f}, CAGR {best['cagr'] * 100:.2f}%")
+    else:
+        m = backtest(prices, args.rule, args.params, args.hold, cash=args.cash)
+        for name, value in m.items():
+            print(f"{name}: {value:.4f}")
+
+if __name__ == "__main__":
+    main()
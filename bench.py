@@ -0,0 +1,299 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import itertools
+import statistics
+import subprocess
+import tracemalloc
+import contextlib
+from datetime import date, datetime
+import numpy as np
+
+# Default benchmark sizes (modify as needed)
+default_tickers = [100, 1000]
+default_rows = [20, 252]
+default_repeat = 3
+default_seed = 7
+
+# Fraction of tickers held in the generated portfolio
+portfolio_fraction = 0.05
+
+# Last trading day of every generated history
+end_date = "2024-03-28"
+
+# Results of the latest run, and how much slower a path may get before --compare flags it
+results_file = "bench_results.json"
+regression_threshold = 0.10
+noise_floor = 0.005  # Seconds; smaller differences are timer noise
+
+# Hot paths, in the order they run in the daily scripts
+bench_paths = ["model.load_data", "down.scan_declines", "model.analyze_data", "model.analyze_portfolio",
+               "port.load_data", "port.analyze_portfolio"]
+
+
+def ticker_code(i):
+    """
+    Deterministic code for ticker number i: AAA, AAB, ... ZZZ, then AAAA, ...
+    """
+    width = 3
+    while i >= 26 ** width:
+        i -= 26 ** width
+        width += 1
+    letters = ""
+    for _ in range(width):
+        letters = chr(ord('A') + i % 26) + letters
+        i //= 26
+    return letters
+
+
+def trading_days(n_rows, end=end_date):
+    """
+    The last n_rows weekdays up to and including `end`, oldest first.
+    """
+    end_day = np.busday_offset(np.datetime64(end, 'D'), 0, roll='backward')
+    return np.busday_offset(end_day, -np.arange(n_rows)[::-1], roll='backward')
+
+
+def ticker_prices(i, n_rows, seed=default_seed):
+    """
+    Geometric random walk for ticker i; the same ticker gets the same path at any universe size.
+    """
+    rng = np.random.default_rng([seed, i])
+    start = rng.lognormal(mean=1.5, sigma=1.2)
+    drift, volatility = rng.normal(0.0002, 0.0005), rng.uniform(0.01, 0.04)
+    return start * np.exp(np.cumsum(rng.normal(drift, volatility, n_rows)))
+
+
+def generate_universe(root, n_tickers, n_rows, seed=default_seed):
+    """
+    Writes a synthetic tree in the layouts the scripts read.
+
+    Creates root/data/<CODE>/stock_data.csv (date,price), root/stock_data/<CODE>.csv
+    (Date,Close, for port.py), root/companies.csv and root/portfolio.json.
+
+    Returns:
+        list: The generated codes.
+    """
+    days = [str(d) for d in trading_days(n_rows)]
+    codes = [ticker_code(i) for i in range(n_tickers)]
+    os.makedirs(os.path.join(root, "stock_data"), exist_ok=True)
+
+    for i, code in enumerate(codes):
+        prices = ticker_prices(i, n_rows, seed)
+        rows = "".join(f"{d},{p!r}\n" for d, p in zip(days, prices.tolist()))
+        folder = os.path.join(root, "data", code)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, "stock_data.csv"), 'w') as f:
+            f.write("date,price\n" + rows)
+        with open(os.path.join(root, "stock_data", f"{code}.csv"), 'w') as f:
+            f.write("Date,Close\n" + rows)
+
+    with open(os.path.join(root, "companies.csv"), 'w') as f:
+        f.write('"Company name","Code",\n')
+        f.writelines(f'"SYNTHETIC COMPANY {code} LIMITED","{code}",\n' for code in codes)
+
+    rng = np.random.default_rng([seed, n_tickers])
+    held = rng.choice(n_tickers, size=max(1, int(n_tickers * portfolio_fraction)), replace=False)
+    portfolio = {codes[i]: int(rng.integers(1, 50)) * 10 for i in sorted(held)}
+    with open(os.path.join(root, "portfolio.json"), 'w') as f:
+        json.dump(portfolio, f, indent=4)
+    return codes
+
+
+def clear_state():
+    """
+    Removes the state the hot paths carry from one run to the next in the working
+    directory: the optimizer warm start and the correlation running sums.
+    """
+    import optimizer
+    import correlation
+
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(optimizer.state_file)
+    shutil.rmtree(correlation.state_dir, ignore_errors=True)
+
+
+def measure(func, repeat=default_repeat, reset=None):
+    """
+    Times `repeat` cold calls and one warm call, then makes one more cold call
+    under tracemalloc for the peak.
+
+    A cold call starts after `reset()`, so no repeat is sped up by state an
+    earlier one left behind. The warm call runs straight after the last cold
+    call and reuses its state, as a second daily run would. The reset itself
+    is not timed. Timing and tracing are separate because tracemalloc slows
+    allocation-heavy code.
+
+    Returns:
+        tuple: (list of cold seconds per call, warm seconds, peak traced bytes, last return value).
+    """
+    seconds = []
+    result = None
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        result = func()
+        seconds.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    func()
+    warm = time.perf_counter() - start
+    if reset is not None:
+        reset()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, warm, peak, result
+
+
+def run_paths(root, repeat=default_repeat, paths=bench_paths):
+    """
+    Runs each hot path against the tree in `root` (which becomes the working directory).
+
+    Returns:
+        list: {"path", "seconds", "best", "median", "warm", "peak_bytes"} dicts; the
+              timings in "seconds" are cold (see measure).
+    """
+    import model
+    import down
+    import port
+
+    results = []
+    previous = os.getcwd()
+    os.chdir(root)
+    try:
+        portfolio = model.load_portfolio("portfolio.json")
+        loaded = {}
+        steps = {
+            "model.load_data": lambda: model.load_data("data"),
+            "down.scan_declines": lambda: down.scan_declines("data"),
+            "model.analyze_data": lambda: model.analyze_data(loaded["model"]),
+            "model.analyze_portfolio": lambda: model.analyze_portfolio(portfolio, loaded["model"]),
+            "port.load_data": lambda: port.load_data("stock_data", codes=portfolio,
+                                                     start=port.history_start(today=date.fromisoformat(end_date))),
+            "port.analyze_portfolio": lambda: port.analyze_portfolio(portfolio, loaded["port"]),
+        }
+        for path in paths:
+            # The scripts print progress; keep it out of the benchmark output
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                seconds, warm, peak, value = measure(steps[path], repeat, clear_state)
+            if path == "model.load_data":
+                loaded["model"] = value
+            elif path == "port.load_data":
+                loaded["port"] = value
+            results.append({"path": path, "seconds": seconds, "best": min(seconds),
+                            "median": statistics.median(seconds), "warm": warm, "peak_bytes": peak})
+    finally:
+        os.chdir(previous)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmarks(tickers=default_tickers, rows=default_rows, repeat=default_repeat, seed=default_seed,
+                   paths=bench_paths, work_dir=None, keep=False):
+    """
+    Generates each universe size in turn and benchmarks every hot path on it.
+
+    Returns:
+        dict: {"meta": {...}, "results": [...]} ready to be written as JSON.
+    """
+    runs = []
+    for n_tickers, n_rows in itertools.product(tickers, rows):
+        root = tempfile.mkdtemp(prefix=f"bench_{n_tickers}x{n_rows}_", dir=work_dir)
+        try:
+            start = time.perf_counter()
+            generate_universe(root, n_tickers, n_rows, seed)
+            generated = time.perf_counter() - start
+            print(f"{n_tickers} tickers x {n_rows} rows (generated in {generated:.1f}s)")
+            for result in run_paths(root, repeat, paths):
+                result.update({"tickers": n_tickers, "rows": n_rows})
+                runs.append(result)
+                print(f"  {result['path']:<26} best {result['best']:8.3f}s  median {result['median']:8.3f}s  "
+                      f"warm {result['warm']:8.3f}s  peak {result['peak_bytes'] / 1e6:9.1f} MB")
+        finally:
+            if not keep:
+                shutil.rmtree(root, ignore_errors=True)
+            else:
+                print(f"  kept {root}")
+
+    meta = {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "seed": seed,
+    }
+    return {"meta": meta, "results": runs}
+
+
+def compare(current, baseline, threshold=regression_threshold):
+    """
+    Compares best times against a baseline run.
+
+    Returns:
+        list: (path, tickers, rows, baseline seconds, current seconds, ratio) for
+              every path that got slower than 1 + threshold.
+    """
+    base = {(r["path"], r["tickers"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        old = base.get((r["path"], r["tickers"], r["rows"]))
+        if old is None or old["best"] <= 0:
+            continue
+        ratio = r["best"] / old["best"]
+        if ratio > 1 + threshold and r["best"] - old["best"] > noise_floor:
+            regressions.append((r["path"], r["tickers"], r["rows"], old["best"], r["best"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the load/scan/analyze hot paths on synthetic universes.")
+    parser.add_argument("--tickers", type=int, nargs="+", default=default_tickers)
+    parser.add_argument("--rows", type=int, nargs="+", default=default_rows, help="rows per ticker (252 per year)")
+    parser.add_argument("--repeat", type=int, default=default_repeat)
+    parser.add_argument("--seed", type=int, default=default_seed)
+    parser.add_argument("--paths", nargs="+", default=bench_paths, choices=bench_paths)
+    parser.add_argument("--output", default=results_file)
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=regression_threshold)
+    parser.add_argument("--dir", default=None, help="where to generate the synthetic trees (default: system temp)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated trees")
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.tickers, args.rows, args.repeat, args.seed, args.paths, args.dir, args.keep)
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        for path, n_tickers, n_rows, old, new, ratio in regressions:
+            print(f"Regression: {path} at {n_tickers} x {n_rows}: {old:.3f}s -> {new:.3f}s ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
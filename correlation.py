@@ -0,0 +1,487 @@
+import os
+import json
+import argparse
+import numpy as np
+import metrics
+import symbols
+
+# Correlation settings (modify as needed)
+lookback_days = 250  # Daily returns in the rolling window
+min_overlap = 10  # Shared returns a pair needs before its correlation is reported
+block_size = 256  # Tickers per block; bounds the temporaries of each matrix product
+
+# Concentration report settings
+cluster_threshold = 0.5  # Holdings whose average correlation is at least this are clustered together
+max_cluster_weight = 0.30  # Share of portfolio value above which a multi-stock cluster is flagged
+top_pairs = 10  # Most correlated holding pairs listed
+
+# Running sums and the returns window live here as .npy memmaps, next to meta.json
+state_dir = "correlation"
+meta_file = "meta.json"
+window_file = "window.npy"
+report_file = "portfolio_correlation.txt"
+
+# Pairwise running sums over the returns both tickers have:
+#   n[i, j] = count, sx[i, j] = sum of x_i, sxx[i, j] = sum of x_i^2, sxy[i, j] = sum of x_i * x_j
+sum_names = ("n", "sx", "sxx", "sxy")
+
+
+def daily_returns(prices):
+    """
+    Simple returns per (date, ticker); NaN unless both days have a price.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return prices[1:] / prices[:-1] - 1
+
+
+def _unchanged_rows(a, b):
+    """
+    True for each row where two returns arrays agree, NaN matching NaN.
+    """
+    return ((a == b) | (np.isnan(a) & np.isnan(b))).all(axis=1)
+
+
+def _blocks(n, size=block_size):
+    return [slice(start, min(start + size, n)) for start in range(0, n, size)]
+
+
+def accumulate(sums, returns, sign=1.0, size=block_size):
+    """
+    Adds (sign=1) or removes (sign=-1) rows of returns from the pairwise sums, block by block.
+
+    Only one (rows x block) pair of operands and one (block x block) product
+    exist at a time, so extra memory does not grow with the universe. n and
+    sxy are symmetric, so only their upper blocks are multiplied.
+
+    Args:
+        sums (dict): The four (tickers x tickers) arrays, updated in place.
+        returns (np.ndarray): (rows, tickers) returns, NaN where missing.
+    """
+    valid = ~np.isnan(returns)
+    x = np.where(valid, returns, 0.0)
+    m = valid.astype(np.float64)
+    blocks = _blocks(returns.shape[1], size)
+    for bi, i in enumerate(blocks):
+        xi, mi = x[:, i], m[:, i]
+        for j in blocks[bi:]:
+            xj, mj = x[:, j], m[:, j]
+            n = sign * (mi.T @ mj)
+            sxy = sign * (xi.T @ xj)
+            sums["n"][i, j] += n
+            sums["sxy"][i, j] += sxy
+            sums["sx"][i, j] += sign * (xi.T @ mj)
+            sums["sxx"][i, j] += sign * ((xi * xi).T @ mj)
+            if j != i:
+                sums["n"][j, i] += n.T
+                sums["sxy"][j, i] += sxy.T
+                sums["sx"][j, i] += sign * (xj.T @ mi)
+                sums["sxx"][j, i] += sign * ((xj * xj).T @ mi)
+
+
+def correlation_from_sums(n, sx, sxx, sxy, sx_t, sxx_t, overlap=min_overlap):
+    """
+    Pearson correlations from pairwise sums (the _t arrays are the transposed blocks of sx and sxx).
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x, mean_y = sx / n, sx_t / n
+        cov = sxy / n - mean_x * mean_y
+        var = (sxx / n - mean_x ** 2) * (sxx_t / n - mean_y ** 2)
+        corr = cov / np.sqrt(var)
+    corr[(n < overlap) | ~(var > 0)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+class RunningCorrelation:
+    """
+    Ticker x ticker return correlations kept as running sums over a rolling window.
+
+    Appending a day adds that day's returns and removes the day leaving the
+    window, O(tickers^2) instead of O(days x tickers^2) for a full recompute.
+
+    The returns that went into the sums are kept in a (lookback x tickers)
+    ring, so a day leaving the window is subtracted exactly as it was added,
+    even if its prices have been corrected since.
+
+    Args:
+        symbols (list): Ticker per row/column.
+        dates (list): 'YYYY-MM-DD' return dates in the window, oldest first.
+        sums (dict): The running sums (arrays or memmaps).
+        window (np.ndarray): (lookback, tickers) ring of the returns in the sums.
+        start (int): Ring slot of the oldest date.
+        lookback (int): Window length in returns.
+    """
+
+    def __init__(self, symbols, dates, sums, window, start=0, lookback=lookback_days, path=None):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.dates = list(dates)
+        self.sums = sums
+        self.window = window
+        self.start = start
+        self.lookback = lookback
+        self.path = path
+
+    @classmethod
+    def build(cls, symbols, dates, returns, lookback=lookback_days, path=None):
+        """
+        Accumulates the last `lookback` rows of returns from scratch.
+
+        With a path the sums are memmapped .npy files there, so they need not fit in RAM.
+        """
+        n = len(symbols)
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            sums = {name: np.lib.format.open_memmap(os.path.join(path, f"{name}.npy"), mode='w+',
+                                                    dtype=np.float64, shape=(n, n)) for name in sum_names}
+            for array in sums.values():
+                array[:] = 0.0
+            window = np.lib.format.open_memmap(os.path.join(path, window_file), mode='w+',
+                                               dtype=np.float64, shape=(lookback, n))
+        else:
+            sums = {name: np.zeros((n, n)) for name in sum_names}
+            window = np.empty((lookback, n))
+        window[:] = np.nan
+        state = cls(symbols, [], sums, window, 0, lookback, path)
+        state._write_meta("updating")
+        first = max(0, len(dates) - lookback)
+        accumulate(sums, returns[first:])
+        window[:len(dates) - first] = returns[first:]
+        state.dates = list(dates[first:])
+        state.save()
+        return state
+
+    @classmethod
+    def load(cls, path=state_dir):
+        """
+        Opens saved sums, or returns None if there are none or an update was interrupted.
+        """
+        try:
+            with open(os.path.join(path, meta_file), 'r') as f:
+                meta = json.load(f)
+            if meta.get("status") != "ok":
+                return None
+            sums = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r+') for name in sum_names}
+            window = np.load(os.path.join(path, window_file), mmap_mode='r+')
+            start = meta["start"]
+        except (FileNotFoundError, json.JSONDecodeError, ValueError, KeyError):
+            return None
+        return cls(meta["symbols"], meta["dates"], sums, window, start, meta["lookback"], path)
+
+    def _write_meta(self, status):
+        if self.path is None:
+            return
+        meta = {"status": status, "symbols": self.symbols, "dates": self.dates, "start": self.start,
+                "lookback": self.lookback}
+        tmp_path = os.path.join(self.path, meta_file + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, meta_file))
+
+    def save(self):
+        if self.path is None:
+            return
+        for array in list(self.sums.values()) + [self.window]:
+            if isinstance(array, np.memmap):
+                array.flush()
+        self._write_meta("ok")
+
+    def _slots(self, first, count):
+        return (self.start + first + np.arange(count)) % self.lookback
+
+    def window_rows(self):
+        """
+        The returns in the sums, one row per date in the window, oldest first.
+        """
+        return self.window[self._slots(0, len(self.dates))]
+
+    def add_days(self, dates, rows):
+        """
+        Adds new days' returns and removes the days that fall out of the window.
+
+        Costs O(tickers^2) per day whatever the window length; several days
+        are applied as one batch of matrix products.
+
+        Args:
+            dates (list): New return dates, 'YYYY-MM-DD', after the last one in the window.
+            rows (np.ndarray): (len(dates), tickers) returns for those dates.
+        """
+        overflow = max(0, len(self.dates) + len(dates) - self.lookback)
+        if overflow > len(self.dates):
+            raise ValueError("More new days than the window holds; rebuild instead")
+        if overflow:
+            accumulate(self.sums, self.window[self._slots(0, overflow)], sign=-1.0)
+        accumulate(self.sums, rows)
+        # The new days take the slots just after the newest one, i.e. those the dropped days freed
+        self.window[self._slots(len(self.dates), len(dates))] = rows
+        self.start = (self.start + overflow) % self.lookback
+        self.dates = self.dates[overflow:] + list(dates)
+
+    def revise(self, rows):
+        """
+        Replaces the returns of the days already in the window, e.g. after a price was backfilled.
+
+        Only the days whose returns changed are subtracted and re-added.
+
+        Args:
+            rows (np.ndarray): (len(self.dates), tickers) current returns for the window's dates.
+
+        Returns:
+            int: Number of days revised.
+        """
+        stored = self.window_rows()
+        changed = ~_unchanged_rows(stored, rows)
+        if changed.any():
+            accumulate(self.sums, stored[changed], sign=-1.0)
+            accumulate(self.sums, rows[changed])
+            self.window[self._slots(0, len(self.dates))[changed]] = rows[changed]
+        return int(changed.sum())
+
+    def submatrix(self, codes, overlap=min_overlap):
+        """
+        Correlation matrix for a few tickers, straight from the sums.
+        """
+        idx = np.array([self.index[code] for code in codes], dtype=int)
+        take = {name: np.asarray(self.sums[name])[np.ix_(idx, idx)] for name in sum_names}
+        corr = correlation_from_sums(take["n"], take["sx"], take["sxx"], take["sxy"],
+                                     take["sx"].T, take["sxx"].T, overlap)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+    def matrix(self, out=None, overlap=min_overlap, size=block_size):
+        """
+        The full correlation matrix, computed block by block into `out` (e.g. a memmap).
+        """
+        n = len(self.symbols)
+        out = np.empty((n, n)) if out is None else out
+        s = self.sums
+        for i in _blocks(n, size):
+            for j in _blocks(n, size):
+                out[i, j] = correlation_from_sums(s["n"][i, j], s["sx"][i, j], s["sxx"][i, j], s["sxy"][i, j],
+                                                  s["sx"][j, i].T, s["sxx"][j, i].T, overlap)
+        diagonal = np.arange(n)
+        out[diagonal, diagonal] = np.where(np.asarray(s["n"])[diagonal, diagonal] >= overlap, 1.0, np.nan)
+        return out
+
+
+def _day_strings(dates):
+    return [str(day) for day in np.asarray(dates).astype('datetime64[D]')]
+
+
+def update(universe, path=state_dir, lookback=lookback_days):
+    """
+    Brings the saved running sums up to the universe's last date.
+
+    Days already in the window whose returns changed (a backfilled or repaired
+    price) are revised, and new days are added incrementally. The sums are
+    rebuilt when there is no usable state, the tickers changed, or the window's
+    dates are no longer a run of consecutive universe dates.
+
+    Args:
+        universe (screen.Universe): Aligned prices.
+
+    Returns:
+        RunningCorrelation: The updated state.
+    """
+    days = _day_strings(universe.dates)[1:]  # Returns are dated by their second day
+    returns = daily_returns(np.asarray(universe.prices, dtype=np.float64))
+    position = {day: k for k, day in enumerate(days)}
+
+    state = RunningCorrelation.load(path)
+    usable = (state is not None and state.symbols == list(universe.symbols) and state.lookback == lookback
+              and state.dates and state.dates[-1] in position)
+    if usable:
+        last = position[state.dates[-1]]
+        usable = days[last + 1 - len(state.dates):last + 1] == state.dates
+    if not usable:
+        with metrics.timer("correlation_build_seconds"):
+            return RunningCorrelation.build(universe.symbols, days, returns, lookback, path)
+
+    new_days = [day for day in days if day > state.dates[-1]]
+    if len(new_days) >= lookback:
+        with metrics.timer("correlation_build_seconds"):
+            return RunningCorrelation.build(universe.symbols, days, returns, lookback, path)
+    first = position[state.dates[0]]
+    current = returns[first:first + len(state.dates)]
+    if new_days or not _unchanged_rows(state.window_rows(), current).all():
+        state._write_meta("updating")
+        with metrics.timer("correlation_update_seconds"):
+            metrics.count("correlation_revised_days", state.revise(current))
+            if new_days:
+                state.add_days(new_days, returns[[position[day] for day in new_days]])
+        state.save()
+    return state
+
+
+def cluster(corr, threshold=cluster_threshold):
+    """
+    Average-linkage hierarchical clustering cut where average correlation falls below `threshold`.
+
+    Uses scipy when it is installed and a small built-in version otherwise.
+    Pairs without enough shared history count as uncorrelated.
+
+    Returns:
+        np.ndarray: Cluster label per row, numbered in order of first appearance.
+    """
+    n = len(corr)
+    if n < 2:
+        return np.zeros(n, dtype=int)
+    distance = 1.0 - np.nan_to_num(corr, nan=0.0)
+    np.fill_diagonal(distance, 0.0)
+    distance = (distance + distance.T) / 2
+    try:
+        from scipy.cluster.hierarchy import linkage, fcluster
+        from scipy.spatial.distance import squareform
+    except ImportError:
+        labels = _average_linkage(distance, 1.0 - threshold)
+    else:
+        tree = linkage(squareform(distance, checks=False), method='average')
+        labels = fcluster(tree, t=1.0 - threshold, criterion='distance')
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    order = np.argsort(np.argsort(first))
+    return order[inverse]
+
+
+def _average_linkage(distance, cut):
+    clusters = [[i] for i in range(len(distance))]
+    while len(clusters) > 1:
+        best, pair = None, None
+        for a in range(len(clusters)):
+            for b in range(a + 1, len(clusters)):
+                d = distance[np.ix_(clusters[a], clusters[b])].mean()
+                if best is None or d < best:
+                    best, pair = d, (a, b)
+        if best > cut:
+            break
+        a, b = pair
+        clusters[a] += clusters.pop(b)
+    labels = np.empty(len(distance), dtype=int)
+    for label, members in enumerate(clusters):
+        labels[members] = label
+    return labels
+
+
+def _last_prices(universe):
+    prices = np.asarray(universe.prices, dtype=np.float64)
+    valid = ~np.isnan(prices)
+    rows = prices.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+    return np.where(valid.any(axis=0), prices[rows, np.arange(prices.shape[1])], np.nan)
+
+
+def analyze(universe, portfolio, path=state_dir, lookback=lookback_days, threshold=cluster_threshold):
+    """
+    Updates the correlation state and measures how concentrated the holdings are.
+
+    Returns:
+        dict: {"codes", "weights", "corr", "clusters": [{"members", "weight", "average_correlation"}],
+               "pairs", "average_correlation", "missing", "days"}.
+    """
+    if len(universe.dates) < 2:
+        return None
+    state = update(universe, path, lookback)
+    last = _last_prices(universe)
+    codes, values, missing = [], [], []
+    for code, quantity in portfolio.items():
+        i = state.index.get(code)
+        if i is None or not np.isfinite(last[i]):
+            missing.append(code)
+            continue
+        codes.append(code)
+        values.append(last[i] * quantity)
+    if not codes:
+        return None
+    weights = np.array(values) / sum(values)
+    corr = state.submatrix(codes)
+    labels = cluster(corr, threshold)
+
+    clusters = []
+    for label in range(labels.max() + 1):
+        members = np.flatnonzero(labels == label)
+        inner = corr[np.ix_(members, members)][~np.eye(len(members), dtype=bool)]
+        clusters.append({
+            "members": [codes[k] for k in members[np.argsort(-weights[members])]],
+            "weight": float(weights[members].sum()),
+            "average_correlation": float(np.nanmean(inner)) if len(members) > 1 and np.isfinite(inner).any() else None,
+        })
+    clusters.sort(key=lambda c: c["weight"], reverse=True)
+
+    upper = np.triu_indices(len(codes), 1)
+    finite = np.isfinite(corr[upper])
+    ranked = np.argsort(-corr[upper][finite])[:top_pairs]
+    pairs = [(codes[upper[0][finite][k]], codes[upper[1][finite][k]], float(corr[upper][finite][k])) for k in ranked]
+
+    # Value-weighted average correlation between different holdings
+    off = np.nan_to_num(corr, nan=0.0) * ~np.eye(len(codes), dtype=bool)
+    spread = 1.0 - float(weights @ weights)
+    average = float(weights @ off @ weights) / spread if spread > 0 else None
+
+    return {"codes": codes, "weights": weights, "corr": corr, "clusters": clusters, "pairs": pairs,
+            "average_correlation": average, "missing": missing, "days": len(state.dates)}
+
+
+def write_report(result, path=report_file, limit=max_cluster_weight):
+    """
+    Writes the clusters (largest weight first), flagging concentrated ones, then the top pairs.
+    """
+    with open(path, 'w') as f:
+        if result is None:
+            f.write("Not enough price history for a correlation report.\n")
+            return
+        registry = symbols.load()
+        f.write(f"Holdings correlation over {result['days']} daily returns "
+                f"(clusters: average correlation >= {cluster_threshold:g})\n")
+        if result["average_correlation"] is not None:
+            f.write(f"Value-weighted average correlation between holdings: {result['average_correlation']:.2f}\n")
+        f.write("\nClusters:\n")
+        for c in result["clusters"]:
+            flag = "  <-- CONCENTRATED" if len(c["members"]) > 1 and c["weight"] > limit else ""
+            average = f", average correlation {c['average_correlation']:.2f}" if c["average_correlation"] is not None else ""
+            size = f"{len(c['members'])} stocks" if len(c["members"]) > 1 else "1 stock"
+            f.write(f"{c['weight'] * 100:6.2f}% in {size}{average}{flag}\n")
+            f.write("        " + ", ".join(f"{code} ({registry.name(code)})" for code in c["members"]) + "\n")
+        f.write("\nMost correlated pairs:\n")
+        for a, b, value in result["pairs"]:
+            f.write(f"  {a} / {b}: {value:.2f}\n")
+        if result["missing"]:
+            f.write(f"\nNo price data for: {', '.join(result['missing'])}\n")
+
+
+def load_universe():
+    """
+    The price panel if it has been migrated, otherwise the per-ticker CSV files.
+    """
+    import panel
+    import screen
+    price_panel = panel.open_current("data")
+    if price_panel is not None:
+        return screen.Universe.from_panel(price_panel)
+    import model
+    return screen.Universe.from_stock_data(model.load_data("data"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update the correlation matrix and report portfolio concentration.")
+    parser.add_argument("--portfolio", default="portfolio.json")
+    parser.add_argument("--lookback", type=int, default=lookback_days)
+    parser.add_argument("--rebuild", action="store_true", help="recompute the running sums from scratch")
+    parser.add_argument("--matrix", action="store_true", help=f"also write the full matrix to {state_dir}/corr.npy")
+    args = parser.parse_args(argv)
+
+    universe = load_universe()
+    if args.rebuild and os.path.exists(os.path.join(state_dir, meta_file)):
+        os.remove(os.path.join(state_dir, meta_file))
+    with open(args.portfolio, 'r') as f:
+        portfolio = json.load(f)
+    result = analyze(universe, portfolio, lookback=args.lookback)
+    write_report(result)
+    state = RunningCorrelation.load(state_dir) if args.matrix else None
+    if args.matrix and state is None:
+        print("Not enough price history for a correlation matrix")
+    elif args.matrix:
+        n = len(state.symbols)
+        out = np.lib.format.open_memmap(os.path.join(state_dir, "corr.npy"), mode='w+', dtype=np.float64, shape=(n, n))
+        state.matrix(out)
+        out.flush()
+    print(f"Correlation report written to {report_file}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
-from datetime import datetime
-import tkinter as tk
+from datetime import date, datetime
 import csv
 import os
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import time
+import metrics
+import symbols
 
 # Specify the data directory path (modify as needed)
 data_dir = "data"
@@ -13,8 +13,21 @@ output_file = "output.txt"  # Path to the output file
 # Define the number of recent entries to consider (2 in this case)
 num_recent_entries = 2
 
+# Decline windows in trading days; the first one decides which tickers are listed
+decline_windows = (1, 5, 20)
+
+# Bytes read per backwards step when seeking from the end of a file
+tail_block_size = 4096
+
 # Function to parse dates with flexible format handling
 def parse_date(date_str):
+    # Fast path for the canonical YYYY-MM-DD rows (and timestamped rows, whose
+    # first 10 characters are the local date); see validate.py
+    if len(date_str) == 10 or (len(date_str) > 10 and date_str[10] == ' '):
+        try:
+            return date.fromisoformat(date_str[:10])
+        except ValueError:
+            pass
     formats = ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S%z']  # Add more formats if needed
     for fmt in formats:
         try:
@@ -25,82 +38,129 @@ def parse_date(date_str):
 
 # Function to read company names from the companies file
 def read_company_names():
-    company_names = {}
-    with open(companies_file, 'r') as file:
-        reader = csv.reader(file, delimiter=',', quotechar='"')
-        for row in reader:
-            if len(row) == 2:
-                print(f"Reading company code: {row[0]}, Company name: {row[1]}")
-                company_names[row[0]] = row[1]
-    return company_names
+    """
+    Returns {code: company name} from the shared symbol registry (see symbols.py).
+    """
+    return symbols.load(companies_file).names_by_code()
 
 
 # Function to calculate percentage decrease
 def calculate_percentage_decrease(old_price, new_price):
     return ((old_price - new_price) / old_price) * 100
 
-# Get company names
-company_names_dict = read_company_names()
-
-# Open the output file for writing
-with open(output_file, 'w') as output:
-    # Loop through each folder in the data directory
-    for folder in os.listdir(data_dir):
-        folder_path = os.path.join(data_dir, folder)
-        if os.path.isdir(folder_path):  # Check if it's a directory
-
-            # Define the data file path
-            data_file = os.path.join(folder_path, "stock_data.csv")
-
-            # Check if the file exists
-            if os.path.exists(data_file):
-
-                try:
-                    # Open the file for reading
-                    with open(data_file, 'r') as file:
-                        reader = csv.reader(file)
-
-                        # Skip header row (assuming the first row is header)
-                        next(reader, None)
-
-                        # Track recent dates and prices
-                        recent_entries = []
-
-                        for row in reader:
-                            # Extract date and price from the row (modify this based on your data format)
-                            try:
-                                current_date = parse_date(row[0])
-                                current_price = float(row[1])  # Assuming price is in the second column
-                            except (ValueError, IndexError) as e:  # Handle potential formatting issues or index errors
-                                print(f"Error parsing data in {data_file}: {e}")
-                                continue
-
-                            # Add current entry to recent entries
-                            recent_entries.append((current_date, current_price))
-
-                            # Keep only the last num_recent_entries entries
-                            if len(recent_entries) > num_recent_entries:
-                                recent_entries.pop(0)
-
-                        # Check if the older entry has a higher price than the latest one
-                        if len(recent_entries) == num_recent_entries:
-                            older_date, older_price = recent_entries[0]
-                            latest_date, latest_price = recent_entries[1]
-                            if older_price > latest_price:
-                                # Get the company name from the folder name
-                                company_code = folder
-                                company_name = company_names_dict.get(company_code, "Unknown")
-                                # Calculate percentage decrease
-                                percentage_decrease = calculate_percentage_decrease(older_price, latest_price)
-                                # Write to output file
-                                output_line = f"Folder: {company_code} ({company_name}), Percentage Decrease: {percentage_decrease:.2f}%, Last Cost: {latest_price}\n"
-                                output.write(output_line)
-
-                except (IOError, csv.Error) as e:
-                    print(f"Error processing file {data_file}: {e}")
 
-            else:
-                print(f"File not found: {data_file}")
+def read_tail_lines(file_path, n):
+    """
+    Returns the last n non-empty lines of a file by seeking backwards from the end.
+
+    Only the trailing blocks that contain those lines are read, so the cost does
+    not depend on how much history the file holds.
+    """
+    with open(file_path, 'rb') as file:
+        file.seek(0, os.SEEK_END)
+        position = file.tell()
+        buffer = b''
+        # n lines need n + 1 newlines (the file may or may not end with one)
+        while position > 0 and buffer.count(b'\n') <= n:
+            step = min(tail_block_size, position)
+            position -= step
+            file.seek(position)
+            buffer = file.read(step) + buffer
+    metrics.count("bytes_read", len(buffer))
+    lines = [line for line in buffer.decode('utf-8', errors='replace').splitlines() if line.strip()]
+    if position > 0:
+        lines = lines[1:]  # The first line may be cut off mid-row
+    return lines[-n:]
+
+
+def read_recent_entries(file_path, n=num_recent_entries):
+    """
+    Decodes the last n (date, price) rows of a stock_data.csv file.
+
+    Args:
+        file_path (str): Path to the CSV file.
+        n (int): Number of trailing rows wanted.
+
+    Returns:
+        list: (date, price) tuples, oldest first. Header and malformed rows are skipped.
+    """
+    entries = []
+    for row in csv.reader(read_tail_lines(file_path, n)):
+        try:
+            entries.append((parse_date(row[0]), float(row[1])))
+        except (ValueError, IndexError):
+            continue  # Header row or a formatting issue
+    return entries
+
+
+def scan_declines(data_dir=data_dir, windows=decline_windows):
+    """
+    Computes the decline percentage over each window for every ticker in one pass.
+
+    Args:
+        data_dir (str): Path to the directory containing stock data folders.
+        windows (tuple): Look-back windows in trading days.
+
+    Returns:
+        list: (company_code, {window: percentage decrease or None}, last_price) tuples.
+    """
+    longest = max(windows)
+    results = []
+    for folder in sorted(os.listdir(data_dir)):
+        data_file = os.path.join(data_dir, folder, "stock_data.csv")
+        if not os.path.isfile(data_file):
+            continue
+        start = time.perf_counter()
+        try:
+            entries = read_recent_entries(data_file, longest + 1)
+            metrics.observe("read_seconds", time.perf_counter() - start, folder)
+            metrics.count("rows_parsed", len(entries))
+        except IOError as e:
+            print(f"Error processing file {data_file}: {e}")
+            continue
+        if len(entries) < 2:
+            continue
 
-# Print a message indicating that the output has been written to the file
-print(f"Output has been written to {output_file}")
+        latest_price = entries[-1][1]
+        declines = {}
+        for window in windows:
+            if len(entries) > window and entries[-1 - window][1]:
+                declines[window] = calculate_percentage_decrease(entries[-1 - window][1], latest_price)
+            else:
+                declines[window] = None
+        results.append((folder, declines, latest_price))
+    return results
+
+
+def write_declines(results, company_names_dict, windows=decline_windows, path=output_file):
+    """
+    Writes the tickers that fell over the first window, largest decline first.
+    """
+    primary = windows[0]
+    declined = [r for r in results if r[1][primary] is not None and r[1][primary] > 0]
+    declined.sort(key=lambda r: r[1][primary], reverse=True)
+
+    with open(path, 'w') as output:
+        for company_code, declines, latest_price in declined:
+            company_name = company_names_dict.get(company_code, "Unknown")
+            other = "".join(
+                f", {window}-Day Decrease: " + (f"{declines[window]:.2f}%" if declines[window] is not None else "n/a")
+                for window in windows[1:]
+            )
+            output.write(f"Folder: {company_code} ({company_name}), Percentage Decrease: {declines[primary]:.2f}%"
+                         f"{other}, Last Cost: {latest_price}\n")
+    return declined
+
+
+def main():
+    # Get company names
+    company_names_dict = read_company_names()
+
+    results = scan_declines(data_dir)
+    write_declines(results, company_names_dict)
+
+    # Print a message indicating that the output has been written to the file
+    print(f"Output has been written to {output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import metrics
+
+# Default engine settings (modify as needed)
+batch_size = 50  # Tickers per multi-symbol request
+max_workers = 4  # Concurrent batches in flight
+requests_per_second = 2.0  # Sustained request rate across all workers
+max_retries = 3  # Attempts per batch after the first one
+backoff_base = 1.0  # Seconds; doubled on every retry
+
+# Error reported for tickers the source returned nothing for
+no_data = "no data returned"
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to cap the request rate.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (int): Maximum burst size.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a token is available, then consumes it.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class YahooProvider:
+    """
+    Quote source backed by yfinance multi-symbol downloads.
+    """
+
+    suffix = ".AX"  # Append ".AX" for ASX listings
+
+    def fetch(self, codes, start=None, end=None, period="1d"):
+        """
+        Downloads daily history for several tickers in one request.
+
+        Args:
+            codes (list): Stock codes without the exchange suffix.
+            start (str): Optional first date, 'YYYY-MM-DD'. Overrides period.
+            end (str): Optional end date (exclusive), 'YYYY-MM-DD'.
+            period (str): yfinance period used when no start is given.
+
+        Returns:
+            dict: Stock code -> DataFrame with at least a 'Close' column.
+        """
+        import yfinance as yf  # Only needed when talking to the network
+        import pandas as pd
+
+        tickers = [f"{code}{self.suffix}" for code in codes]
+        if start:
+            frame = yf.download(tickers, start=start, end=end, group_by='ticker', threads=False, progress=False)
+        else:
+            frame = yf.download(tickers, period=period, group_by='ticker', threads=False, progress=False)
+
+        results = {}
+        for code, ticker in zip(codes, tickers):
+            if isinstance(frame.columns, pd.MultiIndex):
+                if ticker not in frame.columns.get_level_values(0):
+                    continue
+                data = frame[ticker]
+            else:
+                data = frame  # A single ticker comes back with flat columns
+            data = data.dropna(subset=['Close'])
+            if not data.empty:
+                results[code] = data
+        return results
+
+
+class FakeProvider:
+    """
+    Local quote source for tests and dry runs; never touches the network.
+
+    Args:
+        data (dict): Stock code -> DataFrame (or any object with a 'Close' column).
+        fail_codes (set): Codes that are always reported as missing.
+        flaky (int): Number of initial calls that raise, to exercise retries.
+    """
+
+    def __init__(self, data, fail_codes=(), flaky=0):
+        self.data = data
+        self.fail_codes = set(fail_codes)
+        self.flaky = flaky
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def fetch(self, codes, start=None, end=None, period="1d"):
+        with self.lock:
+            self.calls += 1
+            if self.calls <= self.flaky:
+                raise ConnectionError("simulated provider failure")
+        results = {}
+        for code in codes:
+            if code in self.fail_codes or code not in self.data:
+                continue
+            data = self.data[code]
+            if start is not None and hasattr(data, 'index'):
+                data = data[data.index >= start]
+            if end is not None and hasattr(data, 'index'):
+                data = data[data.index < end]
+            results[code] = data
+        return results
+
+
+class FetchResult:
+    """
+    Outcome of a bulk fetch.
+
+    Attributes:
+        data (dict): Stock code -> fetched DataFrame.
+        errors (dict): Stock code -> error message for tickers that failed.
+        batches (int): Number of batches issued.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.errors = {}
+        self.batches = 0
+
+    def __repr__(self):
+        return f"FetchResult(ok={len(self.data)}, errors={len(self.errors)}, batches={self.batches})"
+
+
+def make_batches(codes, size=batch_size):
+    """
+    Splits a list of codes into fixed-size batches.
+    """
+    return [codes[i:i + size] for i in range(0, len(codes), size)]
+
+
+def fetch_batch(provider, codes, limiter=None, retries=max_retries, backoff=backoff_base, **kwargs):
+    """
+    Fetches one batch with rate limiting and exponential-backoff retries.
+
+    Args:
+        provider: Object with a fetch(codes, **kwargs) method.
+        codes (list): Stock codes in this batch.
+        limiter (TokenBucket): Optional shared rate limiter.
+        retries (int): Retry attempts after the first failure.
+        backoff (float): Initial retry delay in seconds.
+
+    Returns:
+        dict: Stock code -> DataFrame for the tickers that came back.
+    """
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        start = time.perf_counter()
+        try:
+            data = provider.fetch(codes, **kwargs)
+        except Exception:
+            metrics.observe("fetch_latency_seconds", time.perf_counter() - start)
+            metrics.count("fetch_failures")
+            if attempt >= retries:
+                raise
+            metrics.count("fetch_retries")
+            # Full jitter keeps concurrent workers from retrying in lockstep
+            time.sleep(random.uniform(0, backoff * (2 ** attempt)))
+            attempt += 1
+        else:
+            metrics.observe("fetch_latency_seconds", time.perf_counter() - start)
+            metrics.count("fetch_requests")
+            metrics.count("tickers_fetched", len(data))
+            return data
+
+
+def fetch_all(codes, provider=None, size=batch_size, workers=max_workers, rate=requests_per_second,
+              retries=max_retries, backoff=backoff_base, progress=None, **kwargs):
+    """
+    Fetches many tickers as concurrent multi-symbol batches.
+
+    Args:
+        codes (list): Stock codes to fetch.
+        provider: Quote source; defaults to YahooProvider.
+        size (int): Tickers per batch.
+        workers (int): Maximum batches in flight.
+        rate (float): Requests per second across all workers (None disables limiting).
+        retries (int): Retry attempts per batch.
+        backoff (float): Initial retry delay in seconds.
+        progress: Optional callable invoked with the number of tickers finished per batch.
+        **kwargs: Passed through to provider.fetch (start, end, period).
+
+    Returns:
+        FetchResult: Fetched data plus per-ticker errors.
+    """
+    provider = provider if provider is not None else YahooProvider()
+    limiter = TokenBucket(rate) if rate else None
+    result = FetchResult()
+    batches = make_batches(list(codes), size)
+    result.batches = len(batches)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches) or 1))) as pool:
+        futures = {pool.submit(fetch_batch, provider, batch, limiter, retries, backoff, **kwargs): batch
+                   for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                data = future.result()
+            except Exception as e:
+                for code in batch:
+                    result.errors[code] = f"{type(e).__name__}: {e}"
+            else:
+                for code in batch:
+                    if code in data:
+                        result.data[code] = data[code]
+                    else:
+                        result.errors[code] = no_data
+            if progress is not None:
+                progress(len(batch))
+
+    return result
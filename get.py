@@ -1,47 +1,50 @@
 import os
-import yfinance as yf
-import csv
-from datetime import datetime
 from tqdm import tqdm
+import panel
+import ingest
+import indicators
+import alerts
 
-def fetch_stock_data(stock_code):
-    try:
-        stock = yf.Ticker(f"{stock_code}.AX")  # Append ".AX" for ASX listings
-        data = stock.history(period="1d")
-        return data
-    except Exception as e:
-        print(f"Error fetching data for {stock_code}: {e}")
-        return None
-
-def save_stock_data(stock_code, data):
-    if data is not None:
-        filename = f"data/{stock_code}/stock_data.csv"
-
-        # Open file in append mode
-        with open(filename, 'a', newline='') as f:
-            writer = csv.writer(f)
-
-            # Write header only if file is empty
-            if not os.path.exists(filename) or os.stat(filename).st_size == 0:
-                writer.writerow(['date', 'price'])
-
-            # Convert data to a list of lists for easier writing
-            data_list = [[date.strftime('%Y-%m-%d'), price] for date, price in data['Close'].items()]
-            writer.writerows(data_list)
-
-def update_stock_data():
+def update_stock_data(provider=None, today=None):
     data_directory = "data"
     stock_codes = [d for d in os.listdir(data_directory) if os.path.isdir(os.path.join(data_directory, d))]
 
     # Create a tqdm progress bar
     progress_bar = tqdm(total=len(stock_codes), desc="Updating stock data")
 
-    for stock_code in stock_codes:
-        stock_data = fetch_stock_data(stock_code)
-        save_stock_data(stock_code, stock_data)
-        progress_bar.update(1)  # Update progress bar
+    # Whether the panel mirrors the CSVs before this run writes to both
+    panel_current = panel.is_current(data_directory)
+
+    # Fetch only the dates each ticker is missing, as concurrent multi-symbol batches
+    new_prices, errors, skipped = ingest.ingest(stock_codes, provider=provider, today=today, progress=progress_bar.update)
     progress_bar.close()  # Close progress bar
 
+    for stock_code, error in sorted(errors.items()):
+        print(f"Error fetching data for {stock_code}: {error}")
+    print(f"{skipped} of {len(stock_codes)} tickers were already up to date")
+
+    update_panel(new_prices, data_directory, panel_current)
+    indicators.update_state(new_prices)
+    alerts.process_updates(new_prices)
+    return new_prices, errors
+
+
+def update_panel(new_prices, data_dir="data", was_current=True):
+    """
+    Appends each new trading day to the price panel in place (if it has been migrated).
+
+    A panel that had already drifted from the CSVs is rebuilt instead, since
+    appending would only paper over the difference.
+    """
+    if panel.open_panel() is None:
+        return
+    if not was_current:
+        panel.migrate_from_csv(data_dir)
+        return
+    for date in sorted(new_prices):
+        panel.append_day(date, new_prices[date])
+    panel.mark_current(data_dir)
+
 
 def main():
     update_stock_data()
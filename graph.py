@@ -2,22 +2,59 @@ import tkinter as tk
 from tkinter import ttk  # Optional for themed widgets
 import csv
 import os
-import matplotlib.pyplot as plt
+from functools import lru_cache
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import search
+import symbols
+import indicators
+
+# Most points drawn per chart; longer histories are downsampled with LTTB
+max_plot_points = 1000
+
+# Parsed price series kept in memory (least recently used ones are dropped)
+series_cache_size = 64
+
+# Milliseconds of typing inactivity before the search runs
+search_debounce_ms = 120
+
+# Maximum search results shown in the list
+max_search_results = 50
 
 
 def load_data(filename):
-    companies = []
-    with open(filename, 'r') as file:
-        reader = csv.reader(file)
-        next(reader)  # Skip header row
-        for row in reader:
-            companies.append({"name": row[0], "code": row[1]})
-    return companies
+    """
+    Returns [{"name": ..., "code": ...}] for every listed company, via the shared symbol registry.
+    """
+    return symbols.load(filename).companies()
+
+# Latest indicator values shown under the company details (label, indicators.IndicatorState.values() key)
+detail_indicators = (("SMA", "sma"), ("EMA", "ema"), ("RSI", "rsi"), ("MACD", "macd"),
+                     ("ATR", "atr"), ("Volatility", "rolling_volatility"))
+
+
+def indicator_summary(code):
+    """
+    The ticker's latest streaming indicator values, as kept current by get.py.
+
+    Read from the saved state in O(1), so selecting a company never recomputes
+    indicators over its history. Empty if there is no state for the ticker.
+    """
+    state = indicators.load_latest()
+    if state is None:
+        return ""
+    values, last_days = state.latest([code])
+    if np.isnat(last_days[0]):
+        return ""
+    shown = [f"{label} {values[name][0]:.4g}" for label, name in detail_indicators if np.isfinite(values[name][0])]
+    return f"Indicators as of {last_days[0]}: " + ", ".join(shown) if shown else ""
 
 
 def display_details(company):
-    details_label.config(text=f"Name: {company['name']}\nCode: {company['code']}")
+    summary = indicator_summary(company['code'])
+    details_label.config(text=f"Name: {company['name']}\nCode: {company['code']}" + (f"\n{summary}" if summary else ""))
 
 
 def create_folder(code):
@@ -27,82 +64,208 @@ def create_folder(code):
         
 
 
+def show_companies(items):
+    """
+    Fills the listbox with the given companies (the list the selection indexes into).
+    """
+    global visible_companies
+    visible_companies = items
+    company_listbox.delete(0, tk.END)
+    for company in items:
+        company_listbox.insert(tk.END, f"{company['name']} ({company['code']})")
+
+
 def on_select(event):
     if company_listbox.curselection():
         selected_index = company_listbox.curselection()[0]
-        selected_company = companies[selected_index]
+        selected_company = visible_companies[selected_index]
         display_details(selected_company)
         plot_data(selected_company['code'])  # Call plot function with updated code
 
 
-def search_company():
-    search_term = search_entry.get().strip().lower()
-    for i, company in enumerate(companies):
-        if search_term in company["name"].lower():
-            company_listbox.selection_clear(0, tk.END)
-            company_listbox.selection_set(i)
-            company_listbox.see(i)
-            display_details(company)
-            plot_data(company['code'])
-            break
-    else:
+def run_search():
+    """
+    Narrows the list to the companies matching the search box (names or codes).
+    """
+    global pending_search, last_search_query
+    pending_search = None
+    query = search_entry.get()
+    last_search_query = query
+    if not query.strip():
+        show_companies(companies)
+        details_label.config(text="")
+        return None
+    results = [company for _, company in search_index.search(query, max_search_results)]
+    show_companies(results)
+    if not results:
         details_label.config(text="Company not found.")
+    return results
+
+
+def on_search_key(event):
+    """
+    Debounces keystrokes: the search runs once typing pauses for search_debounce_ms.
+    """
+    global pending_search
+    if search_entry.get() == last_search_query:
+        return  # Navigation keys, or Return after the search already ran
+    if pending_search is not None:
+        root.after_cancel(pending_search)
+    pending_search = root.after(search_debounce_ms, run_search)
+
+
+def search_company():
+    if pending_search is not None:
+        root.after_cancel(pending_search)
+    results = run_search()
+    if results:
+        # Select the best match, as the Search button always has
+        company_listbox.selection_clear(0, tk.END)
+        company_listbox.selection_set(0)
+        company_listbox.see(0)
+        display_details(results[0])
+        plot_data(results[0]['code'])
+
+
+def load_series(code):
+    """
+    Parses a ticker's stock_data.csv into (matplotlib date numbers, prices) arrays.
+
+    Results are cached by the file's size and modification time, so re-selecting
+    a company costs one stat(), and a file rewritten by get.py or validate.py
+    while the window is open is parsed again.
+    """
+    path = f"data/{code}/stock_data.csv"
+    st = os.stat(path)
+    return _parse_series(path, st.st_size, st.st_mtime_ns)
+
+
+@lru_cache(maxsize=series_cache_size)
+def _parse_series(path, size, mtime_ns):
+    days, prices = [], []
+    with open(path, 'r') as file:
+        reader = csv.reader(file)
+        next(reader, None)  # Skip header row
+        for row in reader:
+            try:
+                day, price = row[0][:10], float(row[1])
+            except (IndexError, ValueError):
+                continue  # Skip malformed rows
+            days.append(day)
+            prices.append(price)
+    x = mdates.date2num(np.array(days, dtype='datetime64[D]')) if days else np.empty(0)
+    return np.asarray(x, dtype=float), np.array(prices, dtype=float)
+
+
+def lttb(x, y, threshold):
+    """
+    Downsamples a series with Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last points and, from each of threshold - 2 buckets, the
+    point forming the largest triangle with the previously kept point and the
+    average of the next bucket. The visual shape (peaks and troughs) survives
+    far better than with plain striding.
+
+    Args:
+        x (np.ndarray): Ascending x values.
+        y (np.ndarray): Values to plot.
+        threshold (int): Number of points to keep.
+
+    Returns:
+        tuple: (x, y) arrays with at most threshold points.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+
+        ax, ay = x[selected], y[selected]
+        areas = np.abs((ax - avg_x) * (y[start:end] - ay) - (ax - x[start:end]) * (avg_y - ay))
+        selected = start + int(np.argmax(areas))
+        keep[i + 1] = selected
+    return x[keep], y[keep]
+
+
+def create_chart(master):
+    """
+    Builds the single figure, line and canvas reused for every selection.
+    """
+    global figure, axes, price_line, canvas
+    figure = Figure(figsize=(6, 4))
+    axes = figure.add_subplot()
+    price_line, = axes.plot([], [], linewidth=1)
+    locator = mdates.AutoDateLocator()
+    axes.xaxis.set_major_locator(locator)
+    axes.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    axes.set_xlabel("Date")
+    axes.set_ylabel("Price")
+
+    canvas = FigureCanvasTkAgg(figure, master=master)
+    canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
 
 
 def plot_data(code):
-    folder_path = f"data/{code}"
     try:
-        # Clear previous plot widgets before creating a new one
-        for widget in details_frame.winfo_children():
-            if isinstance(widget, tk.Canvas):  # Check if it's the canvas holding the plot
-                widget.destroy()
-
-        # Assuming data file exists and has specific format (modify as needed)
-        with open(f"{folder_path}/stock_data.csv", 'r') as file:
-            reader = csv.DictReader(file)
-            dates, prices = [], []
-            for row in reader:
-                dates.append(row['date'])
-                prices.append(float(row['price']))
-
-            fig, ax = plt.subplots()
-            ax.plot(dates, prices, marker='o')
-            ax.set_title(f"{code} Stock Data")
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Price")
-            ax.tick_params(axis='x', rotation=45)
-
-            canvas = FigureCanvasTkAgg(fig, master=details_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+        x, y = load_series(code)
     except FileNotFoundError:
-        # Handle case where data file is missing (optional)
-        pass
+        # Handle case where data file is missing
+        x, y = np.empty(0), np.empty(0)
+
+    # Update the existing line in place instead of building a new figure
+    x, y = lttb(x, y, max_plot_points)
+    price_line.set_data(x, y)
+    price_line.set_marker('o' if len(x) <= 60 else '')  # Markers only help on short series
+    axes.set_title(f"{code} Stock Data" if len(x) else f"{code}: no data")
+    if len(x):
+        axes.relim()
+        axes.autoscale_view()
+    canvas.draw_idle()
+
+
+def main():
+    global root, companies, company_listbox, details_frame, details_label, search_entry, search_index, pending_search, last_search_query
+
+    root = tk.Tk()
+    root.title("Company Analysis")
 
+    companies = load_data("companies.csv")
+    search_index = search.SearchIndex(companies)  # Built once; each keystroke queries it
+    pending_search = None
+    last_search_query = ""
 
-# Main program
-root = tk.Tk()
-root.title("Company Analysis")
+    company_listbox = tk.Listbox(root, width=50, height=20)
+    show_companies(companies)
+    company_listbox.bind("<<ListboxSelect>>", on_select)
+    company_listbox.pack(side=tk.LEFT, padx=10, pady=10)
 
-companies = load_data("companies.csv")
+    details_frame = tk.Frame(root)
+    details_frame.pack(side=tk.LEFT, padx=10, pady=10)
 
-company_listbox = tk.Listbox(root, width=50, height=20)
-for company in companies:
-    company_listbox.insert(tk.END, company["name"])
-company_listbox.bind("<<ListboxSelect>>", on_select)
-company_listbox.pack(side=tk.LEFT, padx=10, pady=10)
+    details_label = tk.Label(details_frame, text="")
+    details_label.pack()
+    create_chart(details_frame)
 
-details_frame = tk.Frame(root)
-details_frame.pack(side=tk.LEFT, padx=10, pady=10)
+    search_frame = tk.Frame(root)
+    search_frame.pack(side=tk.TOP, padx=10, pady=10)
+    search_entry = tk.Entry(search_frame, width=40)
+    search_entry.pack(side=tk.LEFT)
+    search_entry.bind("<KeyRelease>", on_search_key)
+    search_entry.bind("<Return>", lambda event: search_company())
+    search_button = tk.Button(search_frame, text="Search", command=search_company)
+    search_button.pack(side=tk.LEFT)
 
-details_label = tk.Label(details_frame, text="")
-details_label.pack()
+    root.mainloop()
 
-search_frame = tk.Frame(root)
-search_frame.pack(side=tk.TOP, padx=10, pady=10)
-search_entry = tk.Entry(search_frame, width=40)
-search_entry.pack(side=tk.LEFT)
-search_button = tk.Button(search_frame, text="Search", command=search_company)
-search_button.pack(side=tk.LEFT)
 
-root.mainloop()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,521 @@
+import os
+import numpy as np
+
+# Streaming indicator state, updated by get.py after each new trading day
+state_file = "indicator_state.npz"
+
+# Default indicator parameters (modify as needed)
+sma_window = 20
+ema_span = 20
+rsi_window = 14
+macd_fast, macd_slow, macd_signal = 12, 26, 9
+bollinger_window, bollinger_width = 20, 2.0
+atr_window = 14
+volatility_window = 20
+
+# All batch functions take (dates, tickers) arrays with NaN for missing rows and
+# return arrays of the same shape. Streaming updates in IndicatorState use the
+# same definitions, so both paths agree on the latest value.
+
+
+def _alpha(span):
+    return 2.0 / (span + 1)
+
+
+def rolling_sum(values, window):
+    """
+    Trailing sum over each column's last `window` valid (non-NaN) values.
+
+    Missing days are skipped rather than breaking the window, which matches how
+    IndicatorState.update() treats tickers that did not trade. NaN until a
+    column has `window` valid values.
+    """
+    valid = ~np.isnan(values)
+    csum = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    ccount = np.cumsum(valid, axis=0)
+    # Cumulative sum indexed by how many valid values it covers
+    by_count = np.zeros((values.shape[0] + 1,) + values.shape[1:])
+    rows, cols = np.nonzero(valid)
+    by_count[ccount[rows, cols], cols] = csum[rows, cols]
+    start = np.clip(ccount - window, 0, None)
+    total = csum - np.take_along_axis(by_count, start, axis=0)
+    return np.where(ccount >= window, total, np.nan)
+
+
+def sma(prices, window=sma_window):
+    return rolling_sum(prices, window) / window
+
+
+def rolling_std(values, window):
+    """
+    Trailing population standard deviation over `window` rows.
+    """
+    mean = rolling_sum(values, window) / window
+    mean_sq = rolling_sum(values ** 2, window) / window
+    return np.sqrt(np.clip(mean_sq - mean ** 2, 0, None))
+
+
+def ewm(values, alpha):
+    """
+    Exponentially weighted mean down the rows, seeded with each column's first valid value.
+
+    Loops over dates, but every step is one vector operation across all tickers.
+    NaN rows leave a ticker's average unchanged.
+    """
+    out = np.full(values.shape, np.nan)
+    current = np.full(values.shape[1:], np.nan)
+    for t in range(values.shape[0]):
+        row = values[t]
+        valid = ~np.isnan(row)
+        seed = valid & np.isnan(current)
+        current = np.where(seed, row, current)
+        step = valid & ~seed
+        current = np.where(step, current + alpha * (row - current), current)
+        out[t] = current
+    return out
+
+
+def ema(prices, span=ema_span):
+    return ewm(prices, _alpha(span))
+
+
+def previous_valid(prices):
+    """
+    Each row's previous non-NaN value per column (NaN before the first one).
+    """
+    valid = ~np.isnan(prices)
+    rows = np.where(valid, np.arange(prices.shape[0])[:, None], -1)
+    last = np.maximum.accumulate(rows, axis=0)
+    prev = np.full(prices.shape, -1)
+    prev[1:] = last[:-1]
+    out = np.take_along_axis(prices, np.clip(prev, 0, None), axis=0)
+    return np.where(prev >= 0, out, np.nan)
+
+
+def _diff(prices):
+    return prices - previous_valid(prices)
+
+
+def rsi(prices, window=rsi_window):
+    """
+    Relative Strength Index with Wilder smoothing (alpha = 1 / window).
+    """
+    delta = _diff(prices)
+    gains = ewm(np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None)), 1.0 / window)
+    losses = ewm(np.where(np.isnan(delta), np.nan, np.clip(-delta, 0, None)), 1.0 / window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(losses == 0, 100.0, 100 - 100 / (1 + gains / losses))
+
+
+def macd(prices, fast=macd_fast, slow=macd_slow, signal=macd_signal):
+    """
+    Returns (macd line, signal line, histogram).
+    """
+    line = ema(prices, fast) - ema(prices, slow)
+    # The signal line only steps on days the ticker traded
+    signal_line = ewm(np.where(np.isnan(prices), np.nan, line), _alpha(signal))
+    return line, signal_line, line - signal_line
+
+
+def bollinger(prices, window=bollinger_window, width=bollinger_width):
+    """
+    Returns (middle, upper, lower) bands.
+    """
+    middle = sma(prices, window)
+    spread = width * rolling_std(prices, window)
+    return middle, middle + spread, middle - spread
+
+
+def true_range(close, high=None, low=None):
+    """
+    True range; with close prices only, this is the absolute close-to-close move.
+    """
+    prev_close = previous_valid(close)
+    if high is None or low is None:
+        return np.abs(close - prev_close)
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr(close, high=None, low=None, window=atr_window):
+    """
+    Average True Range with Wilder smoothing.
+    """
+    return ewm(true_range(close, high, low), 1.0 / window)
+
+
+def volatility(prices, window=volatility_window):
+    """
+    Rolling standard deviation of daily returns.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = prices / previous_valid(prices) - 1
+    returns[~np.isfinite(returns)] = np.nan
+    return rolling_std(returns, window)
+
+
+def _last_row(matrix):
+    """
+    The latest non-NaN value per column.
+    """
+    valid = ~np.isnan(matrix)
+    if matrix.shape[0] == 0:
+        return np.full(matrix.shape[1], np.nan)
+    rows = matrix.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+    last = matrix[rows, np.arange(matrix.shape[1])]
+    return np.where(valid.any(axis=0), last, np.nan)
+
+
+def _last_days(universe):
+    """
+    Each ticker's last priced day in the universe (NaT where it has none).
+    """
+    prices = np.asarray(universe.prices)
+    dates = np.asarray(universe.dates).astype('datetime64[D]')
+    valid = ~np.isnan(prices)
+    if prices.shape[0] == 0:
+        return np.full(prices.shape[1], np.datetime64('NaT'), dtype='datetime64[D]')
+    rows = prices.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+    return np.where(valid.any(axis=0), dates[rows], np.datetime64('NaT'))
+
+
+def _screen_metric(name, default_window, batch):
+    """
+    Screening metric that reads the saved streaming value of `name`.
+
+    The streaming state only holds the default parameters, so other windows are
+    computed in batch. Tickers the state has not been advanced to their last
+    universe day (or does not have) are also computed in batch, on their
+    columns only.
+    """
+    def metric(universe, window=None):
+        window = window or default_window
+        prices = np.asarray(universe.prices, dtype=float)
+        state = load_latest() if window == default_window else None
+        if state is None:
+            return _last_row(batch(prices, window))
+        values, last_days = state.latest(universe.symbols)
+        values = values[name]
+        stale = ~(last_days == _last_days(universe))
+        if stale.any():
+            values[stale] = _last_row(batch(prices[:, stale], window))
+        return values
+    return metric
+
+
+def _bollinger_pct(prices, window):
+    return (prices - bollinger(prices, window)[2]) / (2 * bollinger_width * rolling_std(prices, window))
+
+
+# Screening metrics (see screen.metric_functions): latest indicator value per ticker,
+# from the streaming state get.py keeps current when it covers the universe
+screen_metrics = {
+    "sma": _screen_metric("sma", sma_window, sma),
+    "ema": _screen_metric("ema", ema_span, ema),
+    "rsi": _screen_metric("rsi", rsi_window, rsi),
+    "macd": _screen_metric("macd", None, lambda prices, window: macd(prices)[0]),
+    "macd_hist": _screen_metric("macd_hist", None, lambda prices, window: macd(prices)[2]),
+    "bollinger_pct": _screen_metric("bollinger_pct", bollinger_window, _bollinger_pct),
+    "atr": _screen_metric("atr", atr_window, lambda prices, window: atr(prices, window=window)),
+    "rolling_volatility": _screen_metric("rolling_volatility", volatility_window, volatility),
+}
+
+
+class RollingWindow:
+    """
+    Per-ticker fixed-size windows (one column per ticker) with running sums.
+
+    push() is O(1) per ticker: the oldest value is subtracted and the new one
+    added, so no window is ever re-summed.
+    """
+
+    def __init__(self, window, n):
+        self.window = window
+        self.values = np.zeros((window, n))
+        self.pos = np.zeros(n, dtype=np.int64)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.total = np.zeros(n)
+        self.total_sq = np.zeros(n)
+
+    def push(self, row):
+        cols = np.flatnonzero(~np.isnan(row))
+        new = row[cols]
+        full = self.count[cols] >= self.window
+        old = np.where(full, self.values[self.pos[cols], cols], 0.0)
+        self.values[self.pos[cols], cols] = new
+        self.total[cols] += new - old
+        self.total_sq[cols] += new ** 2 - old ** 2
+        self.pos[cols] = (self.pos[cols] + 1) % self.window
+        self.count[cols] = np.minimum(self.count[cols] + 1, self.window)
+
+    def mean(self):
+        return np.where(self.count == self.window, self.total / self.window, np.nan)
+
+    def std(self):
+        mean = self.total / self.window
+        var = np.clip(self.total_sq / self.window - mean ** 2, 0, None)
+        return np.where(self.count == self.window, np.sqrt(var), np.nan)
+
+    def grow(self, n):
+        extra = n - len(self.pos)
+        self.values = np.hstack([self.values, np.zeros((self.window, extra))])
+        self.pos = np.concatenate([self.pos, np.zeros(extra, dtype=np.int64)])
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+        self.total = np.concatenate([self.total, np.zeros(extra)])
+        self.total_sq = np.concatenate([self.total_sq, np.zeros(extra)])
+
+
+# Per-ticker vectors saved in the state file, besides the rolling windows
+_vector_fields = ("last_price", "ema", "ema_fast", "ema_slow", "macd_signal", "avg_gain", "avg_loss", "atr")
+_window_fields = ("values", "pos", "count", "total", "total_sq")
+
+
+class IndicatorState:
+    """
+    Streaming indicator state for the whole universe.
+
+    Each update() takes one day's prices (one value per ticker, NaN where a
+    ticker did not trade) and advances every indicator in O(1) per ticker.
+
+    The last applied day is kept per ticker, so a day that one ticker is
+    missing (e.g. a failed fetch) can still be applied to it when it is
+    backfilled, after the other tickers have moved on.
+
+    Args:
+        symbols (list): Ticker symbols, one per column.
+    """
+
+    def __init__(self, symbols=()):
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        n = len(self.symbols)
+        nan = lambda: np.full(n, np.nan)
+        self.last_price = nan()
+        self.ema = nan()
+        self.ema_fast = nan()
+        self.ema_slow = nan()
+        self.macd_signal = nan()
+        self.avg_gain = nan()
+        self.avg_loss = nan()
+        self.atr = nan()
+        self.sma_window = RollingWindow(sma_window, n)
+        self.bollinger_window = RollingWindow(bollinger_window, n)
+        self.return_window = RollingWindow(volatility_window, n)
+        self.last_days = np.full(n, np.datetime64('NaT'), dtype='datetime64[D]')
+        self.last_date = None  # Newest day applied to any ticker
+
+    @staticmethod
+    def _ewm_step(current, row, alpha):
+        valid = ~np.isnan(row)
+        seed = valid & np.isnan(current)
+        out = np.where(seed, row, current)
+        step = valid & ~seed
+        return np.where(step, out + alpha * (row - out), out)
+
+    def _ensure(self, symbols):
+        new = [s for s in symbols if s not in self.index]
+        if not new:
+            return
+        for s in new:
+            self.index[s] = len(self.symbols)
+            self.symbols.append(s)
+        n = len(self.symbols)
+        for name in _vector_fields:
+            old = getattr(self, name)
+            setattr(self, name, np.concatenate([old, np.full(n - len(old), np.nan)]))
+        for window in (self.sma_window, self.bollinger_window, self.return_window):
+            window.grow(n)
+        self.last_days = np.concatenate([self.last_days, np.full(n - len(self.last_days), np.datetime64('NaT'),
+                                                                 dtype='datetime64[D]')])
+
+    def update(self, row, date=None):
+        """
+        Advances every indicator by one day.
+
+        Args:
+            row (np.ndarray | dict): Prices aligned to self.symbols, or {symbol: price}.
+            date (str): Trading date. Prices are only applied to tickers whose last
+                applied day is earlier; tickers already past it are left alone.
+        """
+        if isinstance(row, dict):
+            self._ensure(row)
+            values = np.full(len(self.symbols), np.nan)
+            for symbol, price in row.items():
+                values[self.index[symbol]] = price
+            row = values
+        row = np.asarray(row, dtype=float)
+        if date is not None:
+            day = np.datetime64(str(date)[:10], 'D')
+            row = np.where(np.isnat(self.last_days) | (self.last_days < day), row, np.nan)
+
+        delta = row - self.last_price
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ret = row / self.last_price - 1
+
+        self.ema = self._ewm_step(self.ema, row, _alpha(ema_span))
+        self.ema_fast = self._ewm_step(self.ema_fast, row, _alpha(macd_fast))
+        self.ema_slow = self._ewm_step(self.ema_slow, row, _alpha(macd_slow))
+        self.macd_signal = self._ewm_step(self.macd_signal, np.where(np.isnan(row), np.nan, self.ema_fast - self.ema_slow),
+                                          _alpha(macd_signal))
+        self.avg_gain = self._ewm_step(self.avg_gain, np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None)), 1.0 / rsi_window)
+        self.avg_loss = self._ewm_step(self.avg_loss, np.where(np.isnan(delta), np.nan, np.clip(-delta, 0, None)), 1.0 / rsi_window)
+        self.atr = self._ewm_step(self.atr, np.abs(delta), 1.0 / atr_window)
+        self.sma_window.push(row)
+        self.bollinger_window.push(row)
+        self.return_window.push(np.where(np.isfinite(ret), ret, np.nan))
+
+        self.last_price = np.where(np.isnan(row), self.last_price, row)
+        if date is not None:
+            self.last_days = np.where(np.isnan(row), self.last_days, day)
+            self.last_date = max(self.last_date or "", str(day))
+
+    def values(self):
+        """
+        Latest value of every indicator, as {name: array aligned to self.symbols}.
+        """
+        middle = self.bollinger_window.mean()
+        spread = bollinger_width * self.bollinger_window.std()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi_value = np.where(self.avg_loss == 0, 100.0, 100 - 100 / (1 + self.avg_gain / self.avg_loss))
+            bollinger_pct = (self.last_price - (middle - spread)) / (2 * spread)
+        macd_line = self.ema_fast - self.ema_slow
+        return {
+            "sma": self.sma_window.mean(),
+            "ema": self.ema,
+            "rsi": rsi_value,
+            "macd": macd_line,
+            "macd_signal": self.macd_signal,
+            "macd_hist": macd_line - self.macd_signal,
+            "bollinger_mid": middle,
+            "bollinger_upper": middle + spread,
+            "bollinger_lower": middle - spread,
+            "bollinger_pct": bollinger_pct,
+            "atr": self.atr,
+            "rolling_volatility": self.return_window.std(),
+        }
+
+    def latest(self, symbols):
+        """
+        Latest indicator values for the given tickers, without touching any history.
+
+        Args:
+            symbols (list): Ticker symbols, in the order wanted.
+
+        Returns:
+            tuple: ({name: array aligned to symbols}, last applied day per symbol);
+                   NaN and NaT for symbols the state does not have.
+        """
+        # Unknown symbols index the NaN / NaT appended after the last ticker
+        idx = np.array([self.index.get(symbol, -1) for symbol in symbols], dtype=np.int64)
+        values = {name: np.append(array, np.nan)[idx] for name, array in self.values().items()}
+        return values, np.append(self.last_days, np.datetime64('NaT'))[idx]
+
+    @classmethod
+    def from_history(cls, symbols, prices, dates=None):
+        """
+        Builds the state by streaming through a (dates, tickers) price matrix once.
+        """
+        state = cls(symbols)
+        for t in range(prices.shape[0]):
+            state.update(prices[t], None if dates is None else str(dates[t])[:10])
+        return state
+
+    def save(self, path=state_file):
+        arrays = {name: getattr(self, name) for name in _vector_fields}
+        for prefix, window in (("sma", self.sma_window), ("bollinger", self.bollinger_window), ("returns", self.return_window)):
+            for field in _window_fields:
+                arrays[f"{prefix}_{field}"] = getattr(window, field)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, symbols=np.array(self.symbols), last_date=np.array(self.last_date or ""),
+                     last_days=self.last_days, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=state_file):
+        with np.load(path) as data:
+            state = cls([str(s) for s in data["symbols"]])
+            for name in _vector_fields:
+                setattr(state, name, data[name])
+            for prefix, window in (("sma", state.sma_window), ("bollinger", state.bollinger_window), ("returns", state.return_window)):
+                for field in _window_fields:
+                    setattr(window, field, data[f"{prefix}_{field}"])
+            state.last_date = str(data["last_date"]) or None
+            if "last_days" in data:
+                state.last_days = data["last_days"]
+            elif state.last_date is not None:
+                # Saved before days were kept per ticker: every priced ticker was at last_date
+                state.last_days = np.where(np.isnan(state.last_price), np.datetime64('NaT'),
+                                           np.datetime64(state.last_date, 'D'))
+        return state
+
+
+_loaded = {}
+
+
+def load_latest(path=state_file):
+    """
+    The saved streaming state, or None if there is none.
+
+    Memoised per process and reloaded whenever the file changes, so screens and
+    charts read it once rather than per metric or per selection.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    stamp = (st.st_size, st.st_mtime_ns)
+    key = os.path.abspath(path)
+    cached = _loaded.get(key)
+    if cached is None or cached[0] != stamp:
+        cached = _loaded[key] = (stamp, IndicatorState.load(path))
+    return cached[1]
+
+
+def update_state(new_prices, path=state_file):
+    """
+    Applies newly ingested days to the saved streaming state.
+
+    The state is seeded from the price panel the first time (when one exists);
+    afterwards each new day costs O(1) per ticker. A price is applied to a
+    ticker if it is newer than that ticker's last applied day, so a ticker
+    backfilled after a failed fetch catches up.
+
+    Args:
+        new_prices (dict): Date 'YYYY-MM-DD' -> {symbol: price}, as returned by ingest.ingest.
+    """
+    if os.path.exists(path):
+        state = IndicatorState.load(path)
+    else:
+        import panel
+        price_panel = panel.open_current()
+        if price_panel is not None:
+            state = IndicatorState.from_history(price_panel.symbols, np.asarray(price_panel.matrix()), price_panel.dates)
+        else:
+            state = IndicatorState()
+
+    for date in sorted(new_prices):
+        # Tickers that already have this day (e.g. seeded from a panel that includes it) skip it
+        state.update(new_prices[date], date)
+    state.save(path)
+    return state
+
+
+def main():
+    """
+    Rebuilds the streaming state from full history (panel if present, else the CSVs).
+    """
+    import panel
+    price_panel = panel.open_current()
+    if price_panel is not None:
+        symbols, prices, dates = price_panel.symbols, np.asarray(price_panel.matrix()), price_panel.dates
+    else:
+        import model
+        import screen
+        universe = screen.Universe.from_stock_data(model.load_data("data"))
+        symbols, prices, dates = universe.symbols, universe.prices, universe.dates
+    state = IndicatorState.from_history(symbols, prices, dates)
+    state.save()
+    print(f"Saved indicator state for {len(symbols)} tickers up to {state.last_date} to {state_file}")
+
+if __name__ == "__main__":
+    main()
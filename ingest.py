@@ -0,0 +1,240 @@
+import os
+import csv
+import json
+import tempfile
+from datetime import date, datetime, time, timedelta
+
+import fetch
+import metrics
+
+# Specify the data directory path (modify as needed)
+data_dir = "data"
+
+# Per-ticker high-water marks, kept alongside the ticker folders:
+# {"CBA": {"last": "2024-05-09", "checked": "2024-05-10"}, ...}
+# 'last' is the latest stored row, 'checked' the last closed trading day the source was asked for
+manifest_file = os.path.join(data_dir, "manifest.json")
+
+# How far back to fetch for a ticker that has no stored rows yet
+initial_lookback_days = 30
+
+# A day's price is only final after the closing auction (exchange local time, modify as needed)
+market_timezone = "Australia/Sydney"
+market_close = time(16, 15)
+
+
+def load_manifest(path=None):
+    """
+    Loads the high-water-mark manifest (stock code -> {'last': ..., 'checked': ...}).
+
+    Args:
+        path (str): Manifest file; None uses manifest_file as it is at call time.
+    """
+    path = path or manifest_file
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            # A damaged manifest is rebuilt from the CSV files
+            return {}
+
+
+def save_manifest(manifest, path=None):
+    """
+    Atomically writes the manifest.
+    """
+    path = path or manifest_file
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".manifest.", suffix=".tmp")
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def last_trading_day(today=None):
+    """
+    Returns the most recent weekday on or before today (public holidays are not modelled).
+    """
+    today = today or date.today()
+    while today.weekday() >= 5:  # Saturday or Sunday
+        today -= timedelta(days=1)
+    return today
+
+
+def exchange_now():
+    """
+    The current time at the exchange (the machine's local time on Python < 3.9).
+    """
+    try:
+        from zoneinfo import ZoneInfo  # Python 3.9+
+        return datetime.now(ZoneInfo(market_timezone))
+    except (ImportError, KeyError):  # KeyError covers a missing tz database
+        return datetime.now()
+
+
+def last_closed_trading_day(now=None):
+    """
+    Returns the most recent trading day whose close is final.
+
+    Before market_close on a weekday that is the previous trading day, so a run
+    during trading hours never stores an intraday price as the close.
+
+    Args:
+        now (datetime or date): Reference time (defaults to exchange_now()). A plain
+            date is taken to be after the close.
+    """
+    now = now or exchange_now()
+    if isinstance(now, datetime):
+        day = now.date()
+        if now.time() < market_close:
+            day -= timedelta(days=1)
+    else:
+        day = now
+    return last_trading_day(day)
+
+
+def stock_file(stock_code):
+    return os.path.join(data_dir, stock_code, "stock_data.csv")
+
+
+def read_rows(stock_code):
+    """
+    Reads the stored rows of a ticker as a date -> price-string dict.
+    """
+    rows = {}
+    try:
+        with open(stock_file(stock_code), 'r', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # Skip header row
+            for row in reader:
+                if len(row) >= 2 and row[0] != 'date':
+                    rows[row[0][:10]] = row[1]
+    except FileNotFoundError:
+        pass
+    return rows
+
+
+def stored_last_date(stock_code):
+    """
+    Returns the latest date stored in a ticker's CSV, or None if it has no rows.
+    """
+    rows = read_rows(stock_code)
+    return max(rows) if rows else None
+
+
+def plan_update(stock_codes, manifest, today=None):
+    """
+    Works out which tickers need fetching and from which date.
+
+    Args:
+        stock_codes (list): Tickers in the universe.
+        manifest (dict): Stock code -> high-water marks. Missing entries are
+            filled in from the CSV files.
+        today (datetime or date): Reference time (defaults to now at the exchange).
+
+    Returns:
+        dict: First missing date 'YYYY-MM-DD' -> list of tickers to fetch from it.
+    """
+    target = last_closed_trading_day(today)
+    plan = {}
+    for stock_code in stock_codes:
+        if stock_code not in manifest:
+            manifest[stock_code] = {"last": stored_last_date(stock_code), "checked": None}
+
+        entry = manifest[stock_code]
+        if entry["checked"] is not None and entry["checked"] >= target.strftime('%Y-%m-%d'):
+            continue  # Source already asked for this trading day (e.g. a holiday or halted stock)
+
+        if entry["last"] is None:
+            start = target - timedelta(days=initial_lookback_days)
+        else:
+            last_date = datetime.strptime(entry["last"], '%Y-%m-%d').date()
+            if last_date >= target:
+                continue  # Already current
+            start = last_date + timedelta(days=1)
+        plan.setdefault(start.strftime('%Y-%m-%d'), []).append(stock_code)
+    return plan
+
+
+def write_rows(stock_code, new_rows):
+    """
+    Merges new rows into a ticker's CSV, deduplicated by date and sorted, via an atomic rename.
+
+    Args:
+        stock_code (str): Ticker to write.
+        new_rows (dict): Date 'YYYY-MM-DD' -> price. New values replace stored ones.
+
+    Returns:
+        str: The last date now stored, or None if the file is empty.
+    """
+    rows = read_rows(stock_code)
+    rows.update({day: repr(float(price)) for day, price in new_rows.items()})
+
+    folder = os.path.dirname(stock_file(stock_code))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".stock_data.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['date', 'price'])
+            writer.writerows(sorted(rows.items()))
+        os.replace(tmp_path, stock_file(stock_code))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return max(rows) if rows else None
+
+
+def frame_rows(data):
+    """
+    Converts a fetched DataFrame into a date -> close dict.
+    """
+    return {day.strftime('%Y-%m-%d'): price for day, price in data['Close'].items() if price == price}
+
+
+def ingest(stock_codes, provider=None, today=None, progress=None):
+    """
+    Fetches only the missing date range for each ticker and stores it idempotently.
+
+    Args:
+        stock_codes (list): Tickers to bring up to date.
+        provider: Quote source passed to fetch.fetch_all.
+        today (datetime or date): Reference time (defaults to now at the exchange).
+        progress: Optional callable invoked with the number of tickers finished.
+
+    Returns:
+        tuple: (new_prices, errors, skipped) where new_prices maps each date to
+        {stock code: price}, errors maps stock code -> message, and skipped is
+        the number of tickers that were already current.
+    """
+    manifest = load_manifest()
+    plan = plan_update(stock_codes, manifest, today)
+    skipped = len(stock_codes) - sum(len(codes) for codes in plan.values())
+    if progress is not None and skipped:
+        progress(skipped)
+
+    target = last_closed_trading_day(today)
+    end = (target + timedelta(days=1)).strftime('%Y-%m-%d')
+    new_prices, errors = {}, {}
+
+    for start, codes in sorted(plan.items()):
+        result = fetch.fetch_all(codes, provider=provider, start=start, end=end, progress=progress)
+        errors.update({code: error for code, error in result.errors.items() if error != fetch.no_data})
+        for stock_code in codes:
+            if stock_code not in errors:
+                # An empty answer still counts: there is nothing to fetch until the next trading day
+                manifest[stock_code]["checked"] = target.strftime('%Y-%m-%d')
+        for stock_code, data in result.data.items():
+            rows = {day: price for day, price in frame_rows(data).items() if day >= start}
+            if not rows:
+                continue
+            with metrics.timer("write_rows_seconds", stock_code):
+                manifest[stock_code]["last"] = write_rows(stock_code, rows)
+            metrics.count("rows_written", len(rows))
+            for day, price in rows.items():
+                new_prices.setdefault(day, {})[stock_code] = price
+
+    save_manifest(manifest)
+    return new_prices, errors, skipped
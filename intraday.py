@@ -0,0 +1,416 @@
+import os
+import math
+import time
+import asyncio
+import argparse
+import tempfile
+from datetime import date
+import numpy as np
+import down
+import alerts
+import fetch
+import metrics
+import symbols
+import watchlist
+
+# Polling settings (modify as needed)
+poll_interval = 15.0  # Seconds between polls
+ring_size = 390  # Ticks kept per ticker (a full session of one-minute bars; repeated quotes are not stored)
+flush_interval = 60.0  # Seconds between snapshots to disk
+max_concurrent_requests = 4  # Quote batches in flight at once
+quote_batch_size = fetch.batch_size
+
+# Decline windows in ticks, checked on every tick alongside the drop since the last close
+tick_windows = (1, 5, 20)
+
+# Inputs and outputs
+data_dir = down.data_dir
+portfolio_file = "portfolio.json"
+snapshot_file = "intraday_snapshot.npz"
+output_file = "intraday_output.txt"
+
+# Per-tick volatility of the simulated feed
+simulated_volatility = 0.002
+
+
+class RingBuffer:
+    """
+    Fixed-size buffer of the latest (timestamp, price) ticks for one ticker.
+
+    Backed by two preallocated arrays; pushing overwrites the oldest tick, so
+    memory stays constant however long the session runs.
+
+    Args:
+        capacity (int): Ticks kept.
+    """
+
+    def __init__(self, capacity=ring_size):
+        self.capacity = capacity
+        self.times = np.zeros(capacity)
+        self.prices = np.full(capacity, np.nan)
+        self.head = 0  # Slot the next tick is written to
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, timestamp, price):
+        self.times[self.head] = timestamp
+        self.prices[self.head] = price
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def last_time(self):
+        """
+        Timestamp of the latest tick, or None if the buffer is empty.
+        """
+        if not self.count:
+            return None
+        return float(self.times[(self.head - 1) % self.capacity])
+
+    def last(self, ticks_back=0):
+        """
+        Price `ticks_back` ticks before the latest one, or None if not buffered.
+        """
+        if ticks_back >= self.count:
+            return None
+        return float(self.prices[(self.head - 1 - ticks_back) % self.capacity])
+
+    def ordered(self):
+        """
+        Returns (times, prices) copies, oldest first.
+        """
+        index = (self.head - self.count + np.arange(self.count)) % self.capacity
+        return self.times[index], self.prices[index]
+
+    @classmethod
+    def from_ticks(cls, times, prices, capacity=ring_size):
+        buffer = cls(capacity)
+        for timestamp, price in zip(times[-capacity:], prices[-capacity:]):
+            buffer.push(timestamp, price)
+        return buffer
+
+
+class SimulatedQuoteSource:
+    """
+    Local random-walk feed for tests and --simulate; never touches the network.
+
+    Args:
+        start_prices (dict): Stock code -> first price.
+        volatility (float): Standard deviation of each tick's log return.
+        seed (int): Random seed, for repeatable runs.
+        latency (float): Seconds every request takes, to mimic a slow source.
+    """
+
+    def __init__(self, start_prices, volatility=simulated_volatility, seed=None, latency=0.0):
+        self.prices = dict(start_prices)
+        self.volatility = volatility
+        self.latency = latency
+        self.rng = np.random.default_rng(seed)
+        self.shocks = {}
+        self.calls = 0
+        self.last_time = 0.0
+
+    def shock(self, code, fraction):
+        """
+        Makes the next quote for a code drop by `fraction` (e.g. 0.06 for -6%).
+        """
+        self.shocks[code] = fraction
+
+    async def quotes(self, codes):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        # Strictly increasing, like a real feed, even on a coarse clock
+        now = self.last_time = max(time.time(), self.last_time + 1e-3)
+        results = {}
+        for code in codes:
+            if code not in self.prices:
+                continue
+            price = self.prices[code] * math.exp(self.rng.normal(0.0, self.volatility))
+            price *= 1 - self.shocks.pop(code, 0.0)
+            self.prices[code] = price
+            results[code] = (now, price)
+        return results
+
+
+class YahooQuoteSource:
+    """
+    Latest one-minute bar per ticker from yfinance.
+
+    yfinance is blocking, so each request runs on the default thread pool while
+    the event loop keeps polling the other batches.
+    """
+
+    suffix = fetch.YahooProvider.suffix
+
+    def __init__(self, rate=fetch.requests_per_second):
+        self.limiter = fetch.TokenBucket(rate)
+
+    async def quotes(self, codes):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._download, list(codes))
+
+    def _download(self, codes):
+        import yfinance as yf  # Only needed when talking to the network
+        import pandas as pd
+
+        self.limiter.acquire()
+        tickers = [f"{code}{self.suffix}" for code in codes]
+        frame = yf.download(tickers, period="1d", interval="1m", group_by='ticker', threads=False, progress=False)
+        results = {}
+        for code, ticker in zip(codes, tickers):
+            if isinstance(frame.columns, pd.MultiIndex):
+                if ticker not in frame.columns.get_level_values(0):
+                    continue
+                data = frame[ticker]
+            else:
+                data = frame  # A single ticker comes back with flat columns
+            data = data.dropna(subset=['Close'])
+            if not data.empty:
+                results[code] = (data.index[-1].timestamp(), float(data['Close'].iloc[-1]))
+        return results
+
+
+def previous_closes(codes, directory=data_dir):
+    """
+    Returns {code: last end-of-day price} from data/<CODE>/stock_data.csv.
+    """
+    closes = {}
+    for code in codes:
+        path = os.path.join(directory, code, "stock_data.csv")
+        if not os.path.isfile(path):
+            continue
+        entries = down.read_recent_entries(path, 1)
+        if entries:
+            closes[code] = entries[-1][1]
+    return closes
+
+
+def tracked_codes(portfolio_path=portfolio_file, db_path=watchlist.db_file):
+    """
+    The liked and held codes from the watchlist, plus everything in portfolio.json.
+    """
+    return sorted(alerts.load_flags(db_path, portfolio_path))
+
+
+class IntradayMonitor:
+    """
+    Polls a quote source on an asyncio loop and keeps per-ticker ring buffers.
+
+    Declines are recomputed for a ticker as soon as its tick arrives, so
+    `declines` is always current; disk is only touched by flush().
+
+    Args:
+        codes (list): Stock codes to poll.
+        source: Object with an async quotes(codes) -> {code: (timestamp, price)}.
+        reference (dict): Code -> previous close (read from the data files if None).
+        capacity (int): Ticks kept per ticker.
+        windows (tuple): Decline windows in ticks.
+    """
+
+    def __init__(self, codes, source, reference=None, capacity=ring_size, windows=tick_windows,
+                 concurrency=max_concurrent_requests, batch_size=quote_batch_size):
+        self.codes = list(codes)
+        self.source = source
+        self.reference = previous_closes(self.codes) if reference is None else dict(reference)
+        self.capacity = capacity
+        self.windows = windows
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.buffers = {code: RingBuffer(capacity) for code in self.codes}
+        self.declines = {}  # Code -> ({"close" or window: percentage decrease or None}, last price)
+        self.polls = 0
+
+    def on_tick(self, code, timestamp, price):
+        """
+        Stores a tick and recomputes the ticker's declines.
+
+        A quote no newer than the latest buffered tick (e.g. the same one-minute
+        bar returned by several polls) is ignored, so tick windows count bars
+        rather than polls.
+
+        Returns:
+            bool: True if the tick was new.
+        """
+        buffer = self.buffers[code]
+        latest = buffer.last_time()
+        if latest is not None and timestamp <= latest:
+            return False
+        buffer.push(timestamp, price)
+        close = self.reference.get(code)
+        declines = {"close": down.calculate_percentage_decrease(close, price) if close else None}
+        for window in self.windows:
+            earlier = buffer.last(window)
+            declines[window] = down.calculate_percentage_decrease(earlier, price) if earlier else None
+        self.declines[code] = (declines, price)
+        return True
+
+    async def _poll_batch(self, batch, semaphore):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                quotes = await self.source.quotes(batch)
+            except Exception as e:
+                metrics.count("quote_failures")
+                print(f"Error fetching quotes for {', '.join(batch)}: {e}")
+                return {}
+            metrics.observe("quote_seconds", time.perf_counter() - start)
+            return quotes
+
+    async def poll_once(self):
+        """
+        Requests every batch concurrently and applies the ticks.
+
+        Returns:
+            list: Codes that received a new tick.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        batches = fetch.make_batches(self.codes, self.batch_size)
+        updated = []
+        for quotes in await asyncio.gather(*(self._poll_batch(batch, semaphore) for batch in batches)):
+            for code, (timestamp, price) in quotes.items():
+                if code in self.buffers and price is not None and math.isfinite(price):
+                    if self.on_tick(code, timestamp, price):
+                        updated.append(code)
+        self.polls += 1
+        metrics.count("ticks", len(updated))
+        return updated
+
+    def declined(self, key="close"):
+        """
+        down.py-style list of (code, declines, last price) that fell over `key`, largest decline first.
+        """
+        rows = [(code, declines, price) for code, (declines, price) in self.declines.items()
+                if declines[key] is not None and declines[key] > 0]
+        rows.sort(key=lambda r: r[1][key], reverse=True)
+        return rows
+
+    def save_snapshot(self, path=snapshot_file):
+        """
+        Writes every buffer (oldest tick first, NaN-padded) to one .npz via an atomic rename.
+        """
+        times = np.zeros((len(self.codes), self.capacity))
+        prices = np.full((len(self.codes), self.capacity), np.nan)
+        counts = np.zeros(len(self.codes), dtype=np.int64)
+        for row, code in enumerate(self.codes):
+            buffer_times, buffer_prices = self.buffers[code].ordered()
+            counts[row] = len(buffer_prices)
+            times[row, :counts[row]] = buffer_times
+            prices[row, :counts[row]] = buffer_prices
+        folder = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".intraday.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, codes=np.array(self.codes), times=times, prices=prices, counts=counts,
+                         day=np.array(date.today().isoformat()))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load_snapshot(self, path=snapshot_file):
+        """
+        Restores today's buffers from a snapshot (older sessions are ignored).
+
+        Returns:
+            int: Number of tickers restored.
+        """
+        if not os.path.exists(path):
+            return 0
+        with np.load(path) as snapshot:
+            if str(snapshot["day"]) != date.today().isoformat():
+                return 0
+            restored = 0
+            for row, code in enumerate(snapshot["codes"].tolist()):
+                if code not in self.buffers:
+                    continue
+                n = int(snapshot["counts"][row])
+                for timestamp, price in zip(snapshot["times"][row, :n], snapshot["prices"][row, :n]):
+                    self.on_tick(code, float(timestamp), float(price))
+                restored += 1
+        return restored
+
+    def write_declines(self, path=output_file):
+        """
+        Writes the tickers below their previous close in the down.py output format.
+        """
+        registry = symbols.load()
+        declined = self.declined()
+        with open(path, 'w') as output:
+            for code, declines, price in declined:
+                other = "".join(
+                    f", {window}-Tick Decrease: " + (f"{declines[window]:.2f}%" if declines[window] is not None else "n/a")
+                    for window in self.windows
+                )
+                output.write(f"Folder: {code} ({registry.name(code)}), Percentage Decrease: {declines['close']:.2f}%"
+                             f"{other}, Last Cost: {price}\n")
+        return declined
+
+    def flush(self, snapshot_path=snapshot_file, output_path=output_file):
+        with metrics.timer("flush_seconds"):
+            self.save_snapshot(snapshot_path)
+            self.write_declines(output_path)
+
+    async def run(self, interval=poll_interval, flush_every=flush_interval, polls=None, duration=None,
+                  on_update=None, snapshot_path=snapshot_file, output_path=output_file):
+        """
+        Polls every `interval` seconds until `polls` or `duration` is reached (or forever).
+
+        Args:
+            on_update (callable): Called as on_update(monitor, updated_codes) after each poll.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        next_flush = started + flush_every
+        try:
+            while (polls is None or self.polls < polls) and (duration is None or loop.time() - started < duration):
+                poll_start = loop.time()
+                updated = await self.poll_once()
+                if on_update is not None:
+                    on_update(self, updated)
+                if loop.time() >= next_flush:
+                    # Awaited, so the buffers never change mid-write; the time it takes
+                    # comes out of this poll's sleep rather than pushing the schedule back
+                    await loop.run_in_executor(None, self.flush, snapshot_path, output_path)
+                    next_flush = loop.time() + flush_every
+                await asyncio.sleep(max(0.0, interval - (loop.time() - poll_start)))
+        finally:
+            self.flush(snapshot_path, output_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poll intraday quotes for the watchlist and holdings.")
+    parser.add_argument("codes", nargs="*", help="codes to poll (default: liked and held stocks)")
+    parser.add_argument("--interval", type=float, default=poll_interval, help="seconds between polls")
+    parser.add_argument("--flush", type=float, default=flush_interval, help="seconds between snapshots")
+    parser.add_argument("--ticks", type=int, default=ring_size, help="ticks kept per ticker")
+    parser.add_argument("--polls", type=int, default=None, help="stop after this many polls")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--simulate", action="store_true", help="use the local simulated feed")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    codes = args.codes or tracked_codes()
+    if not codes:
+        print("Nothing to poll: like or hold some stocks first, or pass codes")
+        return
+    reference = previous_closes(codes)
+    if args.simulate:
+        source = SimulatedQuoteSource({code: reference.get(code, 1.0) for code in codes}, seed=args.seed)
+    else:
+        source = YahooQuoteSource()
+
+    monitor = IntradayMonitor(codes, source, reference, capacity=args.ticks)
+    restored = monitor.load_snapshot()
+    print(f"Polling {len(codes)} tickers every {args.interval:g}s ({restored} restored from {snapshot_file}); Ctrl-C to stop")
+    try:
+        on_update = alerts.intraday_callback(alerts.load_engine())  # Liked/held alert rules on every tick
+        asyncio.run(monitor.run(args.interval, args.flush, args.polls, args.duration, on_update))
+    except KeyboardInterrupt:
+        pass
+    print(f"{len(monitor.declined())} tickers below their previous close; written to {output_file}")
+
+if __name__ == "__main__":
+    main()
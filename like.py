@@ -1,13 +1,13 @@
 import os
-import json
 import tkinter as tk
 from tkinter import ttk
+import watchlist
 
 # Define data directory path
 data_dir = "data"
 
 # Define database file path
-data_file = "data_records.json"
+data_file = watchlist.db_file
 
 def get_folders():
     """
@@ -18,24 +18,17 @@ def get_folders():
 
 def load_data():
     """
-    Loads data from the database file (if it exists).
+    Loads all flags from the watchlist store (migrating the legacy files on first use).
     """
-    if not os.path.exists(data_file):
-        return {}
-    with open(data_file, 'r') as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            # Handle potential errors in existing data
-            data = {}
-    return data
-
-def save_data(data):
+    global store
+    store = watchlist.connect(data_file)
+    return watchlist.all_flags(store)
+
+def save_flag(folder, flag, value):
     """
-    Saves data to the database file.
+    Saves a single flag change (one row, not the whole database).
     """
-    with open(data_file, 'w') as f:
-        json.dump(data, f, indent=4)
+    watchlist.set_flag(store, folder, flag, value)
 
 def update_ui(data):
     """
@@ -48,13 +41,13 @@ def update_ui(data):
 def on_like_click():
     folder = folder_list.get(folder_list.curselection())
     data[folder]["liked"] = like_var.get()
-    save_data(data)
+    save_flag(folder, "liked", data[folder]["liked"])
     update_ui(data)
 
 def on_has_it_click():
     folder = folder_list.get(folder_list.curselection())
     data[folder]["has_it"] = has_it_var.get()
-    save_data(data)
+    save_flag(folder, "has_it", data[folder]["has_it"])
     update_ui(data)
 
 def main():
@@ -62,12 +55,13 @@ def main():
     global data
     data = load_data()
 
-    # Populate folder list
+    # Populate folder list (new folders are added in one batched write)
     folders = get_folders()
-    for folder in folders:
-        if folder not in data:
+    missing = [folder for folder in folders if folder not in data]
+    if missing:
+        watchlist.ensure_codes(store, missing)
+        for folder in missing:
             data[folder] = {"liked": 0, "has_it": 0}
-            save_data(data)
 
     # Create main window
     window = tk.Tk()
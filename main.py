@@ -1,21 +1,70 @@
-from tqdm import tqdm
-import subprocess
 import sys
-import os
-
-def run_script(script_name, desc):
-    script_path = os.path.join(os.path.dirname(__file__), script_name)
-    python_executable = sys.executable  # Get path to the Python interpreter
-    with tqdm(total=1, desc=desc, unit="script") as pbar:
-        try:
-            subprocess.run([python_executable, script_path], check=True)  # Execute script with Python interpreter
-            pbar.update(1)  # Update progress bar if successful
-        except subprocess.CalledProcessError as e:
-            print(f"Error: Script '{script_name}' failed with exit code {e.returncode}.")
+import argparse
+import pipeline
+import metrics
+
+data_files = "data/*/stock_data.csv"
+
+
+def run_get(context):
+    import get
+    get.main()
+
+
+def run_down(context):
+    import down
+    down.main()
+
+
+def load_stock_data(context):
+    """
+    Loads the price data once and shares it with every stage that needs it.
+    """
+    if "stock_data" not in context:
+        import model
+        context["stock_data"] = model.load_data("data")
+    return context["stock_data"]
 
-if __name__ == "__main__":
-    scripts = ["get.py", "down.py", "model.py"]
-    for script in scripts:
-        run_script(script, desc=script)  # Run each script with a progress bar
 
+def run_model(context):
+    import model
+    model.main(stock_data=load_stock_data(context))
+
+
+# The daily run: fetch, then scan and analyse whatever changed. get is not cached:
+# the ingest manifest already skips tickers that are up to date, and a ticker that
+# failed to fetch is retried on the next run instead of waiting for the next day
+stages = [
+    pipeline.Stage("get", run_get, always=True),
+    pipeline.Stage("down", run_down, inputs=[data_files, "companies.csv"], outputs=["output.txt"], deps=["get"]),
+    pipeline.Stage("model", run_model, inputs=[data_files, "panel/meta.json", "portfolio.json", "screen_rules.json"],
+                   outputs=["shouldbuy.txt", "var_analysis.txt", "summary_stats.csv", "portfolio_suggestions.txt",
+                            "portfolio_correlation.txt"], deps=["get"]),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the daily get/down/model pipeline in one process.")
+    parser.add_argument("--force", action="store_true", help="run every stage even if its inputs are unchanged")
+    parser.add_argument("stages", nargs="*", help="only run these stages (default: all)")
+    parser.add_argument("--profile", action="store_true", help=f"save a cProfile of each stage under {metrics.profile_dir}/")
+    parser.add_argument("--metrics", default=metrics.metrics_file, help="JSON lines file the run's metrics are appended to")
+    parser.add_argument("--prometheus", default=None, help="also write the metrics in Prometheus text format")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        metrics.enable_profiling()
+    report = pipeline.run(stages, force=args.force, only=args.stages or None)
+    pipeline.print_report(report)
+    metrics.registry.write(args.metrics, run="main " + " ".join(args.stages or [s.name for s in stages]))
+    if args.prometheus:
+        metrics.registry.write_prometheus(args.prometheus)
+
+    if any(status == "failed" for _, status, _ in report):
+        print("Some stages failed.")
+        return 1
     print("All scripts completed successfully!")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+from datetime import datetime
+
+# Standard library only, so instrumented scripts stay cheap to import.
+
+# Where metrics are appended, one JSON object per line (modify as needed)
+metrics_file = "metrics.jsonl"
+
+# Where --profile writes <stage>.prof and <stage>.txt
+profile_dir = "profiles"
+
+# Latency histogram bucket upper bounds, in seconds
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Functions shown in each profile's text summary
+profile_top = 30
+
+
+def peak_rss():
+    """
+    Peak resident set size of this process in bytes (None where unsupported, e.g. Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports kilobytes
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram (Prometheus style) with count and sum.
+    """
+
+    def __init__(self, buckets=latency_buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total, out = 0, []
+        for bound, n in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += n
+            out.append((bound, total))
+        return out
+
+
+class Metrics:
+    """
+    Process-wide metrics: counters, latency histograms, per-ticker timings and stage records.
+
+    Counters and histograms are labelled with the stage that was running when
+    they were recorded, so "rows_parsed" can be told apart for down and model.
+    Safe to use from the fetch worker threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.timings = []
+        self.stages = []
+        self.current_stage = None
+        self.profile = False
+        self._profiling = False
+
+    def count(self, name, value=1):
+        key = (name, self.current_stage)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, ticker=None):
+        """
+        Adds one latency observation; with a ticker it is also kept as a per-ticker timing.
+        """
+        key = (name, self.current_stage)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(seconds)
+            if ticker is not None:
+                self.timings.append((name, self.current_stage, ticker, seconds))
+
+    @contextlib.contextmanager
+    def timer(self, name, ticker=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, ticker)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Times a stage and records peak RSS after it; with profiling on, also runs it under cProfile.
+
+        Only the outermost profiled stage is profiled (cProfile cannot nest).
+        """
+        previous, self.current_stage = self.current_stage, name
+        profiler = None
+        if self.profile and not self._profiling:
+            import cProfile
+            profiler = cProfile.Profile()
+            self._profiling = True
+            profiler.enable()
+        start = time.perf_counter()
+        status = "failed"
+        try:
+            yield
+            status = "ok"
+        finally:
+            seconds = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                _save_profile(profiler, name)
+            self.current_stage = previous
+            with self.lock:
+                self.stages.append({"name": name, "status": status, "seconds": seconds, "peak_rss_bytes": peak_rss()})
+
+    def records(self):
+        """
+        Everything recorded so far as a list of JSON-ready dicts.
+        """
+        with self.lock:
+            out = [{"type": "stage", **stage} for stage in self.stages]
+            out += [{"type": "counter", "name": name, "stage": stage, "value": value}
+                    for (name, stage), value in sorted(self.counters.items(), key=lambda item: (item[0][0], str(item[0][1])))]
+            for (name, stage), h in sorted(self.histograms.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+                out.append({"type": "histogram", "name": name, "stage": stage, "count": h.count, "sum": h.sum,
+                            "buckets": {str(bound): n for bound, n in h.cumulative()}})
+            out += [{"type": "timing", "name": name, "stage": stage, "ticker": ticker, "seconds": seconds}
+                    for name, stage, ticker, seconds in self.timings]
+        out.append({"type": "process", "peak_rss_bytes": peak_rss()})
+        return out
+
+    def write(self, path=metrics_file, run=None):
+        """
+        Appends this run's records to a JSON lines file, each tagged with the run name and time.
+        """
+        tag = {"run": run or " ".join(sys.argv), "time": datetime.now().isoformat(timespec='seconds')}
+        with open(path, 'a') as f:
+            for record in self.records():
+                f.write(json.dumps({**tag, **record}) + "\n")
+
+    def write_prometheus(self, path):
+        """
+        Writes counters, histograms and stage timings in the Prometheus text format.
+        """
+        def labels(**pairs):
+            inner = ",".join(f'{k}="{v}"' for k, v in pairs.items() if v is not None)
+            return "{" + inner + "}" if inner else ""
+
+        lines = []
+        for record in self.records():
+            if record["type"] == "counter":
+                lines.append(f"asxbot_{record['name']}_total{labels(stage=record['stage'])} {record['value']}")
+            elif record["type"] == "histogram":
+                name = f"asxbot_{record['name']}"
+                for bound, n in record["buckets"].items():
+                    lines.append(f"{name}_bucket{labels(stage=record['stage'], le=bound)} {n}")
+                lines.append(f"{name}_count{labels(stage=record['stage'])} {record['count']}")
+                lines.append(f"{name}_sum{labels(stage=record['stage'])} {record['sum']}")
+            elif record["type"] == "stage":
+                lines.append(f"asxbot_stage_seconds{labels(stage=record['name'], status=record['status'])} {record['seconds']}")
+            elif record["type"] == "process" and record["peak_rss_bytes"] is not None:
+                lines.append(f"asxbot_peak_rss_bytes {record['peak_rss_bytes']}")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.timings.clear()
+            self.stages.clear()
+
+
+def _save_profile(profiler, name, directory=None):
+    import io
+    import pstats
+    directory = directory or profile_dir
+    os.makedirs(directory, exist_ok=True)
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    profiler.dump_stats(os.path.join(directory, f"{safe}.prof"))
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(profile_top)
+    with open(os.path.join(directory, f"{safe}.txt"), 'w') as f:
+        f.write(text.getvalue())
+
+
+# The shared instance every module records into
+registry = Metrics()
+count = registry.count
+observe = registry.observe
+timer = registry.timer
+stage = registry.stage
+
+
+def enable_profiling(directory=None):
+    """
+    Turns on cProfile capture for every stage run after this call.
+    """
+    global profile_dir
+    if directory:
+        profile_dir = directory
+    registry.profile = True
@@ -1,8 +1,15 @@
 import pandas as pd
 import os
+import time
 import json
 import numpy as np
-import matplotlib.pyplot as plt  # Optional for visualization
+import panel
+import screen
+import report
+import risk
+import optimizer
+import correlation
+import metrics
 
 def load_data(data_dir):
     """
@@ -17,12 +24,29 @@ def load_data(data_dir):
     """
 
     stock_data = {}
+
+    # Prefer the memory-mapped price panel when it has been migrated (rebuilt if the CSVs changed)
+    price_panel = panel.open_current(data_dir)
+    if price_panel is not None:
+        for symbol in price_panel.symbols:
+            dates, prices = price_panel.series(symbol)
+            data = pd.DataFrame({'price': prices}, index=pd.DatetimeIndex(dates, name='date'))
+            metrics.count("rows_parsed", len(data))
+            with metrics.timer("preprocess_seconds", symbol):
+                stock_data[symbol] = preprocess_data(data)
+        return stock_data
+
     for stock_folder in os.listdir(data_dir):
         if os.path.isdir(os.path.join(data_dir, stock_folder)):  # Check if it's a directory
             file_path = os.path.join(data_dir, stock_folder, 'stock_data.csv')
             try:
+                start = time.perf_counter()
                 data = pd.read_csv(file_path, index_col='date', parse_dates=True)
-                stock_data[stock_folder] = preprocess_data(data.copy())  # Avoid modifying original data
+                metrics.observe("read_csv_seconds", time.perf_counter() - start, stock_folder)
+                metrics.count("bytes_read", os.path.getsize(file_path))
+                metrics.count("rows_parsed", len(data))
+                with metrics.timer("preprocess_seconds", stock_folder):
+                    stock_data[stock_folder] = preprocess_data(data.copy())  # Avoid modifying original data
             except FileNotFoundError:
                 print(f"Error: File '{file_path}' not found.")
 
@@ -41,7 +65,10 @@ def preprocess_data(data):
     """
 
     # Handle missing values, outliers, etc. (replace with your preferred methods)
+    missing = data['price'].isna()
     data.fillna(method='ffill', inplace=True)  # Adjust as needed
+    # Remember how many prices the fill invented so the summary still reports them as gaps
+    data.attrs['filled_prices'] = int((missing & data['price'].notna()).sum())
     data.replace([np.inf, -np.inf], 1e10, inplace=True)  # Replace with a suitable large value
 
     # Calculate returns
@@ -50,35 +77,44 @@ def preprocess_data(data):
     # Reset index to ensure it's unique
     data.reset_index(inplace=True)
 
-    # Print summary statistics (writing to a file)
-    with open("summary_stats.txt", "w") as summary_file:
-        summary_file.write("\nSummary Statistics after preprocessing:\n")
-        summary_file.write(str(data.describe()))
-
-    # Feature engineering (add relevant indicators)
-    # ... (consider technical indicators, fundamental analysis, etc.)
+    # Feature engineering: technical indicators are not recomputed per ticker
+    # here. get.py keeps indicators.py's streaming state current, and the
+    # screening metrics and graph.py read the latest values from it
 
     return data
 
 
-def analyze_data(stock_data):
+def write_summary(stock_data):
     """
-    Analyzes data for each stock using various methods (consideration of appropriate
-    techniques needed).
+    Writes descriptive statistics for every stock as one consolidated report.
 
     Args:
         stock_data (dict): Dictionary containing preprocessed data for each stock.
     """
 
-    invest_stocks = []  # List to store stocks to invest in
+    universe = screen.Universe.from_stock_data(stock_data)
+    filled = [stock_data[symbol].attrs.get('filled_prices', 0) for symbol in universe.symbols]
+    report.write_report(universe, report.compute_stats(universe, filled))
+
+
+def analyze_data(stock_data, rules_path=screen.rules_file):
+    """
+    Screens every stock at once against the rules in the screening config.
+
+    Args:
+        stock_data (dict): Dictionary containing preprocessed data for each stock.
+        rules_path (str): Path to the JSON screening rules (see screen.Screener).
+
+    Returns:
+        list: Stocks that meet the investment criteria, ranked if the rules ask for it.
+    """
+
+    universe = screen.Universe.from_stock_data(stock_data)
+    invest_stocks = screen.screen(universe, screen.load_rules(rules_path))
 
     with open("shouldbuy.txt", "w") as recommendations_file:
-        for stock_symbol, data in stock_data.items():
-            # Perform analysis for each stock
-            # Example: Check if the stock meets certain criteria for investment
-            if data['price'].mean() > 50 and data['price'].std() < 10:
-                invest_stocks.append(stock_symbol)
-                recommendations_file.write(f"{stock_symbol}\n")
+        for stock_symbol in invest_stocks:
+            recommendations_file.write(f"{stock_symbol}\n")
 
         # Print stocks to consider investing in (writing to file)
         if invest_stocks:
@@ -86,6 +122,8 @@ def analyze_data(stock_data):
         else:
             recommendations_file.write("No stocks meet the investment criteria.\n")
 
+    return invest_stocks
+
 
 def load_portfolio(file_path):
     """
@@ -105,13 +143,15 @@ def load_portfolio(file_path):
     except FileNotFoundError:
         print(f"Error: Portfolio file '{file_path}' not found.")
         return {}
-def analyze_portfolio(portfolio, stock_data):
+def analyze_portfolio(portfolio, stock_data, candidates=(), cash=None):
     """
     Analyzes the user's portfolio in relation to the stock data.
 
     Args:
         portfolio (dict): Dictionary containing the user's portfolio holdings.
         stock_data (dict): Dictionary containing preprocessed data for each stock.
+        candidates (iterable): Stocks the optimizer may buy besides the holdings.
+        cash (float): Uninvested cash (defaults to optimizer.available_cash).
     """
 
     if not portfolio:
@@ -130,61 +170,59 @@ def analyze_portfolio(portfolio, stock_data):
         metrics_file.write("\nPortfolio Metrics:\n")
         metrics_file.write(f"Total Portfolio Value: ${total_value:.2f}\n")
 
-    try:
-        from scipy.stats import norm  # Assuming a normal distribution for simplicity
-        alpha = 0.05  # Confidence level (5%)
-
-        # Calculate portfolio daily returns
-        portfolio_returns = pd.Series(0, index=stock_data[list(portfolio.keys())[0]].index)
-        for symbol, quantity in portfolio.items():
-            if symbol in stock_data:
-                portfolio_returns += quantity * stock_data[symbol]['returns']
-
-        # Calculate VaR and write to file
-        var = -norm.ppf(alpha) * portfolio_returns.std()
-        with open("var_analysis.txt", "w") as var_file:
-            var_file.write(f"\nValue at Risk (VaR) at {(1 - alpha) * 100}% confidence level: ${var:.2f}\n")
-
-        # Calculate CVaR and write to file
-        cvar = portfolio_returns[portfolio_returns <= var].mean()
-        with open("var_analysis.txt", "a") as cvar_file:
-            cvar_file.write(f"\nConditional Value at Risk (CVaR) at {(1 - alpha) * 100}% confidence level: ${cvar:.2f}\n")
-
-    except ImportError:
-        print("Note: SciPy is required for VaR and CVaR calculations.")
-
-    # Check if any stock quantity exceeds a threshold and suggest selling
-    sell_threshold = 100  # Example threshold, adjust as needed
-    stocks_to_sell = [symbol for symbol, quantity in portfolio.items() if quantity > sell_threshold]
-
-    # Write suggestions to file
-    with open("portfolio_suggestions.txt", "w") as suggestions_file:
-        if stocks_to_sell:
-            suggestions_file.write("\nSuggestions:\n")
-            for symbol in stocks_to_sell:
-                suggestions_file.write(f"Suggestion: Consider selling some shares of {symbol}. Quantity held: {portfolio[symbol]}\n")
-        else:
-            suggestions_file.write("No suggestions to sell.")
+    # Historical-simulation and Monte Carlo VaR/CVaR on date-aligned, value-weighted returns
+    universe = screen.Universe.from_stock_data(stock_data)
+    risk_report = risk.analyze_risk(universe, portfolio)
+    level = risk_report["level"] * 100
+    with open("var_analysis.txt", "w") as var_file:
+        var_file.write(f"\nPortfolio value: ${risk_report['value']:.2f} ({risk_report['observations']} daily returns)\n")
+        var_file.write(f"\nHistorical Value at Risk (VaR) at {level}% confidence level: ${risk_report['historical_var']:.2f}\n")
+        var_file.write(f"Historical Conditional Value at Risk (CVaR) at {level}% confidence level: ${risk_report['historical_cvar']:.2f}\n")
+        var_file.write(f"\nMonte Carlo ({risk_report['mc_paths']} paths, {risk_report['mc_horizon']}-day horizon):\n")
+        var_file.write(f"Value at Risk (VaR) at {level}% confidence level: ${risk_report['mc_var']:.2f}\n")
+        var_file.write(f"Conditional Value at Risk (CVaR) at {level}% confidence level: ${risk_report['mc_cvar']:.2f}\n")
+        if risk_report["missing"]:
+            var_file.write(f"\nNo price data for: {', '.join(risk_report['missing'])}\n")
+
+    # Trade lists towards minimum-variance, maximum-Sharpe and risk-parity targets
+    results = optimizer.optimize(universe, portfolio, optimizer.available_cash if cash is None else cash, candidates)
+    optimizer.write_suggestions(results)
+
+    # Co-movement of the holdings: clusters of correlated stocks and how much value sits in each
+    correlation.write_report(correlation.analyze(universe, portfolio))
 
     # Perform additional analysis or visualization as needed
 
 
-if __name__ == "__main__":
-    # Path to the directory containing stock data folders (replace with actual path)
-    data_dir = 'data'  # Replace with the actual path to your data directory
+def main(stock_data=None, data_dir='data', portfolio_file_path='portfolio.json'):
+    """
+    Runs the full analysis.
+
+    Args:
+        stock_data (dict): Already loaded stock data to reuse (loaded from data_dir if None).
+        data_dir (str): Path to the directory containing stock data folders.
+        portfolio_file_path (str): Path to the portfolio JSON file.
+    """
 
     # Load data from multiple files
-    stock_data = load_data(data_dir)
+    if stock_data is None:
+        stock_data = load_data(data_dir)
 
     # Load user's portfolio from JSON file
-    portfolio_file_path = 'portfolio.json'  # Replace with the path to your portfolio JSON file
     portfolio = load_portfolio(portfolio_file_path)
 
+    # Summary statistics for the whole universe (one report instead of one per stock)
+    write_summary(stock_data)
+
     # Analyze data for each stock
-    analyze_data(stock_data)
+    invest_stocks = analyze_data(stock_data)
 
-    # Analyze the user's portfolio
-    analyze_portfolio(portfolio, stock_data)
+    # Analyze the user's portfolio (the screening picks are candidates for the optimizer)
+    analyze_portfolio(portfolio, stock_data, candidates=invest_stocks)
 
     # Disclaimer: This analysis is for educational purposes only and does not constitute investment advice.
     print("\nImportant: This code should not be used to make real-world investment decisions. Consult with a financial advisor before making any investment decisions.")
+
+
+if __name__ == "__main__":
+    main()
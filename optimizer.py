@@ -0,0 +1,339 @@
+import os
+import json
+import argparse
+import numpy as np
+import risk
+
+# Optimizer settings (modify as needed)
+available_cash = 0.0  # Uninvested cash that may be allocated on top of the holdings
+max_weight = 0.10  # Position limit as a fraction of the total account value
+lookback_days = 250  # Daily returns used for the covariance and mean estimates
+trading_days_per_year = 252
+risk_free_rate = 0.0  # Annual, for the Sharpe ratio
+min_trade_value = 500.0  # Smaller trades are skipped (the flat brokerage would dominate)
+
+# Methods written to portfolio_suggestions.txt, in order
+methods = ("min_variance", "max_sharpe", "risk_parity")
+
+# Risk aversions tried (as one batch) when searching for the maximum Sharpe ratio,
+# relative to mean |daily return| / equal-weight portfolio variance
+sharpe_risk_aversions = np.logspace(-1.5, 1.5, 16)
+
+# Solver settings
+max_iterations = 2000
+tolerance = 1e-7
+
+# Previous target weights, used to warm-start the next run
+state_file = "optimizer_state.json"
+
+suggestions_file = "portfolio_suggestions.txt"
+
+
+def ledoit_wolf(returns):
+    """
+    Ledoit-Wolf covariance shrinkage towards a scaled identity.
+
+    Args:
+        returns (np.ndarray): (observations, assets) returns.
+
+    Returns:
+        tuple: (shrunk covariance, shrinkage intensity in [0, 1]).
+    """
+    t, n = returns.shape
+    x = returns - returns.mean(axis=0)
+    sample = x.T @ x / t
+    mu = np.trace(sample) / n
+    target = mu * np.eye(n)
+    delta = np.sum((sample - target) ** 2) / n
+    # Average squared distance between each observation's outer product and the sample covariance
+    x2 = x ** 2
+    beta = (np.sum(x2.T @ x2) / t - np.sum(sample ** 2)) / (n * t)
+    shrinkage = 0.0 if delta == 0 else min(max(beta / delta, 0.0), 1.0)
+    return shrinkage * target + (1 - shrinkage) * sample, shrinkage
+
+
+def project_capped_simplex(v, cap):
+    """
+    Euclidean projection of each row of v onto {w : 0 <= w <= cap, sum(w) = 1}.
+
+    The projection is w = clip(v - tau, 0, cap), where sum(w) is piecewise linear
+    in tau with breakpoints at v and v - cap. Sorting the breakpoints gives the
+    sum at each one by a cumulative sum, and tau is interpolated inside the
+    bracketing segment, for all rows at once.
+    """
+    v = np.atleast_2d(v)
+    k, n = v.shape
+    points = np.concatenate([v - cap, v], axis=1)
+    # Moving tau past v - cap frees a weight from the cap; moving past v zeroes it
+    events = np.concatenate([np.full((k, n), -1.0), np.full((k, n), 1.0)], axis=1)
+    order = np.argsort(points, axis=1)
+    points = np.take_along_axis(points, order, axis=1)
+    slope = np.cumsum(np.take_along_axis(events, order, axis=1), axis=1)
+    # Sum of weights at each breakpoint, starting from n * cap with every weight capped
+    totals = n * cap + np.concatenate([np.zeros((k, 1)), np.cumsum(slope[:, :-1] * np.diff(points, axis=1), axis=1)], axis=1)
+    j = np.clip((totals > 1).sum(axis=1) - 1, 0, 2 * n - 2)  # Last breakpoint with a sum above 1
+    rows = np.arange(k)
+    tau = points[rows, j] + (totals[rows, j] - 1) / np.where(slope[rows, j] != 0, -slope[rows, j], np.inf)
+    return np.clip(v - tau[:, None], 0, cap)
+
+
+def solve_quadratic(cov, mu, risk_aversion, cap, start):
+    """
+    Maximises mu.w - (risk_aversion / 2) w.cov.w over the capped simplex.
+
+    Accelerated projected gradient (FISTA with adaptive restarts) over a batch of problems: each row of
+    `risk_aversion` and `start` is one problem, so one matrix product per step
+    serves the whole batch.
+
+    Args:
+        cov (np.ndarray): (n, n) covariance.
+        mu (np.ndarray): (n,) expected returns (zeros for minimum variance).
+        risk_aversion (np.ndarray): (k,) risk aversion per problem.
+        cap (float): Position limit.
+        start (np.ndarray): (k, n) starting weights (e.g. the previous run's result).
+
+    Returns:
+        tuple: ((k, n) weights, iterations used).
+    """
+    gamma = np.asarray(risk_aversion, dtype=float)[:, None]
+    lipschitz = gamma * np.linalg.eigvalsh(cov)[-1]
+    step = 1.0 / np.maximum(lipschitz, 1e-12)
+    w = project_capped_simplex(start, cap)
+    y, momentum = w.copy(), np.ones((len(w), 1))
+    active = np.arange(len(w))  # Problems that have not converged yet
+    for iteration in range(1, max_iterations + 1):
+        g, s, wa, ya, ma = gamma[active], step[active], w[active], y[active], momentum[active]
+        w_next = project_capped_simplex(ya - s * (g * (ya @ cov) - mu), cap)
+        # Restart the momentum of any problem whose step turned back against it
+        restart = np.sum((ya - w_next) * (w_next - wa), axis=1, keepdims=True) > 0
+        ma = np.where(restart, 1.0, ma)
+        m_next = (1 + np.sqrt(1 + 4 * ma ** 2)) / 2
+        y[active] = w_next + (ma - 1) / m_next * (w_next - wa)
+        change = np.max(np.abs(w_next - wa), axis=1)
+        w[active], momentum[active] = w_next, m_next
+        active = active[change >= tolerance]
+        if len(active) == 0:
+            break
+    return w, iteration
+
+
+def min_variance(cov, cap, start):
+    weights, _ = solve_quadratic(cov, np.zeros(len(cov)), np.ones(1), cap, start[None, :])
+    return weights[0]
+
+
+def max_sharpe(cov, mu, cap, start, rf=0.0, previous_aversion=None):
+    """
+    Maximum Sharpe ratio portfolio under the position limit.
+
+    The efficient frontier is traced by solving a batch of mean-variance
+    problems (one per risk aversion) together, and the best Sharpe is kept.
+    With the previous run's best risk aversion only a narrow band around it is
+    searched.
+
+    Returns:
+        tuple: (weights, risk aversion of the chosen portfolio).
+    """
+    if previous_aversion:
+        aversions = previous_aversion * np.logspace(-0.5, 0.5, 5)
+    else:
+        equal = np.full(len(mu), 1.0 / len(mu))
+        aversions = sharpe_risk_aversions * np.abs(mu).mean() / max(equal @ cov @ equal, 1e-18)
+    batch = np.repeat(start[None, :], len(aversions), axis=0)
+    frontier, _ = solve_quadratic(cov, mu, aversions, cap, batch)
+    excess = frontier @ mu - rf
+    volatility = np.sqrt(np.einsum('ij,jk,ik->i', frontier, cov, frontier))
+    sharpe = np.where(volatility > 0, excess / np.maximum(volatility, 1e-12), -np.inf)
+    best = int(np.argmax(sharpe))
+    return frontier[best], float(aversions[best])
+
+
+def risk_parity(cov, cap, start):
+    """
+    Equal risk contribution weights, then projected onto the position limit.
+
+    Minimises 0.5 w.cov.w - (1 / n) sum(log w) by damped Newton steps, whose
+    optimum satisfies w_i * (cov @ w)_i = 1 / n for every ticker. Started from
+    the previous weights, a daily re-run converges in a few steps.
+    """
+    n = len(cov)
+    budget = 1.0 / n
+    w = np.where(start > 0, start, 1.0 / n)
+    w = w / np.sqrt(max(w @ cov @ w, 1e-18))  # Same scale as the optimum (total risk of 1)
+    for _ in range(100):
+        gradient = cov @ w - budget / w
+        hessian = cov + np.diag(budget / w ** 2)
+        direction = np.linalg.solve(hessian, gradient)
+        step = 1.0
+        while np.any(w - step * direction <= 0):
+            step /= 2  # Stay inside the positive orthant
+        w = w - step * direction
+        if np.max(np.abs(step * direction)) < tolerance * w.sum():
+            break
+    return project_capped_simplex(w / w.sum(), cap)[0]
+
+
+def whole_shares(weights, prices, total_value, current):
+    """
+    Rounds target weights to whole shares without spending more than total_value.
+
+    Shares are floored first and changes too small to pay for their brokerage
+    are dropped. Leftover cash then buys one share at a time of the traded
+    position furthest below its target value.
+
+    Returns:
+        np.ndarray: Target share counts.
+    """
+    target_values = weights * total_value
+    shares = np.floor(target_values / prices)
+    small = np.abs(shares - current) * prices < min_trade_value
+    shares[small] = current[small]
+
+    cash = total_value - shares @ prices
+    while cash < 0:
+        # Skipped sells did not raise their cash, so trim the most overweight buy
+        excess = np.where(shares > current, shares * prices - target_values, -np.inf)
+        i = int(np.argmax(excess))
+        if excess[i] == -np.inf:
+            break
+        cut = min(np.ceil(-cash / prices[i]), shares[i] - current[i])
+        shares[i] -= cut
+        cash += cut * prices[i]
+
+    while True:
+        shortfall = np.where((prices <= cash) & (shares != current), target_values - shares * prices, -np.inf)
+        i = int(np.argmax(shortfall))
+        if shortfall[i] <= 0:
+            break
+        shares[i] += 1
+        cash -= prices[i]
+    return shares
+
+
+def load_state(path=state_file):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(state, path=state_file):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def _start(previous, symbols):
+    """
+    Warm-start weights: the previous run's targets where known, equal weight otherwise.
+    """
+    equal = 1.0 / len(symbols)
+    return np.array([previous.get(symbol, equal) for symbol in symbols], dtype=float)
+
+
+def optimize(universe, portfolio, cash=available_cash, candidates=(), cap=max_weight, state_path=state_file):
+    """
+    Computes target allocations and trade lists for every method.
+
+    Args:
+        universe (screen.Universe): Date-aligned prices.
+        portfolio (dict): Current holdings {symbol: quantity}.
+        cash (float): Uninvested cash available to allocate.
+        candidates (iterable): Extra symbols that may be bought (e.g. the screening picks).
+        cap (float): Position limit as a fraction of the account value.
+        state_path (str): Warm-start state file (None to disable).
+
+    Returns:
+        dict: {method: {"symbols", "weights", "shares", "trades", "volatility",
+               "expected_return", "cash_left"}}, plus "missing" and "shrinkage".
+    """
+    holdings = dict(portfolio)
+    for symbol in candidates:
+        holdings.setdefault(symbol, 0)
+    data = risk.PortfolioReturns(universe, holdings)
+    priced = data.prices > 0
+    symbols = [s for s, ok in zip(data.symbols, priced) if ok]
+    results = {"missing": data.missing + [s for s, ok in zip(data.symbols, priced) if not ok], "shrinkage": 0.0}
+    if not symbols:
+        return results
+
+    prices = data.prices[priced]
+    current = data.quantities[priced]
+    returns = data.returns[-lookback_days:, priced]
+    total_value = float(current @ prices) + cash
+    cap = max(cap, 1.0 / len(symbols))  # The limit must leave a feasible allocation
+
+    cov, results["shrinkage"] = ledoit_wolf(returns) if len(returns) > 1 else (np.diag(np.full(len(symbols), 1e-4)), 1.0)
+    mu = returns.mean(axis=0) if len(returns) else np.zeros(len(symbols))
+    rf = risk_free_rate / trading_days_per_year
+
+    state = load_state(state_path) if state_path else {}
+    for method in methods:
+        start = _start(state.get(method, {}), symbols)
+        if method == "min_variance":
+            weights = min_variance(cov, cap, start)
+        elif method == "max_sharpe":
+            weights, state["risk_aversion"] = max_sharpe(cov, mu, cap, start, rf, state.get("risk_aversion"))
+        else:
+            weights = risk_parity(cov, cap, start)
+        shares = whole_shares(weights, prices, total_value, current)
+        trades = [(symbol, int(delta), float(delta * price))
+                  for symbol, delta, price in zip(symbols, shares - current, prices) if delta != 0]
+        results[method] = {
+            "symbols": symbols,
+            "weights": weights,
+            "shares": shares,
+            "trades": sorted(trades, key=lambda trade: trade[2]),  # Sells first, they fund the buys
+            "volatility": float(np.sqrt(weights @ cov @ weights * trading_days_per_year)),
+            "expected_return": float(weights @ mu * trading_days_per_year),
+            "cash_left": float(total_value - shares @ prices),
+        }
+        state[method] = {symbol: float(w) for symbol, w in zip(symbols, weights) if w > 0}
+
+    if state_path:
+        save_state(state, state_path)
+    return results
+
+
+def write_suggestions(results, path=suggestions_file):
+    """
+    Writes one trade list per method to portfolio_suggestions.txt.
+    """
+    import backtest  # Brokerage schedule
+    with open(path, 'w') as f:
+        for method in methods:
+            if method not in results:
+                continue
+            r = results[method]
+            f.write(f"\nSuggestions ({method.replace('_', ' ')}, expected volatility {r['volatility'] * 100:.2f}%, "
+                    f"expected return {r['expected_return'] * 100:.2f}%):\n")
+            if not r["trades"]:
+                f.write("No trades needed.\n")
+            for symbol, delta, value in r["trades"]:
+                action = "Buy" if delta > 0 else "Sell"
+                fee = float(backtest.brokerage(np.array([value]))[0])
+                f.write(f"{action} {abs(delta)} shares of {symbol} (${abs(value):.2f}, brokerage ${fee:.2f})\n")
+            f.write(f"Cash left: ${r['cash_left']:.2f}\n")
+        if results.get("missing"):
+            f.write(f"\nNo price data for: {', '.join(results['missing'])}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suggest trades towards optimised target allocations.")
+    parser.add_argument("--portfolio", default="portfolio.json")
+    parser.add_argument("--cash", type=float, default=available_cash)
+    parser.add_argument("--max-weight", type=float, default=max_weight)
+    parser.add_argument("--candidates", nargs="*", default=(), help="extra symbols that may be bought")
+    args = parser.parse_args(argv)
+
+    import model
+    import screen
+    universe = screen.Universe.from_stock_data(model.load_data("data"))
+    results = optimize(universe, model.load_portfolio(args.portfolio), args.cash, args.candidates, args.max_weight)
+    write_suggestions(results)
+    print(f"Wrote trade lists to {suggestions_file}")
+
+if __name__ == "__main__":
+    main()
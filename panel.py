@@ -0,0 +1,351 @@
+import os
+import csv
+import json
+import hashlib
+import numpy as np
+import metrics
+
+# Location of the on-disk price panel (modify as needed)
+panel_dir = "panel"
+
+# File names inside the panel directory
+meta_file = "meta.json"
+dates_file = "dates.bin"
+prices_file = "prices.bin"
+
+# Prices are stored row-major as (date, ticker) float64, dates as int64 days since epoch
+price_dtype = np.float64
+date_dtype = np.int64
+
+
+def _to_day(date_str):
+    """
+    Converts a date string (or datetime-like) into an integer day number.
+    """
+    return int(np.datetime64(str(date_str)[:10], 'D').astype(date_dtype))
+
+
+def _write_meta(path, symbols, n_dates, sources=None):
+    """
+    Atomically writes the panel metadata file.
+
+    Args:
+        sources (dict): {"data_dir", "stamp"} the panel mirrors; None keeps the current entry.
+    """
+    meta_path = os.path.join(path, meta_file)
+    if sources is None and os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            sources = json.load(f).get("sources")
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"symbols": symbols, "n_dates": n_dates, "dtype": np.dtype(price_dtype).str,
+                   "sources": sources or {}}, f)
+    os.replace(tmp_path, meta_path)
+
+
+def source_stamp(data_dir="data"):
+    """
+    Fingerprint of every data/<CODE>/stock_data.csv (name, size and modification time).
+
+    Only the files are stat'ed, so checking it costs one listdir plus one stat per ticker.
+    """
+    digest = hashlib.sha1()
+    for folder in sorted(os.listdir(data_dir)):
+        try:
+            st = os.stat(os.path.join(data_dir, folder, 'stock_data.csv'))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        digest.update(f"{folder}:{st.st_size}:{st.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _sources(data_dir):
+    return {"data_dir": os.path.abspath(data_dir), "stamp": source_stamp(data_dir)}
+
+
+class PricePanel:
+    """
+    Read access to a memory-mapped date x ticker price panel.
+
+    Args:
+        path (str): Directory holding the panel files.
+        mode (str): 'r' for read-only maps, 'r+' to allow in-place edits.
+    """
+
+    def __init__(self, path=panel_dir, mode='r'):
+        self.path = path
+        self.mode = mode
+
+        with open(os.path.join(path, meta_file), 'r') as f:
+            meta = json.load(f)
+
+        self.symbols = meta["symbols"]
+        self.n_dates = meta["n_dates"]
+        self.sources = meta.get("sources") or {}
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        shape = (self.n_dates, len(self.symbols))
+        if self.n_dates and self.symbols:
+            self.prices = np.memmap(os.path.join(path, prices_file), dtype=price_dtype, mode=mode, shape=shape)
+            self.days = np.memmap(os.path.join(path, dates_file), dtype=date_dtype, mode='r', shape=(self.n_dates,))
+        else:
+            # np.memmap cannot map an empty file
+            self.prices = np.empty(shape, dtype=price_dtype)
+            self.days = np.empty((self.n_dates,), dtype=date_dtype)
+
+    @property
+    def dates(self):
+        """
+        Returns the panel dates as a datetime64[D] view (no copy).
+        """
+        return self.days.view('datetime64[D]')
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def matrix(self):
+        """
+        Returns the full (date, ticker) price array backed by the memory map.
+        """
+        return self.prices
+
+    def column(self, symbol):
+        """
+        Returns a strided view over one ticker's prices (no copy).
+
+        Args:
+            symbol (str): Stock code, e.g. 'CBA'.
+
+        Returns:
+            np.ndarray: Prices for every panel date, NaN where the ticker has no row.
+        """
+        return self.prices[:, self.index[symbol]]
+
+    def series(self, symbol):
+        """
+        Returns the dates and prices a ticker actually has data for.
+
+        Args:
+            symbol (str): Stock code, e.g. 'CBA'.
+
+        Returns:
+            tuple: (dates, prices) arrays with NaN rows removed.
+        """
+        prices = self.column(symbol)
+        mask = ~np.isnan(prices)
+        return self.dates[mask], prices[mask]
+
+    def last_price(self, symbol):
+        """
+        Returns the most recent non-NaN price for a ticker, or None.
+        """
+        prices = self.column(symbol)
+        valid = np.flatnonzero(~np.isnan(prices))
+        return float(prices[valid[-1]]) if len(valid) else None
+
+    def close(self):
+        """
+        Flushes and drops the memory maps.
+        """
+        if isinstance(self.prices, np.memmap) and self.mode != 'r':
+            self.prices.flush()
+        self.prices = None
+        self.days = None
+
+
+def open_panel(path=panel_dir, mode='r'):
+    """
+    Opens the price panel, or returns None if it has not been created yet.
+    """
+    if not os.path.exists(os.path.join(path, meta_file)):
+        return None
+    return PricePanel(path, mode)
+
+
+def is_current(data_dir="data", path=panel_dir):
+    """
+    True if the panel exists and mirrors data_dir exactly as it is on disk now.
+    """
+    price_panel = open_panel(path)
+    if price_panel is None:
+        return False
+    return price_panel.sources == _sources(data_dir)
+
+
+def mark_current(data_dir="data", path=panel_dir):
+    """
+    Records that the panel matches data_dir as it is now (after get.py appended the same rows to both).
+    """
+    price_panel = open_panel(path)
+    if price_panel is not None:
+        _write_meta(path, price_panel.symbols, price_panel.n_dates, _sources(data_dir))
+
+
+def open_current(data_dir="data", path=panel_dir):
+    """
+    Opens the panel for data_dir, rebuilding it first if the CSVs changed since it was written.
+
+    The CSVs stay the source of truth: validate.py repairs, or catch-up writes that
+    did not go through get.py, make the panel stale, and the next reader rebuilds it.
+
+    Returns:
+        PricePanel: The panel, or None if there is none or it mirrors another directory
+                    (callers then read the CSVs).
+    """
+    price_panel = open_panel(path)
+    if price_panel is None:
+        return None
+    built_from = price_panel.sources.get("data_dir")
+    if built_from is not None and built_from != os.path.abspath(data_dir):
+        return None
+    if price_panel.sources != _sources(data_dir):
+        price_panel.close()
+        metrics.count("panel_rebuilds")
+        price_panel = migrate_from_csv(data_dir, path)
+    return price_panel
+
+
+def write_panel(path, symbols, days, prices, sources=None):
+    """
+    Writes a complete panel, replacing any existing one.
+
+    Args:
+        path (str): Directory to write the panel into.
+        symbols (list): Ticker symbols, one per column.
+        days (np.ndarray): Integer day numbers, one per row, sorted ascending.
+        prices (np.ndarray): (len(days), len(symbols)) price matrix.
+    """
+    os.makedirs(path, exist_ok=True)
+    prices = np.ascontiguousarray(prices, dtype=price_dtype)
+    days = np.ascontiguousarray(days, dtype=date_dtype)
+
+    for name, array in ((prices_file, prices), (dates_file, days)):
+        tmp_path = os.path.join(path, name + ".tmp")
+        array.tofile(tmp_path)
+        os.replace(tmp_path, os.path.join(path, name))
+
+    _write_meta(path, list(symbols), len(days), sources)
+
+
+def append_day(date, prices, path=panel_dir):
+    """
+    Appends (or overwrites) one trading day in place.
+
+    New dates are appended as a single row at the end of the price file. If the
+    date is already the last row it is updated in place. Tickers not yet in the
+    panel trigger a one-off rewrite that adds their columns.
+
+    Args:
+        date (str): Trading date, 'YYYY-MM-DD'.
+        prices (dict): Mapping of stock code to closing price.
+        path (str): Panel directory.
+    """
+    day = _to_day(date)
+    panel = open_panel(path)
+
+    if panel is None:
+        symbols = sorted(prices)
+        write_panel(path, symbols, np.array([day]), np.array([[prices[s] for s in symbols]]))
+        return
+
+    symbols, n_dates = list(panel.symbols), panel.n_dates
+    new_symbols = sorted(s for s in prices if s not in panel.index)
+    last_day = int(panel.days[-1]) if n_dates else None
+
+    if new_symbols or (last_day is not None and day < last_day):
+        # Rare path: widen the panel or insert a back-dated row
+        days = np.array(panel.days)
+        matrix = np.array(panel.prices)
+        panel.close()
+        symbols += new_symbols
+        matrix = np.hstack([matrix, np.full((n_dates, len(new_symbols)), np.nan)])
+        if day not in days:
+            pos = np.searchsorted(days, day)
+            days = np.insert(days, pos, day)
+            matrix = np.insert(matrix, pos, np.nan, axis=0)
+        row = matrix[np.searchsorted(days, day)]
+        for symbol, price in prices.items():
+            row[symbols.index(symbol)] = price
+        write_panel(path, symbols, days, matrix)
+        return
+
+    if day == last_day:
+        # Same day re-run: patch the last row in place
+        panel.close()
+        panel = PricePanel(path, 'r+')
+        for symbol, price in prices.items():
+            panel.prices[-1, panel.index[symbol]] = price
+        panel.close()
+        return
+
+    panel.close()
+    row = np.full(len(symbols), np.nan, dtype=price_dtype)
+    for symbol, price in prices.items():
+        row[panel.index[symbol]] = price
+
+    row_bytes = n_dates * len(symbols) * np.dtype(price_dtype).itemsize
+    with open(os.path.join(path, prices_file), 'r+b') as f:
+        # Drop anything past the last committed row (e.g. from an interrupted append)
+        f.truncate(row_bytes)
+        f.seek(row_bytes)
+        f.write(row.tobytes())
+    with open(os.path.join(path, dates_file), 'r+b') as f:
+        f.truncate(n_dates * np.dtype(date_dtype).itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(np.array([day], dtype=date_dtype).tobytes())
+
+    # The metadata is written last, so a partial append is never visible
+    _write_meta(path, symbols, n_dates + 1)
+
+
+def migrate_from_csv(data_dir="data", path=panel_dir):
+    """
+    Builds the panel from the existing data/<CODE>/stock_data.csv tree.
+
+    Args:
+        data_dir (str): Path to the directory containing stock data folders.
+        path (str): Panel directory to write.
+
+    Returns:
+        PricePanel: The newly written panel.
+    """
+    sources = _sources(data_dir)  # Taken first, so a file changed mid-read makes the panel stale
+    series = {}
+    for stock_folder in sorted(os.listdir(data_dir)):
+        file_path = os.path.join(data_dir, stock_folder, 'stock_data.csv')
+        if not os.path.isfile(file_path):
+            continue
+
+        rows = {}
+        with open(file_path, 'r', newline='') as file:
+            reader = csv.reader(file)
+            next(reader, None)  # Skip header row
+            for row in reader:
+                try:
+                    rows[_to_day(row[0])] = float(row[1])
+                except (ValueError, IndexError):
+                    continue
+        series[stock_folder] = rows
+
+    symbols = sorted(series)
+    days = np.array(sorted({day for rows in series.values() for day in rows}), dtype=date_dtype)
+    position = {day: i for i, day in enumerate(days.tolist())}
+
+    matrix = np.full((len(days), len(symbols)), np.nan, dtype=price_dtype)
+    for col, symbol in enumerate(symbols):
+        for day, price in series[symbol].items():
+            matrix[position[day], col] = price
+
+    write_panel(path, symbols, days, matrix, sources)
+    return PricePanel(path)
+
+
+def main():
+    panel = migrate_from_csv()
+    print(f"Wrote {panel.n_dates} dates x {len(panel)} tickers to {panel_dir}/")
+
+if __name__ == "__main__":
+    main()
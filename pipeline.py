@@ -0,0 +1,172 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import metrics
+
+# Fingerprints of the last successful run of each stage
+cache_file = ".pipeline_cache.json"
+
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    Args:
+        name (str): Stage name.
+        func (callable): Called as func(context); may read and add shared data in the context dict.
+        inputs (list): File paths or glob patterns whose changes invalidate the stage.
+        outputs (list): Files the stage writes; the stage re-runs if any is missing.
+        deps (list): Names of stages that must run first.
+        config (callable): Optional callable returning extra JSON-serialisable state to
+            fingerprint (e.g. rule settings).
+        always (bool): Run on every pipeline run, for stages that already skip
+            finished work themselves (e.g. get, through the ingest manifest).
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), deps=(), config=None, always=False):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.config = config
+        self.always = always
+
+
+def _expand(patterns):
+    paths = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern)
+        paths.update(matches if matches else [pattern])
+    return sorted(paths)
+
+
+def fingerprint(stage):
+    """
+    Hashes a stage's input file metadata (path, size, mtime) and config.
+
+    Metadata is used instead of file contents so that fingerprinting hundreds of
+    CSV files costs one stat() each.
+    """
+    digest = hashlib.sha256()
+    for path in _expand(stage.inputs):
+        try:
+            st = os.stat(path)
+            digest.update(f"{path}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+        except FileNotFoundError:
+            digest.update(f"{path}\0missing\n".encode())
+    if stage.config is not None:
+        digest.update(json.dumps(stage.config(), sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _order(stages):
+    """
+    Topologically sorts stages by their dependencies.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    ordered, visiting, done = [], set(), set()
+
+    def visit(stage):
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"Pipeline has a dependency cycle at stage '{stage.name}'")
+        visiting.add(stage.name)
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+            visit(by_name[dep])
+        visiting.discard(stage.name)
+        done.add(stage.name)
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return ordered
+
+
+def load_cache(path=cache_file):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_cache(cache, path=cache_file):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f, indent=4, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def run(stages, force=False, only=None, context=None, cache_path=cache_file):
+    """
+    Runs the stages in dependency order in this process, skipping unchanged ones.
+
+    A stage runs when it is forced or marked always, when its input fingerprint
+    differs from the last successful run, or when one of its outputs is missing.
+    Dependencies only order the stages: an upstream stage that changes files
+    invalidates its dependants through their inputs. A failing stage stops its
+    dependants but not unrelated stages.
+
+    Args:
+        stages (list): Stage objects.
+        force (bool): Run every stage regardless of the cache.
+        only (list): Optional stage names to restrict the run to.
+        context (dict): Shared data passed to every stage function.
+        cache_path (str): Where fingerprints are stored.
+
+    Returns:
+        list: (stage name, status, seconds) per stage, status being 'ran', 'skipped' or 'failed'.
+    """
+    context = context if context is not None else {}
+    cache = load_cache(cache_path)
+    failed, report = set(), []
+
+    for stage in _order(stages):
+        if only and stage.name not in only:
+            continue
+        if any(dep in failed for dep in stage.deps):
+            report.append((stage.name, "failed", 0.0))
+            failed.add(stage.name)
+            print(f"[{stage.name}] not run: a dependency failed")
+            continue
+
+        start = time.perf_counter()
+        before = fingerprint(stage)
+        outputs_missing = any(not os.path.exists(path) for path in stage.outputs)
+        stale = force or stage.always or outputs_missing or cache.get(stage.name) != before
+
+        if not stale:
+            report.append((stage.name, "skipped", time.perf_counter() - start))
+            continue
+
+        try:
+            with metrics.stage(stage.name):
+                stage.func(context)
+        except Exception as e:
+            failed.add(stage.name)
+            report.append((stage.name, "failed", time.perf_counter() - start))
+            print(f"[{stage.name}] failed: {type(e).__name__}: {e}")
+            continue
+
+        # Fingerprint after the run, so a stage that rewrites its own inputs stays cached
+        cache[stage.name] = fingerprint(stage)
+        save_cache(cache, cache_path)
+        report.append((stage.name, "ran", time.perf_counter() - start))
+
+    return report
+
+
+def print_report(report):
+    """
+    Prints per-stage status and wall time.
+    """
+    print("\nStage          Status    Seconds")
+    for name, status, seconds in report:
+        print(f"{name:<14} {status:<9} {seconds:8.3f}")
+    print(f"{'total':<14} {'':<9} {sum(r[2] for r in report):8.3f}")
@@ -1,17 +1,53 @@
 import os
 import pandas as pd
 import json
+from datetime import date, timedelta
 from tqdm import tqdm
-import multiprocessing
+import math
+import numpy as np
+import archive
 
-def load_data(data_dir):
+# Days of history read for the holdings (modify as needed)
+lookback_days = 90
+
+def history_start(days=lookback_days, today=None):
+    """
+    First date 'YYYY-MM-DD' of the look-back window.
+    """
+    return ((today or date.today()) - timedelta(days=days)).strftime('%Y-%m-%d')
+
+def load_data(data_dir, codes=None, start=None, columns=('Close',)):
+    """
+    Loads holdings data, reading only the needed tickers, dates and columns from the OHLCV archive.
+
+    Falls back to the legacy stock_data/<CODE>.csv dumps when the archive is empty.
+
+    Args:
+        data_dir (str): Directory of the legacy CSV dumps.
+        codes (iterable): Tickers to read (e.g. the holdings); None reads every ticker.
+        start (str): First date 'YYYY-MM-DD'; None reads all history. Year partitions
+            before it are never opened.
+        columns (tuple): Archive columns to decompress.
+    """
+    wanted = None if codes is None else set(codes)
     stock_data = {}
+    for stock_symbol in archive.codes():
+        if wanted is not None and stock_symbol not in wanted:
+            continue
+        data = archive.read_frame(stock_symbol, start=start, columns=list(columns))
+        if len(data):
+            stock_data[stock_symbol] = preprocess_data(data)
+    if stock_data:
+        return stock_data
+
     for stock_file in os.listdir(data_dir):
-        if stock_file.endswith('.csv'):
+        stock_symbol = os.path.splitext(stock_file)[0]
+        if stock_file.endswith('.csv') and (wanted is None or stock_symbol in wanted):
             file_path = os.path.join(data_dir, stock_file)
             try:
                 data = pd.read_csv(file_path, parse_dates=['Date'])
-                stock_symbol = os.path.splitext(stock_file)[0]
+                if start is not None:
+                    data = data[data['Date'] >= pd.Timestamp(start)]
                 stock_data[stock_symbol] = preprocess_data(data.copy())
             except FileNotFoundError:
                 print(f"Error: File '{file_path}' not found.")
@@ -38,47 +74,64 @@ def load_portfolio(file_path):
         print(f"Error: Portfolio file '{file_path}' not found.")
         return {}
 
+def last_prices(closes):
+    """
+    Latest non-NaN closing price of every holding.
+
+    Only the last element of each history is read; the rare history that ends
+    in a gap is searched backwards. The cost is O(holdings), not O(rows).
+
+    Args:
+        closes (list): One closing-price array per holding.
+
+    Returns:
+        np.ndarray: Last price per holding, NaN where a holding has no prices.
+    """
+    last = np.array([c[-1] if len(c) else np.nan for c in closes], dtype=np.float64)
+    for k in np.flatnonzero(np.isnan(last)):
+        valid = np.flatnonzero(~np.isnan(closes[k]))
+        if len(valid):
+            last[k] = closes[k][valid[-1]]
+    return last
+
 def analyze_portfolio(portfolio, stock_data):
     if not portfolio:
         print("No portfolio data available.")
         return
 
-    total_investment = multiprocessing.Value('d', 0)
-    current_value = multiprocessing.Value('d', 0)
-    processes = []
-
-    for symbol, quantity in portfolio.items():
-        if symbol in stock_data:
-            process = multiprocessing.Process(target=analyze_stock, args=(symbol, quantity, stock_data, total_investment, current_value))
-            processes.append(process)
-            process.start()
+    symbols = [symbol for symbol in portfolio if symbol in stock_data]
+    closes = [stock_data[symbol]['Close'].to_numpy(dtype=np.float64) for symbol in symbols]
+    quantities = np.array([portfolio[symbol] for symbol in symbols], dtype=np.float64)
 
-    for process in processes:
-        process.join()
+    # Holdings without any price count as zero
+    values = np.nan_to_num(last_prices(closes) * quantities) if symbols else np.zeros(0)
+    total_investment = math.fsum(values)
+    current_value = math.fsum(values)
 
-    print(f"\nTotal Investment: {total_investment.value}")
-    print(f"Current Value: {current_value.value}")
+    print(f"\nTotal Investment: {total_investment}")
+    print(f"Current Value: {current_value}")
 
-    if current_value.value < total_investment.value:
+    if current_value < total_investment:
         print("Your portfolio is underperforming. Consider selling some stocks.")
-    elif current_value.value > total_investment.value:
+    elif current_value > total_investment:
         print("Your portfolio is performing well. You can consider holding or even buying more.")
     else:
         print("Your portfolio value remains the same.")
 
-def analyze_stock(symbol, quantity, stock_data, total_investment, current_value):
-    stock_price = stock_data[symbol]['Close'].iloc[-1]  # Get the latest closing price
-    total_investment.value += stock_price * quantity
-    current_value.value += stock_price * quantity
+    return total_investment, current_value
 
-if __name__ == "__main__":
+def main():
     data_dir = 'stock_data'
-    stock_data = load_data(data_dir)
-
     portfolio_file_path = 'portfolio.json'
     portfolio = load_portfolio(portfolio_file_path)
 
+    # Only the holdings' recent history is read; older year partitions are skipped
+    stock_data = load_data(data_dir, codes=portfolio, start=history_start())
+
     analyze_data(stock_data)
     analyze_portfolio(portfolio, stock_data)
 
     print("\nImportant: This code should not be used to make real-world investment decisions. Consult with a financial advisor before making any investment decisions.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import csv
+import json
+import warnings
+import numpy as np
+
+# Output paths (modify as needed)
+stats_csv_file = "summary_stats.csv"
+stats_json_file = "summary_stats.json"
+stats_text_file = "summary_stats.txt"
+
+# Column order of the consolidated table
+stat_columns = [
+    "count", "missing", "mean", "std", "min", "25%", "50%", "75%", "max",
+    "return_mean", "return_std", "return_skew", "return_kurtosis",
+]
+
+
+def compute_stats(universe, filled=None):
+    """
+    Computes descriptive statistics for every ticker at once.
+
+    Args:
+        universe (screen.Universe): Date-aligned price matrix.
+        filled (list, optional): Prices per ticker that were forward-filled before the
+            universe was built. They are counted as missing rather than observed.
+
+    Returns:
+        dict: Statistic name -> array with one value per ticker (see stat_columns).
+    """
+    prices = np.asarray(universe.prices, dtype=float)
+    n_dates, n_tickers = prices.shape
+    valid = ~np.isnan(prices)
+    has_data = valid.any(axis=0)
+
+    # Missing rows are gaps between a ticker's first and last observation
+    first = np.argmax(valid, axis=0)
+    last = n_dates - 1 - np.argmax(valid[::-1], axis=0)
+    span = np.where(has_data, last - first + 1, 0)
+    count = valid.sum(axis=0)
+    if filled is not None:
+        count = count - np.asarray(filled, dtype=int)
+
+    with np.errstate(all='ignore'), warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # All-NaN columns
+
+        quantiles = np.nanpercentile(prices, [0, 25, 50, 75, 100], axis=0) if n_dates else np.full((5, n_tickers), np.nan)
+        returns = prices[1:] / prices[:-1] - 1
+        returns[~np.isfinite(returns)] = np.nan
+
+        ret_mean = np.nanmean(returns, axis=0)
+        ret_std = np.nanstd(returns, axis=0, ddof=1)
+        centred = returns - ret_mean
+        m2 = np.nanmean(centred ** 2, axis=0)
+        skew = np.nanmean(centred ** 3, axis=0) / m2 ** 1.5
+        kurtosis = np.nanmean(centred ** 4, axis=0) / m2 ** 2 - 3
+
+        stats = {
+            "count": count.astype(float),
+            "missing": (span - count).astype(float),
+            "mean": np.nanmean(prices, axis=0),
+            "std": np.nanstd(prices, axis=0, ddof=1),
+            "min": quantiles[0],
+            "25%": quantiles[1],
+            "50%": quantiles[2],
+            "75%": quantiles[3],
+            "max": quantiles[4],
+            "return_mean": ret_mean,
+            "return_std": ret_std,
+            "return_skew": skew,
+            "return_kurtosis": kurtosis,
+        }
+    return stats
+
+
+def _clean(value):
+    return None if value is None or not np.isfinite(value) else float(value)
+
+
+def write_report(universe, stats, csv_path=stats_csv_file, json_path=stats_json_file, text_path=stats_text_file):
+    """
+    Writes the consolidated statistics table (CSV and JSON) and a short human summary.
+    """
+    symbols = universe.symbols
+
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["symbol"] + stat_columns)
+        for i, symbol in enumerate(symbols):
+            writer.writerow([symbol] + ["" if _clean(stats[c][i]) is None else f"{stats[c][i]:.6g}" for c in stat_columns])
+
+    with open(json_path, 'w') as f:
+        json.dump({symbol: {c: _clean(stats[c][i]) for c in stat_columns} for i, symbol in enumerate(symbols)}, f, indent=4)
+
+    mean_returns = stats["return_mean"]
+    ranked = [i for i in np.argsort(-np.nan_to_num(mean_returns, nan=-np.inf)) if np.isfinite(mean_returns[i])]
+
+    with open(text_path, 'w') as f:
+        f.write("\nSummary Statistics after preprocessing:\n")
+        f.write(f"Tickers: {len(symbols)}\n")
+        if len(universe.dates):
+            f.write(f"Dates: {len(universe.dates)} ({str(universe.dates[0])[:10]} to {str(universe.dates[-1])[:10]})\n")
+        f.write(f"Total observations: {int(np.nansum(stats['count']))}\n")
+        f.write(f"Missing observations: {int(np.nansum(stats['missing']))}\n")
+        f.write(f"Tickers with gaps: {int(np.sum(stats['missing'] > 0))}\n")
+        f.write(f"Median daily return std: {np.nanmedian(stats['return_std']) if len(symbols) else float('nan'):.4%}\n")
+        f.write("\nBest average daily returns:\n")
+        for i in ranked[:5]:
+            f.write(f"  {symbols[i]}: {mean_returns[i]:.4%}\n")
+        f.write("\nWorst average daily returns:\n")
+        for i in ranked[::-1][:5]:
+            f.write(f"  {symbols[i]}: {mean_returns[i]:.4%}\n")
+        f.write(f"\nFull table: {csv_path} / {json_path}\n")
@@ -0,0 +1,187 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Default engine settings (modify as needed)
+confidence = 0.95  # VaR/CVaR confidence level
+mc_paths = 100_000  # Monte Carlo paths
+mc_horizon = 1  # Trading days per path
+mc_seed = 42  # Fixed seed so runs are reproducible
+chunk_paths = 10_000  # Paths simulated per chunk; bounds memory at chunk x horizon x holdings
+
+
+class PortfolioReturns:
+    """
+    Date-aligned daily returns and value weights for the holdings of a portfolio.
+
+    Attributes:
+        symbols (list): Held symbols that have price data.
+        quantities (np.ndarray): Shares held, one per symbol.
+        prices (np.ndarray): Latest price per symbol.
+        weights (np.ndarray): Value weights (sum to 1).
+        returns (np.ndarray): (dates, symbols) daily simple returns.
+        value (float): Current portfolio value.
+    """
+
+    def __init__(self, universe, portfolio):
+        index = {symbol: i for i, symbol in enumerate(universe.symbols)}
+        self.symbols = [symbol for symbol in portfolio if symbol in index]
+        self.missing = [symbol for symbol in portfolio if symbol not in index]
+
+        columns = [index[symbol] for symbol in self.symbols]
+        prices = np.array(universe.prices[:, columns], dtype=float)
+
+        # Forward-fill along dates so a gap in one ticker does not drop the whole day
+        filled = np.where(np.isnan(prices), 0, np.arange(len(prices))[:, None])
+        np.maximum.accumulate(filled, axis=0, out=filled)
+        prices = prices[filled, np.arange(prices.shape[1])]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = prices[1:] / prices[:-1] - 1
+        # Before a ticker's first price there is no move to account for
+        self.returns = np.where(np.isfinite(returns), returns, 0.0)
+
+        self.quantities = np.array([portfolio[symbol] for symbol in self.symbols], dtype=float)
+        self.prices = prices[-1] if len(prices) else np.zeros(len(self.symbols))
+        self.prices = np.nan_to_num(self.prices)
+        values = self.quantities * self.prices
+        self.value = float(values.sum())
+        self.weights = values / self.value if self.value else np.zeros(len(self.symbols))
+
+    def portfolio_returns(self):
+        """
+        Value-weighted daily portfolio returns.
+        """
+        return self.returns @ self.weights
+
+
+def historical_var(portfolio_returns, value, level=confidence):
+    """
+    Historical-simulation VaR and CVaR in dollars (both reported as positive losses).
+
+    Args:
+        portfolio_returns (np.ndarray): Daily portfolio returns.
+        value (float): Current portfolio value.
+        level (float): Confidence level, e.g. 0.95.
+
+    Returns:
+        tuple: (var, cvar)
+    """
+    return _var_cvar(portfolio_returns * value, level)
+
+
+def _var_cvar(pnl, level):
+    if len(pnl) == 0:
+        return float('nan'), float('nan')
+    cutoff = np.quantile(pnl, 1 - level)
+    var = -cutoff
+    # CVaR is the average of the losses at or beyond the VaR cutoff (the left tail)
+    cvar = -pnl[pnl <= cutoff].mean()
+    return float(var), float(cvar)
+
+
+def _cholesky(cov):
+    """
+    Cholesky factor of a covariance matrix, nudging it to positive definite if needed.
+    """
+    jitter = 0.0
+    scale = np.mean(np.diag(cov)) or 1.0
+    for _ in range(10):
+        try:
+            return np.linalg.cholesky(cov + jitter * np.eye(len(cov)))
+        except np.linalg.LinAlgError:
+            jitter = scale * 1e-10 if jitter == 0 else jitter * 10
+    # Fall back to a symmetric square root from the eigen-decomposition
+    vals, vecs = np.linalg.eigh(cov)
+    return vecs * np.sqrt(np.clip(vals, 0, None))
+
+
+def _simulate_chunk(args):
+    """
+    Simulates one chunk of Monte Carlo paths and returns the dollar P&L per path.
+    """
+    seed, n_paths, horizon, mean, factor, weights, value = args
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((n_paths, horizon, len(mean)))
+    daily = mean + shocks @ factor.T
+    # Compound each holding over the horizon, then weight by value
+    growth = np.prod(1 + daily, axis=1) - 1
+    return value * (growth @ weights)
+
+
+def monte_carlo_pnl(returns, weights, value, paths=mc_paths, horizon=mc_horizon, seed=mc_seed,
+                    chunk=chunk_paths, workers=None):
+    """
+    Simulates portfolio P&L from a multivariate normal fitted to historical returns.
+
+    Paths are generated in chunks with independent child seeds, so the result is
+    identical whether the chunks run serially or on a process pool.
+
+    Args:
+        returns (np.ndarray): (dates, holdings) daily returns.
+        weights (np.ndarray): Value weights per holding.
+        value (float): Current portfolio value.
+        paths (int): Number of simulated paths.
+        horizon (int): Trading days per path.
+        seed (int): Base random seed.
+        chunk (int): Paths per chunk.
+        workers (int): Process pool size; None or 1 runs in-process.
+
+    Returns:
+        np.ndarray: Simulated dollar P&L, one per path.
+    """
+    mean = returns.mean(axis=0)
+    cov = np.atleast_2d(np.cov(returns, rowvar=False))
+    factor = _cholesky(cov)
+
+    sizes = [min(chunk, paths - start) for start in range(0, paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(s, n, horizon, mean, factor, weights, value) for s, n in zip(seeds, sizes)]
+
+    if workers and workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_chunk, jobs))
+    else:
+        results = [_simulate_chunk(job) for job in jobs]
+    return np.concatenate(results) if results else np.empty(0)
+
+
+def monte_carlo_var(returns, weights, value, level=confidence, **kwargs):
+    """
+    Monte Carlo VaR and CVaR in dollars. Keyword arguments go to monte_carlo_pnl.
+
+    Returns:
+        tuple: (var, cvar)
+    """
+    if returns.shape[0] < 2 or returns.shape[1] == 0:
+        return float('nan'), float('nan')
+    return _var_cvar(monte_carlo_pnl(returns, weights, value, **kwargs), level)
+
+
+def analyze_risk(universe, portfolio, level=confidence, **kwargs):
+    """
+    Runs historical and Monte Carlo VaR/CVaR for a portfolio.
+
+    Args:
+        universe (screen.Universe): Date-aligned price matrix.
+        portfolio (dict): Symbol -> quantity held.
+        level (float): Confidence level.
+        **kwargs: Monte Carlo settings (paths, horizon, seed, chunk, workers).
+
+    Returns:
+        dict: Portfolio value and VaR/CVaR figures.
+    """
+    holdings = PortfolioReturns(universe, portfolio)
+    hist_var, hist_cvar = historical_var(holdings.portfolio_returns(), holdings.value, level)
+    mc_var, mc_cvar = monte_carlo_var(holdings.returns, holdings.weights, holdings.value, level, **kwargs)
+    return {
+        "value": holdings.value,
+        "level": level,
+        "observations": len(holdings.returns),
+        "historical_var": hist_var,
+        "historical_cvar": hist_cvar,
+        "mc_var": mc_var,
+        "mc_cvar": mc_cvar,
+        "mc_paths": kwargs.get("paths", mc_paths),
+        "mc_horizon": kwargs.get("horizon", mc_horizon),
+        "missing": holdings.missing,
+    }
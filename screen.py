@@ -0,0 +1,268 @@
+import json
+import operator
+import numpy as np
+import indicators
+
+# Default rule file (modify as needed)
+rules_file = "screen_rules.json"
+
+# The original hardcoded criteria, used when no rule file exists
+default_rules = {
+    "rules": {"all": [
+        {"metric": "mean", "op": ">", "value": 50},
+        {"metric": "std", "op": "<", "value": 10},
+    ]},
+}
+
+comparisons = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+class Universe:
+    """
+    Date-aligned price (and optional volume) matrices for every ticker.
+
+    Args:
+        symbols (list): Ticker symbols, one per column.
+        dates (np.ndarray): Row dates, ascending.
+        prices (np.ndarray): (dates, tickers) prices, NaN where a ticker has no row.
+        volumes (np.ndarray): Optional (dates, tickers) traded volume.
+    """
+
+    def __init__(self, symbols, dates, prices, volumes=None):
+        self.symbols = list(symbols)
+        self.dates = dates
+        self.prices = prices
+        self.volumes = volumes
+
+    @classmethod
+    def from_panel(cls, price_panel):
+        """
+        Wraps a panel.PricePanel without copying its price matrix.
+        """
+        return cls(price_panel.symbols, price_panel.dates, price_panel.matrix())
+
+    @classmethod
+    def from_stock_data(cls, stock_data, column='price'):
+        """
+        Aligns a {symbol: DataFrame} dict (as returned by model.load_data) on one date index.
+        """
+        import pandas as pd
+
+        series = {}
+        volumes = {}
+        for symbol, data in stock_data.items():
+            frame = data.set_index('date') if 'date' in data.columns else data
+            frame = frame[~frame.index.duplicated(keep='last')]
+            series[symbol] = frame[column]
+            if 'Volume' in frame.columns:
+                volumes[symbol] = frame['Volume']
+
+        if not series:
+            return cls([], np.array([], dtype='datetime64[D]'), np.empty((0, 0)))
+
+        prices = pd.concat(series, axis=1).sort_index()
+        volume_matrix = None
+        if volumes:
+            volume_matrix = pd.concat(volumes, axis=1).reindex(index=prices.index, columns=prices.columns).to_numpy(float)
+        return cls(prices.columns, prices.index.to_numpy(), prices.to_numpy(float), volume_matrix)
+
+    def window(self, matrix, window=None):
+        """
+        Returns the trailing `window` rows of a matrix (all rows when window is None).
+        """
+        return matrix if window is None else matrix[-window:]
+
+
+def _returns(prices):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return prices[1:] / prices[:-1] - 1
+
+
+def _last_valid(prices):
+    """
+    Last non-NaN value per column.
+    """
+    valid = ~np.isnan(prices)
+    rows = prices.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+    last = prices[rows, np.arange(prices.shape[1])]
+    return np.where(valid.any(axis=0), last, np.nan)
+
+
+def _first_valid(prices):
+    valid = ~np.isnan(prices)
+    first = prices[np.argmax(valid, axis=0), np.arange(prices.shape[1])]
+    return np.where(valid.any(axis=0), first, np.nan)
+
+
+def metric_mean(universe, window=None):
+    return np.nanmean(universe.window(universe.prices, window), axis=0)
+
+
+def metric_std(universe, window=None):
+    # ddof=1 to match pandas' Series.std()
+    return np.nanstd(universe.window(universe.prices, window), axis=0, ddof=1)
+
+
+def metric_last(universe, window=None):
+    return _last_valid(universe.prices)
+
+
+def metric_return(universe, window=None):
+    """
+    Total return over the window: last price / first price - 1.
+    """
+    prices = universe.window(universe.prices, None if window is None else window + 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _last_valid(prices) / _first_valid(prices) - 1
+
+
+def metric_volatility(universe, window=None):
+    """
+    Standard deviation of daily returns over the window.
+    """
+    prices = universe.window(universe.prices, None if window is None else window + 1)
+    return np.nanstd(_returns(prices), axis=0, ddof=1)
+
+
+def metric_drawdown(universe, window=None):
+    """
+    Maximum drawdown over the window as a positive fraction (0.2 == 20% peak-to-trough).
+    """
+    prices = universe.window(universe.prices, window)
+    peaks = np.fmax.accumulate(prices, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdowns = 1 - prices / peaks
+    return np.nanmax(drawdowns, axis=0)
+
+
+def metric_volume(universe, window=None):
+    """
+    Average traded volume over the window (NaN when no volume data is loaded).
+    """
+    if universe.volumes is None:
+        return np.full(len(universe.symbols), np.nan)
+    return np.nanmean(universe.window(universe.volumes, window), axis=0)
+
+
+# Metric name -> function(universe, window) returning one value per ticker.
+# Other modules can register extra metrics (e.g. indicators) here.
+metric_functions = {
+    "mean": metric_mean,
+    "std": metric_std,
+    "last": metric_last,
+    "return": metric_return,
+    "volatility": metric_volatility,
+    "drawdown": metric_drawdown,
+    "volume": metric_volume,
+}
+metric_functions.update(indicators.screen_metrics)
+
+
+class Screener:
+    """
+    Evaluates declarative screening rules over a Universe with NumPy reductions.
+
+    Rule config format:
+        {
+            "rules": {"all": [                        # "all" / "any" nest freely
+                {"metric": "mean", "op": ">", "value": 50},
+                {"metric": "return", "window": 20, "op": ">", "value": 0}
+            ]},
+            "rank": {"metric": "return", "window": 20, "order": "desc", "top": 10}
+        }
+    """
+
+    def __init__(self, universe):
+        self.universe = universe
+        self.cache = {}
+
+    def metric(self, name, window=None):
+        """
+        Computes (and memoises) one metric for every ticker.
+        """
+        key = (name, window)
+        if key not in self.cache:
+            if name not in metric_functions:
+                raise ValueError(f"Unknown screening metric: {name}")
+            with np.errstate(all='ignore'):
+                self.cache[key] = np.asarray(metric_functions[name](self.universe, window), dtype=float)
+        return self.cache[key]
+
+    def evaluate(self, rule):
+        """
+        Returns a boolean mask over tickers for a (possibly nested) rule.
+        """
+        n = len(self.universe.symbols)
+        if "all" in rule:
+            mask = np.ones(n, dtype=bool)
+            for sub_rule in rule["all"]:
+                mask &= self.evaluate(sub_rule)
+            return mask
+        if "any" in rule:
+            mask = np.zeros(n, dtype=bool)
+            for sub_rule in rule["any"]:
+                mask |= self.evaluate(sub_rule)
+            return mask
+        if "not" in rule:
+            return ~self.evaluate(rule["not"])
+
+        values = self.metric(rule["metric"], rule.get("window"))
+        if rule["op"] not in comparisons:
+            raise ValueError(f"Unknown comparison operator: {rule['op']}")
+        # NaN compares False, so tickers without enough data never pass
+        return comparisons[rule["op"]](values, rule["value"])
+
+    def rank(self, mask, spec):
+        """
+        Orders the passing tickers by a metric, keeping only the top k via a partial sort.
+        """
+        candidates = np.flatnonzero(mask)
+        values = self.metric(spec["metric"], spec.get("window"))[candidates]
+        if spec.get("order", "desc") == "desc":
+            values = -values
+        values = np.where(np.isnan(values), np.inf, values)  # Missing values rank last
+
+        top = spec.get("top")
+        if top is not None and top < len(candidates):
+            part = np.argpartition(values, top - 1)[:top]
+            candidates, values = candidates[part], values[part]
+        return candidates[np.argsort(values, kind='stable')]
+
+    def run(self, config):
+        """
+        Applies a rule config and returns the selected symbols in ranked order.
+        """
+        mask = self.evaluate(config.get("rules", {"all": []}))
+        if "rank" in config:
+            selected = self.rank(mask, config["rank"])
+        else:
+            selected = np.flatnonzero(mask)
+        return [self.universe.symbols[i] for i in selected]
+
+
+def load_rules(path=rules_file):
+    """
+    Loads the rule config from a JSON file, falling back to the original criteria.
+    """
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return default_rules
+
+
+def screen(universe, config=None):
+    """
+    Runs a rule config (default: the rule file) over a universe.
+
+    Returns:
+        list: Selected stock symbols, ranked when the config has a "rank" section.
+    """
+    return Screener(universe).run(config if config is not None else load_rules())
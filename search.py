@@ -0,0 +1,161 @@
+import re
+import heapq
+
+# Shortest fuzzy similarity (Dice coefficient over trigrams) still reported as a match
+fuzzy_threshold = 0.3
+
+# Match scores, highest first
+score_exact_code = 100
+score_code_prefix = 90
+score_name_prefix = 80
+score_substring = 60
+score_fuzzy = 40  # Scaled by similarity
+
+# Fuzzy matching only runs when the direct matches are fewer than this
+fuzzy_min_results = 5
+
+# Queries this short match large parts of the universe, so their results are memoised
+short_query_length = 2
+
+# Shortest previous query a longer one is refined from. Below the trigram length
+# the candidate pool has no substring matches, so it is not a superset of the
+# longer query's matches.
+refine_min_length = 3
+
+
+def normalise(text):
+    return re.sub(r"[^a-z0-9 ]+", " ", text.lower()).strip()
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    In-memory search index over company names and codes.
+
+    Built once from the companies list. Each word of a name and each code goes
+    into a prefix table (prefix -> company ids), and every name gets a trigram
+    set for fuzzy matching. Typing more characters onto a previous query of at
+    least refine_min_length characters only re-scores its candidates instead
+    of the whole universe.
+
+    Args:
+        companies (list): Dicts with "name" and "code" keys (as from graph.load_data).
+    """
+
+    def __init__(self, companies):
+        self.companies = companies
+        self.names = [normalise(c["name"]) for c in companies]
+        self.codes = [c["code"].lower() for c in companies]
+        self.tokens = [name.split() for name in self.names]
+        self.prefixes = {}
+        self.grams = {}
+        self.name_grams = []
+
+        for i, (name, code) in enumerate(zip(self.names, self.codes)):
+            for token in set(self.tokens[i]) | {code}:
+                for end in range(1, len(token) + 1):
+                    self.prefixes.setdefault(token[:end], set()).add(i)
+            grams = trigrams(name) | trigrams(code)
+            self.name_grams.append(grams)
+            for gram in grams:
+                self.grams.setdefault(gram, set()).add(i)
+
+        self.last_query = None
+        self.last_candidates = None
+        self.short_results = {}
+
+    def _prefix_candidates(self, words):
+        """
+        Ids whose name/code tokens start with every query word.
+        """
+        candidates = None
+        for word in words:
+            ids = self.prefixes.get(word, set())
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+        return candidates or set()
+
+    def _substring_candidates(self, query):
+        """
+        Ids that contain every trigram of the query (verified later by _score).
+        """
+        if len(query) < 3:
+            return set()
+        candidates = None
+        for i in range(len(query) - 2):
+            ids = self.grams.get(query[i:i + 3], set())
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+        return set(candidates)
+
+    def _score(self, i, query, words):
+        code, name = self.codes[i], self.names[i]
+        if code == query:
+            return score_exact_code
+        if code.startswith(query):
+            return score_code_prefix
+        if all(any(token.startswith(w) for token in self.tokens[i]) for w in words):
+            # Earlier matches rank higher ("commonwealth" before "... common ...")
+            return score_name_prefix - min(name.find(words[0]), 19)
+        if query in name:
+            return score_substring
+        return None
+
+    def search(self, query, limit=20):
+        """
+        Returns up to `limit` (score, company) pairs, best first.
+
+        Exact and prefix matches on codes and name words rank above substring
+        matches, which rank above fuzzy (misspelt) matches.
+        """
+        query = normalise(query)
+        if not query:
+            self.last_query = self.last_candidates = None
+            return []
+        words = query.split()
+
+        if len(query) <= short_query_length:
+            key = (query, limit)
+            if key not in self.short_results:
+                self.short_results[key] = self._search(query, words, limit)
+            self.last_query = self.last_candidates = None  # Too short to refine from
+            return self.short_results[key]
+        return self._search(query, words, limit)
+
+    def _search(self, query, words, limit):
+        if (self.last_query and len(self.last_query) >= refine_min_length and query.startswith(self.last_query)
+                and self.last_candidates is not None):
+            # Incremental refinement: a longer query can only match a subset
+            pool = self.last_candidates
+        else:
+            pool = self._prefix_candidates(words) | self._substring_candidates(query)
+
+        scored = {}
+        for i in pool:
+            score = self._score(i, query, words)
+            if score is not None:
+                scored[i] = score
+        self.last_query, self.last_candidates = query, set(scored)
+
+        if len(scored) < fuzzy_min_results and len(query) >= 3:
+            # Fuzzy fallback via shared trigrams (handles typos such as "comonwealth")
+            query_grams = trigrams(query)
+            overlap = {}
+            for gram in query_grams:
+                for i in self.grams.get(gram, ()):
+                    overlap[i] = overlap.get(i, 0) + 1
+            for i, shared in overlap.items():
+                if i in scored:
+                    continue
+                similarity = 2 * shared / (len(query_grams) + len(self.name_grams[i]))
+                if similarity >= fuzzy_threshold:
+                    scored[i] = score_fuzzy * similarity
+
+        ranked = heapq.nsmallest(limit, scored.items(), key=lambda item: (-item[1], self.names[item[0]]))
+        return [(score, self.companies[i]) for i, score in ranked]
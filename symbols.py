@@ -0,0 +1,271 @@
+import os
+import csv
+import json
+import stat
+import struct
+import tempfile
+from array import array
+
+# Standard library only, so down.py and asxbot stay light.
+
+# Company list from the ASX (modify as needed)
+companies_file = "companies.csv"
+
+# Persistent code -> integer ID assignments. IDs are never reused or renumbered,
+# so arrays indexed by ID stay valid when companies are added or delisted.
+ids_file = "symbol_ids.json"
+
+# Binary cache of the parsed registry, rebuilt whenever either source file changes
+index_file = "symbols.idx"
+
+index_magic = b"ASXSYM1\0"
+unknown_name = "Unknown"
+
+
+def parse_companies(path=companies_file):
+    """
+    Parses companies.csv into (code, name) pairs in file order.
+
+    Every row ends with a trailing comma ('"XERO LIMITED","XRO",'), so rows are
+    read by position instead of requiring exactly two fields. The header row
+    and rows without a code are skipped.
+    """
+    pairs = []
+    with open(path, 'r', newline='') as f:
+        for row in csv.reader(f):
+            if len(row) < 2:
+                continue
+            name, code = row[0].strip(), row[1].strip().upper()
+            if not code or code == "CODE":
+                continue
+            pairs.append((code, name))
+    return pairs
+
+
+class SymbolRegistry:
+    """
+    Two-way mapping between ticker codes, integer IDs and company names.
+
+    IDs are dense (0..size-1), so per-ticker data can live in arrays of
+    length `size` indexed by ID. All lookups are O(1).
+
+    Args:
+        codes (list): Code per ID.
+        names (list): Company name per ID ('' where unknown).
+    """
+
+    def __init__(self, codes=(), names=()):
+        self.codes = list(codes)
+        self.names = list(names)
+        self.ids = {code: i for i, code in enumerate(self.codes) if code}  # '' marks a gap left in the ID file
+        self.changed = False
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self.ids
+
+    @property
+    def size(self):
+        return len(self.codes)
+
+    def id(self, code):
+        """
+        Returns the ID of a code, or None if it is not registered.
+        """
+        return self.ids.get(code)
+
+    def code(self, symbol_id):
+        return self.codes[symbol_id]
+
+    def name(self, key, default=unknown_name):
+        """
+        Returns the company name for a code or an ID.
+        """
+        symbol_id = key if isinstance(key, int) else self.ids.get(key)
+        if symbol_id is None:
+            return default
+        return self.names[symbol_id] or default
+
+    def add(self, code, name=""):
+        """
+        Registers a code (or fills in its name) and returns its ID.
+        """
+        symbol_id = self.ids.get(code)
+        if symbol_id is None:
+            symbol_id = len(self.codes)
+            self.ids[code] = symbol_id
+            self.codes.append(code)
+            self.names.append(name)
+            self.changed = True
+        elif name and self.names[symbol_id] != name:
+            self.names[symbol_id] = name
+            self.changed = True
+        return symbol_id
+
+    def ensure(self, codes):
+        """
+        Registers any unknown codes (e.g. data folders not in companies.csv) and returns their IDs.
+
+        New IDs only last for this process until save() is called.
+        """
+        return [self.add(code) for code in codes]
+
+    def ids_for(self, codes):
+        """
+        IDs for many codes as an array('i'), -1 where a code is not registered.
+        """
+        return array('i', (self.ids.get(code, -1) for code in codes))
+
+    def names_by_code(self):
+        return {code: name for code, name in zip(self.codes, self.names) if name}
+
+    def companies(self):
+        """
+        The named companies as [{"name": ..., "code": ...}] in ID order (companies.csv order).
+        """
+        return [{"name": name, "code": code} for code, name in zip(self.codes, self.names) if name]
+
+
+def _source_stamp(*paths):
+    stamp = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stamp += [st.st_size, st.st_mtime_ns]
+        except FileNotFoundError:
+            stamp += [-1, -1]
+    return stamp
+
+
+def _replace(path, data):
+    """
+    Atomically replaces `path` with `data` (bytes), keeping its permissions.
+
+    The temporary file gets a unique name in the same directory, so two
+    processes saving at once never write into each other's file.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o644  # mkstemp creates the file 0600
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def write_index(registry, stamp, path=index_file):
+    """
+    Writes the registry as one binary file: a header, the source file stamp,
+    string offsets and a single UTF-8 blob holding every code and name.
+    """
+    strings = [s.encode('utf-8') for pair in zip(registry.codes, registry.names) for s in pair]
+    offsets = array('Q', [0])
+    for s in strings:
+        offsets.append(offsets[-1] + len(s))
+    _replace(path, index_magic + struct.pack('<4qQ', *stamp, registry.size) + offsets.tobytes() + b"".join(strings))
+
+
+def read_index(stamp, path=index_file):
+    """
+    Loads the binary index, or returns None if it is missing, damaged or stale.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    head = len(index_magic) + struct.calcsize('<4qQ')
+    if len(data) < head or not data.startswith(index_magic):
+        return None
+    *stored_stamp, count = struct.unpack_from('<4qQ', data, len(index_magic))
+    if stored_stamp != stamp:
+        return None
+    offsets = array('Q')
+    offsets.frombytes(data[head:head + 8 * (2 * count + 1)])
+    blob = data[head + 8 * (2 * count + 1):]
+    if len(offsets) != 2 * count + 1 or offsets[-1] != len(blob):
+        return None
+    strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(2 * count)]
+    return SymbolRegistry(strings[0::2], strings[1::2])
+
+
+def load_ids(path=ids_file):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save(registry, ids_path=ids_file, companies_path=companies_file, index_path=index_file):
+    """
+    Persists new ID assignments and refreshes the binary index.
+
+    The ID file is tracked in git, so it is only rewritten when codes were added.
+    """
+    if registry.changed or not os.path.exists(ids_path):
+        ids = {code: i for i, code in enumerate(registry.codes)}
+        _replace(ids_path, json.dumps(ids, indent=0).encode('utf-8'))
+    write_index(registry, _source_stamp(companies_path, ids_path), index_path)
+    registry.changed = False
+
+
+def build(companies_path=companies_file, ids_path=ids_file):
+    """
+    Parses companies.csv, keeping every previously assigned ID and appending new codes.
+    """
+    assigned = load_ids(ids_path)
+    codes = [None] * (max(assigned.values()) + 1 if assigned else 0)
+    for code, i in assigned.items():
+        codes[i] = code
+    registry = SymbolRegistry([c if c is not None else "" for c in codes], [""] * len(codes))
+    before = registry.size
+    for code, name in parse_companies(companies_path):
+        registry.add(code, name)
+    registry.changed = registry.size != before or not os.path.exists(ids_path)
+    return registry
+
+
+_cache = {}
+
+
+def load(companies_path=companies_file, ids_path=ids_file, index_path=index_file):
+    """
+    Returns the registry, from the binary index when it is current.
+
+    The result is memoised per process, and the index is rebuilt (keeping all
+    existing IDs) whenever companies.csv or the ID file changes. The ID file
+    itself is only rewritten when companies.csv brought new codes.
+    """
+    stamp = _source_stamp(companies_path, ids_path)
+    key = (companies_path, ids_path, index_path)
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    registry = read_index(stamp, index_path)
+    if registry is None:
+        registry = build(companies_path, ids_path)
+        save(registry, ids_path, companies_path, index_path)
+        stamp = _source_stamp(companies_path, ids_path)
+    _cache[key] = (stamp, registry)
+    return registry
+
+
+def main():
+    registry = load()
+    named = sum(1 for name in registry.names if name)
+    print(f"{registry.size} symbols ({named} named) in {index_file}")
+
+if __name__ == "__main__":
+    main()
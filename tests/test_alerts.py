@@ -0,0 +1,39 @@
+import json
+import alerts
+import intraday
+
+
+class Monitor:
+    def __init__(self, codes):
+        self.buffers = {code: intraday.RingBuffer(8) for code in codes}
+
+    def tick(self, code, timestamp, price):
+        self.buffers[code].push(timestamp, price)
+        return [code]
+
+
+def saved_rule_state(path):
+    with open(path) as f:
+        return {(name, code): value for name, code, value in json.load(f)["rule_state"]}
+
+
+def test_intraday_recovery_is_saved_without_an_alert(tmp_path):
+    folder = tmp_path / "data" / "AAA"
+    folder.mkdir(parents=True)
+    (folder / "stock_data.csv").write_text("date,price\n2024-03-26,10.0\n2024-03-27,11.0\n")
+    state_path = str(tmp_path / "alert_state.json")
+    log_path = str(tmp_path / "alerts.log")
+
+    engine = alerts.AlertEngine({"AAA": {"has_it"}}, [alerts.LowRule("has_it", 2)], data_dir=str(tmp_path / "data"))
+    on_update = alerts.intraday_callback(engine, log_path, state_path)
+    monitor = Monitor(["AAA"])
+
+    on_update(monitor, monitor.tick("AAA", 1.0, 9.0))
+    assert saved_rule_state(state_path) == {("has_it_2_day_low", "AAA"): {"below": True}}
+    assert len((tmp_path / "alerts.log").read_text().splitlines()) == 1
+
+    # Back above the low: no alert, but the state must still reach disk
+    on_update(monitor, monitor.tick("AAA", 2.0, 10.5))
+    assert saved_rule_state(state_path) == {("has_it_2_day_low", "AAA"): {"below": False}}
+    assert len((tmp_path / "alerts.log").read_text().splitlines()) == 1
+    assert not engine.dirty
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+import threading
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+import pytest
+
+pytest.importorskip("pyppeteer")
+import autoport
+
+fixture_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "asx_game")
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """
+    Serves the fixture pages; the login path and the holdings page are mapped by the server.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=fixture_dir, **kwargs)
+
+    def translate_path(self, path):
+        path = path.split('?', 1)[0]
+        if path == autoport.login_path:
+            path = "/login.html"
+        elif path == "/holdings.html":
+            path = "/" + self.server.holdings_page
+        return super().translate_path(path)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def game(monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.holdings_page = "holdings.html"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(autoport, "load_dotenv", lambda: None)
+    monkeypatch.setenv("LOGID", "student")
+    monkeypatch.setenv("PASSWORD", "secret")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def sync(game, tmp_path, **kwargs):
+    url = f"http://127.0.0.1:{game.server_port}"
+    no_sandbox = hasattr(os, "geteuid") and os.geteuid() == 0
+    return asyncio.run(autoport.sync_portfolio(output=str(tmp_path / "myport.json"), url=url,
+                                               session_path=str(tmp_path / "session.json"),
+                                               no_sandbox=no_sandbox, **kwargs))
+
+
+def test_parse_holdings():
+    rows = [["CBA Commonwealth Bank", "1,200", "$1"], ["bhp", "350"], ["", "10"], ["WES"]]
+    assert autoport.parse_holdings(rows) == {"CBA": 1200, "BHP": 350}
+
+
+def test_login_then_reuse_session(game, tmp_path, monkeypatch):
+    expected = {"CBA": 1200, "BHP": 350, "WES": 40}
+    assert sync(game, tmp_path) == expected
+    with open(tmp_path / "myport.json") as f:
+        assert json.load(f) == expected
+    assert autoport.load_session(str(tmp_path / "session.json"))["portfolio_url"].endswith("/holdings.html")
+
+    # The saved session goes straight to the holdings page, no credentials needed
+    monkeypatch.delenv("LOGID")
+    monkeypatch.delenv("PASSWORD")
+    assert sync(game, tmp_path) == expected
+
+
+def test_empty_holdings_table(game, tmp_path):
+    game.holdings_page = "empty.html"
+    assert sync(game, tmp_path, reuse_session=False) == {}
+    with open(tmp_path / "myport.json") as f:
+        assert json.load(f) == {}
@@ -0,0 +1,25 @@
+import numpy as np
+import backtest
+
+
+def test_max_positions_does_not_favour_early_symbols():
+    n_tickers = 40
+    signal = np.ones((5, n_tickers), dtype=bool)
+    prices = np.ones((5, n_tickers))
+
+    weights = backtest.positions(signal, prices, max_positions=5)
+    held = weights[1:] > 0
+
+    assert (held.sum(axis=1) == 5).all()
+    assert (held == held[0]).all()              # Same picks every day, so no churn
+    assert not held[0, :5].all()                # Not simply the first five columns
+    assert (backtest.positions(signal, prices, max_positions=5) == weights).all()
+    assert (backtest.positions(signal, prices, max_positions=5, seed=1) != weights).any()
+
+
+def test_max_positions_only_caps_signalled_tickers():
+    signal = np.zeros((3, 6), dtype=bool)
+    signal[:, [1, 4]] = True
+    weights = backtest.positions(signal, np.ones((3, 6)), max_positions=5)
+    assert np.allclose(weights[1:, [1, 4]], 0.5)
+    assert weights[1:].sum(axis=1).tolist() == [1.0, 1.0]
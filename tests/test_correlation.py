@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+import correlation
+import screen
+
+
+def make_universe(prices, n_days):
+    dates = np.datetime64("2024-01-01") + np.arange(n_days)
+    return screen.Universe(["AAA", "BBB", "CCC", "DDD"], dates, prices[:n_days].copy())
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(3)
+    return 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (40, 4)), axis=0))
+
+
+def assert_same_sums(state, expected):
+    assert state.dates == expected.dates
+    for name in correlation.sum_names:
+        np.testing.assert_allclose(state.sums[name], expected.sums[name], rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(state.matrix(overlap=2), expected.matrix(overlap=2), rtol=1e-9, equal_nan=True)
+
+
+def test_incremental_matches_rebuild_after_backfill(tmp_path, prices):
+    lookback = 8
+    path = str(tmp_path / "correlation")
+    incomplete = prices.copy()
+    incomplete[24, 1] = np.nan  # Missing when first ingested
+
+    correlation.update(make_universe(incomplete, 26), path, lookback)
+
+    # The price is backfilled (two returns inside the window change) and the window advances
+    # far enough that the corrected days later slide out again, wrapping the ring
+    for n_days in (27, 30, 36):
+        state = correlation.update(make_universe(prices, n_days), path, lookback)
+        universe = make_universe(prices, n_days)
+        expected = correlation.RunningCorrelation.build(universe.symbols, correlation._day_strings(universe.dates)[1:],
+                                                        correlation.daily_returns(universe.prices), lookback)
+        assert_same_sums(state, expected)
+
+    reloaded = correlation.RunningCorrelation.load(path)
+    np.testing.assert_array_equal(reloaded.window_rows(), correlation.daily_returns(prices[:36])[-lookback:])
+
+
+def test_revise_only_touches_changed_days(tmp_path, prices):
+    path = str(tmp_path / "correlation")
+    state = correlation.update(make_universe(prices, 20), path, 8)
+    assert state.revise(state.window_rows().copy()) == 0
+
+    rows = state.window_rows().copy()
+    rows[3, 2] = 0.5
+    assert state.revise(rows) == 1
+    np.testing.assert_array_equal(state.window_rows(), rows)
+
+
+def test_main_matrix_with_too_little_history(tmp_path, monkeypatch, prices, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(correlation, "load_universe", lambda: make_universe(prices, 1))
+    (tmp_path / "portfolio.json").write_text('{"AAA": 10}')
+
+    correlation.main(["--matrix"])
+
+    assert "Not enough price history" in capsys.readouterr().out
+    assert not (tmp_path / "correlation").exists()
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+import fetch
+
+
+def frames(codes):
+    index = pd.to_datetime(["2024-03-27", "2024-03-28"])
+    return {code: pd.DataFrame({"Close": [1.0 + i, 2.0 + i]}, index=index) for i, code in enumerate(codes)}
+
+
+class RecordingProvider(fetch.FakeProvider):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    def fetch(self, codes, **kwargs):
+        self.batches.append(list(codes))
+        return super().fetch(codes, **kwargs)
+
+
+def test_fetch_all_batches_every_code():
+    codes = [f"C{i:02d}" for i in range(7)]
+    provider = RecordingProvider(frames(codes))
+    result = fetch.fetch_all(codes, provider=provider, size=3, workers=2, rate=None)
+
+    assert result.batches == 3
+    assert sorted(len(batch) for batch in provider.batches) == [1, 3, 3]
+    assert sorted(code for batch in provider.batches for code in batch) == codes
+    assert sorted(result.data) == codes
+    assert result.errors == {}
+
+
+def test_fetch_all_reports_missing_codes_as_no_data():
+    codes = ["AAA", "BBB", "CCC"]
+    provider = fetch.FakeProvider(frames(["AAA", "BBB"]), fail_codes={"BBB"})
+    result = fetch.fetch_all(codes, provider=provider, size=2, rate=None)
+
+    assert sorted(result.data) == ["AAA"]
+    assert result.errors == {"BBB": fetch.no_data, "CCC": fetch.no_data}
+
+
+def test_fetch_all_retries_failed_batches():
+    provider = fetch.FakeProvider(frames(["AAA"]), flaky=2)
+    result = fetch.fetch_all(["AAA"], provider=provider, rate=None, retries=2, backoff=0)
+
+    assert provider.calls == 3
+    assert list(result.data) == ["AAA"]
+    assert result.errors == {}
+
+
+def test_fetch_all_gives_up_after_the_last_retry():
+    provider = fetch.FakeProvider(frames(["AAA", "BBB"]), flaky=10)
+    result = fetch.fetch_all(["AAA", "BBB"], provider=provider, rate=None, retries=1, backoff=0)
+
+    assert provider.calls == 2
+    assert result.data == {}
+    assert set(result.errors) == {"AAA", "BBB"}
+    assert all(error.startswith("ConnectionError") for error in result.errors.values())
+
+
+def test_fetch_all_passes_the_date_range_to_the_provider():
+    provider = fetch.FakeProvider(frames(["AAA"]))
+    result = fetch.fetch_all(["AAA"], provider=provider, rate=None, start="2024-03-28")
+
+    assert list(result.data["AAA"]["Close"]) == [2.0]
+
+
+@pytest.mark.parametrize("codes, size, expected", [([], 3, []), (["A", "B"], 5, [["A", "B"]])])
+def test_make_batches(codes, size, expected):
+    assert fetch.make_batches(codes, size) == expected
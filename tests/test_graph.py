@@ -0,0 +1,19 @@
+import os
+import pytest
+
+pytest.importorskip("tkinter")
+import graph
+
+
+def test_series_cache_follows_file_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "data" / "AAA" / "stock_data.csv"
+    path.parent.mkdir(parents=True)
+    path.write_text("date,price\n2024-03-26,1.0\n")
+    assert graph.load_series("AAA")[1].tolist() == [1.0]
+    assert graph.load_series("AAA")[1].tolist() == [1.0]
+
+    path.write_text("date,price\n2024-03-26,1.0\n2024-03-27,2.0\n")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert graph.load_series("AAA")[1].tolist() == [1.0, 2.0]
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+import indicators
+
+symbols = ["AAA", "BBB", "CCC"]
+
+
+@pytest.fixture
+def history():
+    rng = np.random.default_rng(5)
+    prices = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, (60, 3)), axis=0))
+    prices[[10, 11, 40], 1] = np.nan  # Days BBB did not trade
+    prices[:5, 2] = np.nan  # CCC listed later
+    dates = [str(day) for day in np.datetime64("2024-01-01") + np.arange(60)]
+    return prices, dates
+
+
+def batch_latest(prices):
+    line, signal_line, hist = indicators.macd(prices)
+    middle, upper, lower = indicators.bollinger(prices)
+    return {
+        "sma": indicators.sma(prices), "ema": indicators.ema(prices), "rsi": indicators.rsi(prices),
+        "macd": line, "macd_signal": signal_line, "macd_hist": hist,
+        "bollinger_mid": middle, "bollinger_upper": upper, "bollinger_lower": lower,
+        "atr": indicators.atr(prices), "rolling_volatility": indicators.volatility(prices),
+    }
+
+
+def assert_matches_batch(state, prices):
+    values = state.values()
+    for name, matrix in batch_latest(prices).items():
+        np.testing.assert_allclose(values[name], indicators._last_row(matrix), rtol=1e-9, err_msg=name)
+
+
+def test_streaming_matches_batch(history):
+    prices, dates = history
+    assert_matches_batch(indicators.IndicatorState.from_history(symbols, prices, dates), prices)
+
+
+def test_backfilled_day_is_applied_to_the_ticker_that_missed_it(history, tmp_path):
+    prices, dates = history
+    path = str(tmp_path / "indicator_state.npz")
+    fetched = prices[:50].copy()
+    fetched[49, 1] = np.nan  # BBB's fetch failed on the last day
+    indicators.IndicatorState.from_history(symbols, fetched, dates[:50]).save(path)
+
+    # The next run backfills BBB's missing day along with the new one for everyone
+    new_prices = {dates[49]: {"BBB": prices[49, 1]},
+                  dates[50]: {code: prices[50, k] for k, code in enumerate(symbols)}}
+    state = indicators.update_state(new_prices, path)
+
+    assert state.last_days.astype(str).tolist() == [dates[50]] * 3
+    assert_matches_batch(state, prices[:51])
+
+    # Days a ticker already has are not applied twice
+    state = indicators.update_state({dates[50]: {"AAA": 999.0}}, path)
+    assert_matches_batch(state, prices[:51])
+
+
+def universe_for(prices, dates):
+    import screen
+    return screen.Universe(symbols, np.array(dates, dtype='datetime64[D]'), prices)
+
+
+def test_screen_metrics_read_the_streaming_state(history, tmp_path, monkeypatch):
+    prices, dates = history
+    monkeypatch.chdir(tmp_path)
+    state = indicators.IndicatorState.from_history(symbols, prices, dates)
+    # Mark the saved values so the test can tell where each one came from
+    state.ema = state.ema + 1000
+    state.save()
+
+    universe = universe_for(prices, dates)
+    batch = indicators._last_row(indicators.ema(prices))
+    np.testing.assert_allclose(indicators.screen_metrics["ema"](universe), batch + 1000)
+    # A non-default window is not in the state
+    np.testing.assert_allclose(indicators.screen_metrics["ema"](universe, 5),
+                               indicators._last_row(indicators.ema(prices, 5)))
+
+    # CCC has a day the state has not seen: only CCC falls back to batch
+    extended = np.vstack([prices, [[np.nan, np.nan, 30.0]]])
+    universe = universe_for(extended, dates + ["2024-03-01"])
+    values = indicators.screen_metrics["ema"](universe)
+    np.testing.assert_allclose(values[:2], batch[:2] + 1000)
+    np.testing.assert_allclose(values[2], indicators._last_row(indicators.ema(extended))[2])
+
+
+def test_streaming_screen_metrics_match_batch(history, tmp_path, monkeypatch):
+    prices, dates = history
+    monkeypatch.chdir(tmp_path)
+    universe = universe_for(prices, dates)
+    streaming = {}
+    indicators.IndicatorState.from_history(symbols, prices, dates).save()
+    for name, metric in indicators.screen_metrics.items():
+        streaming[name] = metric(universe)
+    (tmp_path / indicators.state_file).unlink()
+    with np.errstate(all='ignore'):
+        for name, metric in indicators.screen_metrics.items():
+            np.testing.assert_allclose(streaming[name], metric(universe), rtol=1e-9, err_msg=name)
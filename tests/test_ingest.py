@@ -0,0 +1,51 @@
+from datetime import date, datetime
+import pandas as pd
+import pytest
+import fetch
+import ingest
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "data_dir", str(tmp_path))
+    monkeypatch.setattr(ingest, "manifest_file", str(tmp_path / "manifest.json"))
+    return tmp_path
+
+
+def provider(days):
+    index = pd.to_datetime(days)
+    return fetch.FakeProvider({"AAA": pd.DataFrame({"Close": [float(i + 1) for i in range(len(days))]}, index=index)})
+
+
+def run(today, source):
+    return ingest.ingest(["AAA"], provider=source, today=today)
+
+
+@pytest.mark.parametrize("now, expected", [
+    (datetime(2024, 3, 28, 11, 0), date(2024, 3, 27)),   # Thursday, market open
+    (datetime(2024, 3, 28, 17, 0), date(2024, 3, 28)),   # Thursday, after the close
+    (datetime(2024, 3, 25, 9, 0), date(2024, 3, 22)),    # Monday morning -> Friday
+    (datetime(2024, 3, 30, 12, 0), date(2024, 3, 29)),   # Saturday
+    (date(2024, 3, 28), date(2024, 3, 28)),              # Plain dates count as after the close
+])
+def test_last_closed_trading_day(now, expected):
+    assert ingest.last_closed_trading_day(now) == expected
+
+
+def test_intraday_run_does_not_store_or_check_today(data_dir):
+    source = provider(["2024-03-26", "2024-03-27", "2024-03-28"])
+    new_prices, errors, _ = run(datetime(2024, 3, 28, 11, 0), source)
+
+    assert errors == {}
+    assert max(new_prices) == "2024-03-27"
+    assert ingest.load_manifest()["AAA"] == {"last": "2024-03-27", "checked": "2024-03-27"}
+
+    # After the close the same day, today's final price is fetched
+    new_prices, _, skipped = run(datetime(2024, 3, 28, 16, 30), source)
+    assert skipped == 0
+    assert list(new_prices) == ["2024-03-28"]
+    assert ingest.read_rows("AAA")["2024-03-28"] == "3.0"
+
+    # A re-run that evening has nothing left to do
+    new_prices, _, skipped = run(datetime(2024, 3, 28, 20, 0), source)
+    assert new_prices == {} and skipped == 1
@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+import intraday
+
+
+class RepeatingSource:
+    """
+    Returns the same one-minute bar on every poll, as yfinance does until the next bar closes.
+    """
+
+    def __init__(self, bars):
+        self.bars = bars
+
+    async def quotes(self, codes):
+        return {code: self.bars[code] for code in codes if code in self.bars}
+
+
+def poll(monitor, times=1):
+    async def run():
+        return [await monitor.poll_once() for _ in range(times)]
+    return asyncio.run(run())
+
+
+def test_shock_shows_up_in_declines_and_ring():
+    source = intraday.SimulatedQuoteSource({"AAA": 10.0, "BBB": 20.0}, volatility=0.0, seed=1)
+    monitor = intraday.IntradayMonitor(["AAA", "BBB"], source, reference={"AAA": 10.0, "BBB": 20.0}, capacity=3)
+
+    poll(monitor, 2)
+    assert monitor.declined() == []
+
+    source.shock("AAA", 0.06)
+    assert poll(monitor) == [["AAA", "BBB"]]
+
+    [(code, declines, price)] = monitor.declined()
+    assert code == "AAA" and price == pytest.approx(9.4)
+    assert declines["close"] == pytest.approx(6.0)
+    assert declines[1] == pytest.approx(6.0)
+    assert declines[5] is None  # Only three ticks buffered
+    assert monitor.declined(1)[0][0] == "AAA"
+
+    # The ring keeps the last `capacity` ticks, oldest first
+    poll(monitor)
+    times, prices = monitor.buffers["AAA"].ordered()
+    assert prices.tolist() == pytest.approx([10.0, 9.4, 9.4])
+    assert (times[1:] > times[:-1]).all()
+
+
+def test_repeated_quotes_are_not_buffered():
+    source = RepeatingSource({"AAA": (1000.0, 9.0)})
+    monitor = intraday.IntradayMonitor(["AAA"], source, reference={"AAA": 10.0})
+
+    assert poll(monitor, 3) == [["AAA"], [], []]
+    assert len(monitor.buffers["AAA"]) == 1
+
+    source.bars["AAA"] = (1060.0, 8.0)
+    assert poll(monitor) == [["AAA"]]
+    assert monitor.buffers["AAA"].ordered()[1].tolist() == [9.0, 8.0]
+    assert monitor.declines["AAA"][0][1] == pytest.approx(100 / 9)
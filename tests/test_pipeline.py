@@ -0,0 +1,16 @@
+import pipeline
+
+
+def test_always_stage_runs_every_time_and_cached_stage_skips(tmp_path):
+    calls = []
+    stages = [
+        pipeline.Stage("get", lambda context: calls.append("get"), always=True),
+        pipeline.Stage("model", lambda context: calls.append("model"), deps=["get"]),
+    ]
+    cache_path = str(tmp_path / "cache.json")
+
+    pipeline.run(stages, cache_path=cache_path)
+    report = pipeline.run(stages, cache_path=cache_path)
+
+    assert calls == ["get", "model", "get"]
+    assert [status for _, status, _ in report] == ["ran", "skipped"]
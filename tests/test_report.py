@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import model
+import report
+import screen
+
+
+def test_forward_filled_prices_count_as_missing():
+    dates = pd.date_range("2024-01-01", periods=6, name="date")
+    stock_data = {
+        "AAA": model.preprocess_data(pd.DataFrame({"price": [1.0, np.nan, np.nan, 1.3, 1.4, 1.5]}, index=dates)),
+        # BBB skips a date the others traded, so its gap only shows up once aligned
+        "BBB": model.preprocess_data(pd.DataFrame({"price": [2.0, 2.1, 2.3, 2.4, 2.5]}, index=dates.delete(2))),
+        # A leading gap cannot be filled and is outside CCC's first observation
+        "CCC": model.preprocess_data(pd.DataFrame({"price": [np.nan, 3.0, 3.1, 3.2, 3.3, 3.4]}, index=dates)),
+    }
+    universe = screen.Universe.from_stock_data(stock_data)
+    filled = [stock_data[symbol].attrs["filled_prices"] for symbol in universe.symbols]
+
+    stats = report.compute_stats(universe, filled)
+
+    assert list(universe.symbols) == ["AAA", "BBB", "CCC"]
+    assert stats["missing"].tolist() == [2, 1, 0]
+    assert stats["count"].tolist() == [4, 5, 5]
+    assert report.compute_stats(universe)["missing"].tolist() == [0, 1, 0]
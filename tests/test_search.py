@@ -0,0 +1,29 @@
+import pytest
+import search
+import symbols
+
+
+@pytest.fixture(scope="module")
+def companies():
+    return symbols.load().companies()
+
+
+def codes(results):
+    return [company["code"] for _, company in results]
+
+
+@pytest.mark.parametrize("query", ["omm", "bank", "commonwealth bank", "westpac", "comonwealth", "xro", "b"])
+def test_typing_matches_a_fresh_search(companies, query):
+    typed = search.SearchIndex(companies)
+    for end in range(1, len(query) + 1):
+        results = typed.search(query[:end])
+        assert codes(results) == codes(search.SearchIndex(companies).search(query[:end])), query[:end]
+
+
+def test_short_prefixes_do_not_hide_substring_matches(companies):
+    index = search.SearchIndex(companies)
+    index.search("om")
+    assert codes(index.search("omm")) == codes(search.SearchIndex(companies).search("omm"))
+    index.search("ba")
+    index.search("ban")
+    assert "MPL" in codes(index.search("bank"))
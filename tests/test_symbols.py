@@ -0,0 +1,38 @@
+import os
+import json
+import symbols
+
+
+def write_companies(path, codes):
+    with open(path, 'w') as f:
+        f.write('"Company name","Code",\n')
+        for code in codes:
+            f.write(f'"{code} LIMITED","{code}",\n')
+
+
+def paths(tmp_path):
+    return str(tmp_path / "companies.csv"), str(tmp_path / "symbol_ids.json"), str(tmp_path / "symbols.idx")
+
+
+def test_ids_file_only_rewritten_for_new_codes(tmp_path):
+    companies, ids, index = paths(tmp_path)
+    write_companies(companies, ["BBB", "AAA"])
+    registry = symbols.load(companies, ids, index)
+    assert [registry.id(c) for c in ("BBB", "AAA")] == [0, 1]
+
+    # A stale index is rebuilt, but an ID file with nothing new is left untouched
+    os.remove(index)
+    before = os.stat(ids).st_mtime_ns
+    os.utime(companies, ns=(before + 10**9, before + 10**9))
+    symbols._cache.clear()
+    symbols.load(companies, ids, index)
+    assert os.path.exists(index)
+    assert os.stat(ids).st_mtime_ns == before
+
+    # New codes get new IDs after the existing ones
+    write_companies(companies, ["CCC", "AAA", "BBB"])
+    registry = symbols.load(companies, ids, index)
+    with open(ids) as f:
+        assert json.load(f) == {"BBB": 0, "AAA": 1, "CCC": 2}
+    assert registry.name("CCC") == "CCC LIMITED"
+    assert sorted(os.listdir(tmp_path)) == ["companies.csv", "symbol_ids.json", "symbols.idx"]
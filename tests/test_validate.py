@@ -0,0 +1,47 @@
+import os
+import stat
+import numpy as np
+import panel
+import validate
+
+
+def write_csv(path, text, mode=0o644):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+    os.chmod(path, mode)
+
+
+def test_repair_keeps_permissions_and_invalidates_derived_state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bad = tmp_path / "data" / "AAA" / "stock_data.csv"
+    write_csv(str(bad), "date,price\n2024-03-27,2.0\n2024-03-26,1.0\n")
+    write_csv(str(tmp_path / "data" / "BBB" / "stock_data.csv"), "date,price\n2024-03-26,5.0\n2024-03-27,6.0\n")
+
+    built = panel.migrate_from_csv("data")
+    stamp = built.sources["stamp"]
+    built.close()
+    (tmp_path / "indicator_state.npz").write_bytes(b"stale")
+    os.makedirs(tmp_path / "correlation")
+    (tmp_path / "correlation" / "meta.json").write_text("{}")
+
+    results = validate.validate("data", workers=1)
+
+    assert [r["repaired"] for r in results] == [True, False]
+    assert stat.S_IMODE(os.stat(bad).st_mode) == 0o644
+    assert bad.read_text().splitlines() == ["date,price", "2024-03-26,1.0", "2024-03-27,2.0"]
+    assert not (tmp_path / "indicator_state.npz").exists()
+    assert not (tmp_path / "correlation" / "meta.json").exists()
+    rebuilt = panel.PricePanel()
+    assert rebuilt.sources["stamp"] != stamp and panel.is_current("data")
+    np.testing.assert_array_equal(rebuilt.column("AAA"), [1.0, 2.0])
+
+
+def test_clean_tree_leaves_derived_state_alone(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_csv(str(tmp_path / "data" / "AAA" / "stock_data.csv"), "date,price\n2024-03-26,1.0\n")
+    (tmp_path / "indicator_state.npz").write_bytes(b"kept")
+
+    validate.validate("data", workers=1)
+
+    assert (tmp_path / "indicator_state.npz").exists()
@@ -0,0 +1,242 @@
+import os
+import csv
+import math
+import stat
+import argparse
+import tempfile
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+
+# Specify the data directory path (modify as needed)
+data_dir = "data"
+
+# Summary written after every run
+report_file = "validation_report.txt"
+
+# Target format of every stock_data.csv
+header = ['date', 'price']
+
+# Files handed to a worker at a time
+files_per_task = 32
+
+# Problem kinds, in report order
+issue_kinds = (
+    "missing_header",   # First row is data, not 'date,price'
+    "stray_headers",    # Header rows repeated further down (e.g. from appended dumps)
+    "mixed_dates",      # Rows not in YYYY-MM-DD (e.g. '2024-03-01 00:00:00+11:00')
+    "bad_dates",        # Dates that cannot be parsed at all
+    "bad_prices",       # Prices that are missing, NaN, inf or not numbers
+    "duplicates",       # Several rows for one date (the last one is kept)
+    "unsorted",         # Rows out of date order
+    "malformed_rows",   # Wrong number of columns or blank lines
+)
+
+
+def parse_row_date(text):
+    """
+    Returns the YYYY-MM-DD date of a row, or None if it cannot be parsed.
+
+    Timestamped rows ('2024-03-01 00:00:00+11:00') keep their local calendar
+    date, i.e. the first 10 characters.
+    """
+    text = text.strip()
+    if len(text) > 10 and text[10] not in " T":
+        return None
+    try:
+        return date.fromisoformat(text[:10]).isoformat()
+    except ValueError:
+        return None
+
+
+def _is_header(row):
+    return len(row) >= 1 and row[0].strip().lower() == header[0]
+
+
+def check_file(path, repair=False):
+    """
+    Checks one stock_data.csv and, if asked and needed, rewrites it in the canonical form.
+
+    The canonical form is a 'date,price' header followed by unique, ascending
+    YYYY-MM-DD rows with finite prices. Rows that cannot be repaired (bad dates
+    or prices) are dropped; for duplicated dates the last row wins, as in
+    ingest.write_rows. The file is replaced through a temp file and an atomic
+    rename, so a crash never leaves it half-written.
+
+    Args:
+        path (str): CSV file to check.
+        repair (bool): Rewrite the file when problems are found.
+
+    Returns:
+        dict: {"path", "rows", "kept", "issues": {kind: count}, "repaired", "error"}.
+    """
+    issues = dict.fromkeys(issue_kinds, 0)
+    result = {"path": path, "rows": 0, "kept": 0, "issues": issues, "repaired": False, "error": None}
+    try:
+        with open(path, 'r', newline='') as f:
+            rows = list(csv.reader(f))
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    if not rows or not _is_header(rows[0]):
+        issues["missing_header"] = 1
+        body = rows
+    else:
+        body = rows[1:]
+
+    cleaned = {}
+    previous = None
+    for row in body:
+        if not row or not any(cell.strip() for cell in row):
+            issues["malformed_rows"] += 1
+            continue
+        if _is_header(row):
+            issues["stray_headers"] += 1
+            continue
+        result["rows"] += 1
+        if len(row) != 2:
+            issues["malformed_rows"] += 1
+            if len(row) < 2:
+                continue
+        day = parse_row_date(row[0])
+        if day is None:
+            issues["bad_dates"] += 1
+            continue
+        if row[0].strip() != day:
+            issues["mixed_dates"] += 1
+        try:
+            price = float(row[1])
+        except ValueError:
+            price = float('nan')
+        if not math.isfinite(price):
+            issues["bad_prices"] += 1
+            continue
+        if day in cleaned:
+            issues["duplicates"] += 1
+        elif previous is not None and day < previous:
+            issues["unsorted"] += 1
+        previous = day
+        cleaned[day] = price
+
+    result["kept"] = len(cleaned)
+    if repair and any(issues.values()):
+        folder = os.path.dirname(path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".stock_data.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows((day, repr(price)) for day, price in sorted(cleaned.items()))
+            # mkstemp creates the file 0600; keep the original permissions
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        result["repaired"] = True
+    return result
+
+
+def _check_files(paths, repair):
+    return [check_file(path, repair) for path in paths]
+
+
+def data_files(directory=data_dir):
+    """
+    Returns every data/<CODE>/stock_data.csv path, sorted by code.
+    """
+    paths = []
+    for folder in sorted(os.listdir(directory)):
+        path = os.path.join(directory, folder, "stock_data.csv")
+        if os.path.isfile(path):
+            paths.append(path)
+    return paths
+
+
+def invalidate_derived(directory=data_dir):
+    """
+    Drops state derived from the CSVs after they were repaired in place.
+
+    The price panel is rebuilt (if there is one for this directory). The
+    streaming indicator state and the correlation metadata are removed, so
+    both are rebuilt from the repaired history the next time they are used.
+    """
+    import panel
+    import indicators
+    import correlation
+
+    price_panel = panel.open_current(directory)
+    if price_panel is not None:
+        price_panel.close()
+    for path in (indicators.state_file, os.path.join(correlation.state_dir, correlation.meta_file)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def validate(directory=data_dir, repair=True, workers=None):
+    """
+    Checks (and optionally repairs) every ticker file on a process pool.
+
+    When any file is repaired, the state derived from the CSVs is invalidated
+    (see invalidate_derived).
+
+    Args:
+        directory (str): Data directory with one folder per ticker.
+        repair (bool): False for a dry run that only reports problems.
+        workers (int): Pool size (defaults to the core count; 1 runs in-process).
+
+    Returns:
+        list: check_file results in ticker order.
+    """
+    paths = data_files(directory)
+    chunks = [paths[i:i + files_per_task] for i in range(0, len(paths), files_per_task)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks) or 1))
+    if workers == 1:
+        results = [r for chunk in chunks for r in _check_files(chunk, repair)]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = [r for chunk_results in pool.map(_check_files, chunks, [repair] * len(chunks))
+                       for r in chunk_results]
+    if any(r["repaired"] for r in results):
+        invalidate_derived(directory)
+    return results
+
+
+def write_report(results, path=report_file, repair=True):
+    """
+    Writes totals per problem kind, then one line per affected file.
+    """
+    affected = [r for r in results if r["error"] or any(r["issues"].values())]
+    totals = {kind: sum(r["issues"][kind] for r in results) for kind in issue_kinds}
+    with open(path, 'w') as f:
+        mode = "repaired" if repair else "dry run, nothing changed"
+        f.write(f"Checked {len(results)} files: {len(affected)} with problems ({mode})\n")
+        for kind in issue_kinds:
+            if totals[kind]:
+                files = sum(1 for r in results if r["issues"][kind])
+                f.write(f"  {kind}: {totals[kind]} rows in {files} files\n")
+        for r in affected:
+            if r["error"]:
+                f.write(f"{r['path']}: could not be read ({r['error']})\n")
+                continue
+            problems = ", ".join(f"{kind} {n}" for kind, n in r["issues"].items() if n)
+            dropped = r["rows"] - r["kept"]
+            f.write(f"{r['path']}: {problems}; {r['kept']} rows kept, {dropped} dropped\n")
+    return affected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check and normalise data/<CODE>/stock_data.csv files.")
+    parser.add_argument("--dry-run", action="store_true", help="only report problems, do not rewrite files")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--data-dir", default=data_dir)
+    parser.add_argument("--report", default=report_file)
+    args = parser.parse_args(argv)
+
+    results = validate(args.data_dir, repair=not args.dry_run, workers=args.workers)
+    affected = write_report(results, args.report, repair=not args.dry_run)
+    action = "would be repaired" if args.dry_run else "repaired"
+    print(f"Checked {len(results)} files, {len(affected)} {action}; details in {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import os
+import re
+import json
+import sqlite3
+from array import array
+from datetime import datetime
+
+# Watchlist database (modify as needed)
+db_file = "watchlist.db"
+
+# Legacy sources migrated on first use
+data_dir = "data"
+records_file = "data_records.json"
+status_file = "investment_status.txt"
+
+flag_names = ("liked", "has_it")
+
+schema = """
+CREATE TABLE IF NOT EXISTS flags (
+    code TEXT PRIMARY KEY,
+    liked INTEGER NOT NULL DEFAULT 0,
+    has_it INTEGER NOT NULL DEFAULT 0,
+    updated TEXT
+);
+CREATE INDEX IF NOT EXISTS flags_liked_has_it ON flags (liked, has_it);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def connect(path=db_file, migrate_legacy=True):
+    """
+    Opens the watchlist store in WAL mode, creating and migrating it if needed.
+
+    WAL lets other scripts read flags while like.py is writing.
+    """
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(schema)
+    if migrate_legacy and conn.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone() is None:
+        migrate(conn)
+    return conn
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def upsert_many(conn, rows):
+    """
+    Inserts or updates many codes in one transaction.
+
+    Args:
+        conn (sqlite3.Connection): Open store.
+        rows (iterable): (code, liked, has_it) tuples.
+    """
+    with conn:
+        conn.executemany(
+            "INSERT INTO flags (code, liked, has_it, updated) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(code) DO UPDATE SET liked = excluded.liked, has_it = excluded.has_it, updated = excluded.updated",
+            [(code, int(liked), int(has_it), _now()) for code, liked, has_it in rows],
+        )
+
+
+def ensure_codes(conn, codes):
+    """
+    Adds any codes not yet in the store with both flags cleared (one transaction).
+    """
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO flags (code, updated) VALUES (?, ?)",
+                         [(code, _now()) for code in codes])
+
+
+def set_flag(conn, code, flag, value):
+    """
+    Sets one flag for one code (a single-row write).
+    """
+    if flag not in flag_names:
+        raise ValueError(f"Unknown flag: {flag}")
+    with conn:
+        conn.execute(
+            f"INSERT INTO flags (code, {flag}, updated) VALUES (?, ?, ?) "
+            f"ON CONFLICT(code) DO UPDATE SET {flag} = excluded.{flag}, updated = excluded.updated",
+            (code, int(value), _now()),
+        )
+
+
+def get(conn, code):
+    """
+    Returns {'liked': 0/1, 'has_it': 0/1} for a code, or None if it is unknown.
+    """
+    row = conn.execute("SELECT liked, has_it FROM flags WHERE code = ?", (code,)).fetchone()
+    return dict(row) if row else None
+
+
+def all_flags(conn):
+    """
+    Returns every code's flags as {code: {'liked': ..., 'has_it': ...}}, sorted by code.
+    """
+    return {row["code"]: {"liked": row["liked"], "has_it": row["has_it"]}
+            for row in conn.execute("SELECT code, liked, has_it FROM flags ORDER BY code")}
+
+
+def flag_arrays(conn, registry):
+    """
+    Returns {flag: array('b')} indexed by symbol ID (see symbols.py), so flags can be
+    combined with ID-indexed price arrays without string lookups.
+
+    Codes missing from the registry are registered first.
+    """
+    rows = conn.execute("SELECT code, liked, has_it FROM flags").fetchall()
+    registry.ensure(row["code"] for row in rows)
+    arrays = {flag: array('b', bytes(registry.size)) for flag in flag_names}
+    for row in rows:
+        symbol_id = registry.id(row["code"])
+        for flag in flag_names:
+            arrays[flag][symbol_id] = row[flag]
+    return arrays
+
+
+def query(conn, liked=None, has_it=None):
+    """
+    Returns the codes matching the given flags, e.g. query(conn, liked=1, has_it=0)
+    for "all liked and not held". Uses the (liked, has_it) index.
+    """
+    clauses, params = [], []
+    for flag, value in (("liked", liked), ("has_it", has_it)):
+        if value is not None:
+            clauses.append(f"{flag} = ?")
+            params.append(int(value))
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return [row["code"] for row in conn.execute(f"SELECT code FROM flags{where} ORDER BY code", params)]
+
+
+def _read_status_file(path):
+    """
+    Parses a legacy investment_status.txt ("Invested: Yes" / "Like: No").
+
+    Some files were written without newlines ("Like: NoInvested: No"), so the
+    fields are matched anywhere in the text rather than line by line.
+    """
+    with open(path, 'r') as f:
+        text = f.read()
+    flags = {}
+    for key, value in re.findall(r"(Invested|Like)\s*:\s*(Yes|No)", text, re.IGNORECASE):
+        flags["has_it" if key.lower() == "invested" else "liked"] = int(value.lower() == "yes")
+    return flags
+
+
+def migrate(conn, records_path=records_file, data_path=data_dir):
+    """
+    One-time import from data_records.json and data/<CODE>/investment_status.txt.
+
+    Where the two sources disagree a flag is kept set if either source sets it,
+    so nothing that was liked or held is lost.
+    """
+    merged = {}
+    if os.path.exists(records_path):
+        try:
+            with open(records_path, 'r') as f:
+                for code, info in json.load(f).items():
+                    merged[code] = {flag: int(info.get(flag, 0)) for flag in flag_names}
+        except json.JSONDecodeError:
+            pass
+
+    if os.path.isdir(data_path):
+        for code in os.listdir(data_path):
+            path = os.path.join(data_path, code, status_file)
+            if os.path.isfile(path):
+                entry = merged.setdefault(code, {"liked": 0, "has_it": 0})
+                for flag, value in _read_status_file(path).items():
+                    entry[flag] = max(entry[flag], value)
+
+    upsert_many(conn, [(code, f["liked"], f["has_it"]) for code, f in merged.items()])
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', ?)", (_now(),))
+    return len(merged)